@@ -4,7 +4,9 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.db.models import Count, Q
 from datetime import timedelta
+from bookings.caching import BOOKINGS_NAMESPACE, analytics_key
 from bookings.models import Booking
+from meebridge_backend.caching import cache_response
 from meeting_pages.models import MeetingPage
 from .serializers import AnalyticsSerializer
 
@@ -12,6 +14,7 @@ from .serializers import AnalyticsSerializer
 class AnalyticsView(views.APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_response(BOOKINGS_NAMESPACE, analytics_key, 'ANALYTICS_CACHE_TIMEOUT', 'analytics')
     def get(self, request):
         user = request.user
         
@@ -0,0 +1,362 @@
+"""
+Concurrent load test of the public booking flow.
+
+Worker threads replay visitor journeys (open the public page, look up
+taken slots, book a free one, open the management link) over HTTP against
+a real server, by default a ``runserver`` launched for the run on a free
+local port. Every visitor sends its own
+``X-Forwarded-For`` address, which the local server trusts as if it sat
+behind one proxy, so per-IP throttles see many clients.
+
+Afterwards the database is checked for invariants the flow must keep
+under concurrency: no overlapping active bookings for a host, a single
+customer per host and attendee email, every booking linked to its
+customer, and exactly one booking per successful create response.
+"""
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from bookings.models import Booking
+from customers.models import Customer
+from .runner import percentile
+from .seeding import CUSTOMER_DOMAIN
+
+JOURNEYS = {
+    'browse': ('public_page', 'available_slots'),
+    'book': ('public_page', 'available_slots', 'create_public'),
+    'manage': ('public_page', 'available_slots', 'create_public', 'manage'),
+}
+DEFAULT_MIX = {'browse': 60, 'book': 30, 'manage': 10}
+VISITOR_TIMEZONES = ['Europe/Berlin', 'America/New_York', 'Asia/Kolkata', 'UTC']
+SERVER_START_TIMEOUT = 30
+
+
+def parse_mix(value):
+    """Parse ``browse=60,book=30,manage=10`` into journey weights."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in JOURNEYS or not weight.strip().isdigit():
+            raise ValueError(f"Invalid journey weight {part!r}; journeys are {', '.join(JOURNEYS)}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("At least one journey needs a positive weight")
+    return mix
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """``runserver`` in a subprocess, with emails discarded."""
+
+    def __init__(self, throttling=False):
+        self.port = _free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.throttling = throttling
+        self.process = None
+        self.log = None
+
+    def __enter__(self):
+        env = {
+            **os.environ,
+            'EMAIL_BACKEND': 'django.core.mail.backends.dummy.EmailBackend',
+            'PUBLIC_THROTTLING': str(self.throttling),
+            'NUM_PROXIES': '1',
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'meebridge_backend.settings'),
+        }
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver', '--noreload',
+             f'127.0.0.1:{self.port}'],
+            env=env, stdout=subprocess.DEVNULL, stderr=self.log,
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.2).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"The local server did not start:\n{self.output()}")
+
+    def output(self):
+        self.log.seek(0)
+        return self.log.read().decode(errors='replace')[-2000:]
+
+    def __exit__(self, *exc_info):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.log.close()
+
+
+class HttpClient:
+    """
+    Issues each request on a fresh connection.
+
+    ``runserver`` writes headers and body in separate packets; on a reused
+    connection the body then waits for the client's delayed ACK, adding
+    about 40 ms to every response, so connections are not kept alive.
+    """
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+
+    def request(self, method, path, ip, body=None):
+        headers = {'X-Forwarded-For': ip, 'Accept': 'application/json', 'Connection': 'close'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+        try:
+            payload = json.loads(data) if data else None
+        except ValueError:
+            payload = None
+        return response.status, payload
+
+
+class LoadTest:
+    def __init__(self, url, pages, mix=None, concurrency=20, journeys=500, duration=None,
+                 attendees=200, days=5, timeout=30, seed=0):
+        self.url = url
+        self.pages = pages
+        self.mix = mix or DEFAULT_MIX
+        self.concurrency = concurrency
+        self.journeys = journeys
+        self.duration = duration
+        self.attendees = attendees
+        self.days = days
+        self.timeout = timeout
+        self.seed = seed
+        self.tag = format(int(time.time() * 1000), 'x')
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.completed = Counter()
+        self.no_free_slot = 0
+        self.created_ids = []
+        self.attendee_emails = set()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _claim(self, deadline):
+        with self._lock:
+            if self._next >= self.journeys or (deadline and time.monotonic() >= deadline):
+                return None
+            self._next += 1
+            return self._next
+
+    def _record(self, step, status, elapsed):
+        with self._lock:
+            self.latencies[step].append(elapsed * 1000)
+            self.statuses[step][status] += 1
+
+    def _call(self, client, step, method, path, ip, body=None):
+        started = time.perf_counter()
+        try:
+            status, payload = client.request(method, path, ip, body)
+        except (OSError, http.client.HTTPException):
+            status, payload = 'connection_error', None
+        self._record(step, status, time.perf_counter() - started)
+        return status, payload
+
+    def _worker(self, worker, deadline):
+        rng = random.Random(self.seed * 1000 + worker)
+        client = HttpClient(self.url, self.timeout)
+        names, weights = zip(*self.mix.items())
+        while (n := self._claim(deadline)) is not None:
+            journey = rng.choices(names, weights)[0]
+            self._run_journey(client, journey, n, rng)
+            with self._lock:
+                self.completed[journey] += 1
+
+    def _run_journey(self, client, journey, n, rng):
+        page = rng.choice(self.pages)
+        ip = f'10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}'
+        status, _ = self._call(client, 'public_page', 'GET', f'/api/public/meeting-pages/{page.slug}/', ip)
+        if status != 200:
+            return
+
+        day = timezone.now().date() + timedelta(days=rng.randint(1, self.days))
+        query = urlencode({'meeting_page_id': page.id, 'date': day.isoformat(), 'timezone': 'UTC'})
+        status, payload = self._call(client, 'available_slots', 'GET',
+                                     f'/api/public/bookings/available-slots/?{query}', ip)
+        if status != 200 or journey == 'browse':
+            return
+
+        taken = [
+            (start, start + timedelta(minutes=slot['duration_minutes'] or page.duration_minutes))
+            for slot in payload.get('slots', []) if slot.get('status') == 'booked'
+            for start in [datetime.fromisoformat(slot['time'])]
+        ]
+        length = timedelta(minutes=page.duration_minutes)
+        candidates = []
+        start = datetime.combine(day, datetime.min.time(), dt_timezone.utc).replace(hour=9)
+        while start + length <= start.replace(hour=17):
+            if not any(begin < start + length and start < end for begin, end in taken):
+                candidates.append(start)
+            start += length
+        if not candidates:
+            with self._lock:
+                self.no_free_slot += 1
+            return
+
+        attendee = rng.randrange(self.attendees)
+        email = f'visitor.{attendee}.{self.tag}@{CUSTOMER_DOMAIN}'
+        name = f'Visitor {attendee}'
+        with self._lock:
+            self.attendee_emails.add(email)
+        body = {
+            'meeting_page': str(page.id),
+            'date': rng.choice(candidates).isoformat(),
+            'attendee_email': email,
+            'attendee_name': name,
+            'user_input': {'name': name, 'email': email, 'timezone': rng.choice(VISITOR_TIMEZONES)},
+        }
+        status, payload = self._call(client, 'create_public', 'POST', '/api/public/bookings/', ip, body)
+        if status != 201:
+            return
+        with self._lock:
+            self.created_ids.append(payload['id'])
+        if journey == 'manage':
+            self._call(client, 'manage', 'GET', f"/api/public/bookings/manage/{payload['management_token']}/", ip)
+
+    def run(self):
+        """Run the journeys and return the report, including invariant checks."""
+        self.started_at = timezone.now()
+        deadline = time.monotonic() + self.duration if self.duration else None
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._worker, args=(worker, deadline), name=f'loadtest-{worker}')
+            for worker in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        requests = sum(len(values) for values in self.latencies.values())
+        failures = sum(
+            count for step, statuses in self.statuses.items() for status, count in statuses.items()
+            if status == 'connection_error' or status >= 500
+        )
+        return {
+            'meta': {
+                'url': self.url,
+                'pages': [page.slug for page in self.pages],
+                'concurrency': self.concurrency,
+                'mix': self.mix,
+                'started_at': self.started_at.isoformat(),
+            },
+            'summary': {
+                'journeys': sum(self.completed.values()),
+                'journeys_by_type': dict(self.completed),
+                'requests': requests,
+                'duration_s': round(elapsed, 3),
+                'journeys_per_s': round(sum(self.completed.values()) / elapsed, 1),
+                'requests_per_s': round(requests / elapsed, 1),
+                'error_rate': round(failures / requests, 4) if requests else 0,
+                'bookings_created': len(self.created_ids),
+                'no_free_slot': self.no_free_slot,
+            },
+            'steps': {step: self._summarize(step) for step in self.latencies},
+            'invariants': self.check_invariants(),
+        }
+
+    def _summarize(self, step):
+        latencies = sorted(self.latencies[step])
+        return {
+            'requests': len(latencies),
+            'status_codes': {str(status): count for status, count in sorted(self.statuses[step].items(), key=str)},
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(latencies[-1], 3),
+        }
+
+    def check_invariants(self):
+        created = Booking.objects.filter(meeting_page__in=self.pages, created_at__gte=self.started_at)
+        new_ids = {str(pk) for pk in created.values_list('id', flat=True)}
+
+        duplicates = list(
+            Customer.objects.filter(email__in=self.attendee_emails)
+            .values('owner', 'email').annotate(customers=Count('id')).filter(customers__gt=1)
+            .values_list('email', 'customers')
+        )
+        return {
+            'double_bookings': self._overlapping_pairs(new_ids),
+            'duplicate_customers': len(duplicates),
+            'duplicate_customer_examples': [email for email, _ in duplicates[:5]],
+            'bookings_without_customer': created.filter(attendee_email__isnull=False, customer__isnull=True).count(),
+            # Every 201 must correspond to exactly one stored booking.
+            'missing_bookings': len(set(self.created_ids) - new_ids),
+            'unreported_bookings': len(new_ids - set(self.created_ids)),
+        }
+
+    def _overlapping_pairs(self, new_ids):
+        """Overlapping active bookings per host where at least one was made by this run."""
+        hosts = {page.user_id for page in self.pages}
+        rows = (
+            Booking.objects.filter(meeting_page__user__in=hosts, status='booked', id__in=new_ids)
+            .values_list('date', flat=True)
+        )
+        if not rows:
+            return 0
+        longest = timedelta(minutes=max(page.duration_minutes for page in self.pages))
+        window = Booking.objects.filter(
+            meeting_page__user__in=hosts, status='booked',
+            date__gte=min(rows) - longest, date__lte=max(rows) + longest,
+        ).values_list('id', 'meeting_page__user_id', 'date', 'meeting_page__duration_minutes').order_by('date')
+
+        pairs = 0
+        open_by_host = defaultdict(list)
+        for pk, host, start, minutes in window:
+            end = start + timedelta(minutes=minutes)
+            active = [entry for entry in open_by_host[host] if entry[1] > start]
+            is_new = str(pk) in new_ids
+            pairs += sum(1 for other_pk, _ in active if is_new or other_pk in new_ids)
+            active.append((str(pk), end))
+            open_by_host[host] = active
+        return pairs
+
+
+def violations(report):
+    invariants = report['invariants']
+    return {
+        name: value for name, value in invariants.items()
+        if isinstance(value, int) and value
+    }
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import SCENARIOS, compare, run
+from benchmarks.seeding import bench_users
+
+
+class Command(BaseCommand):
+    help = "Benchmark the main endpoints against seed_bench data and print p50/p95/p99 latency as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios', choices=list(SCENARIOS),
+                            help="Only run this scenario (repeatable)")
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--host', help="Username of the seeded host to benchmark as (default: bench-0)")
+        parser.add_argument('--output', help="Also write the report to this file")
+        parser.add_argument('--compare', help="Report changes against a previous --output file")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1")
+        host = None
+        if options['host']:
+            host = bench_users().filter(username=options['host']).first()
+            if host is None:
+                raise CommandError(f"No seeded host named {options['host']}")
+        elif not bench_users().exists():
+            raise CommandError("No benchmark data; run seed_bench first")
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        report = run(options['scenarios'], options['iterations'], options['warmup'], host)
+        if baseline is not None:
+            report['comparison'] = {'baseline_commit': baseline.get('meta', {}).get('commit'),
+                                    'scenarios': compare(report, baseline)}
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,21 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seeding import bench_users
+from benchmarks.serialization import run
+
+
+class Command(BaseCommand):
+    help = "Time rendering and parsing a seed_bench booking list with the stdlib and orjson JSON classes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['iterations'] < 1:
+            raise CommandError("--rows and --iterations must be at least 1")
+        if not bench_users().exists():
+            raise CommandError("No benchmark data; run seed_bench first")
+        self.stdout.write(json.dumps(run(options['rows'], options['iterations']), indent=2))
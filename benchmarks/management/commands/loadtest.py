@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.loadtest import DEFAULT_MIX, LoadTest, LocalServer, parse_mix, violations
+from benchmarks.seeding import bench_users
+from meeting_pages.models import MeetingPage
+
+
+class Command(BaseCommand):
+    help = "Load test the public booking flow with concurrent visitors and check booking invariants"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Test this running server (sharing this database) instead of "
+                                          "launching runserver")
+        parser.add_argument('--page', action='append', dest='pages',
+                            help="Slug of a meeting page to load (repeatable; default: the first seeded page)")
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+                            help="Journey weights, e.g. browse=60,book=30,manage=10")
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--journeys', type=int, default=500)
+        parser.add_argument('--duration', type=float, help="Stop after this many seconds")
+        parser.add_argument('--attendees', type=int, default=200,
+                            help="Distinct attendee emails; fewer means more repeat bookers")
+        parser.add_argument('--days', type=int, default=5, help="Book within this many days ahead")
+        parser.add_argument('--throttle', action='store_true', help="Keep public rate limits on the local server")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Also write the report to this file")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['concurrency'] < 1 or options['attendees'] < 1 or options['days'] < 1:
+            raise CommandError("--concurrency, --attendees and --days must be at least 1")
+
+        if options['pages']:
+            pages = list(MeetingPage.objects.filter(slug__in=options['pages'], active=True))
+            if len(pages) != len(set(options['pages'])):
+                raise CommandError("Unknown or inactive meeting page")
+        else:
+            pages = list(MeetingPage.objects.filter(user__in=bench_users(), active=True).order_by('slug')[:1])
+            if not pages:
+                raise CommandError("No meeting page to load; run seed_bench or pass --page")
+
+        load_test = LoadTest(
+            None, pages, mix=mix, concurrency=options['concurrency'], journeys=options['journeys'],
+            duration=options['duration'], attendees=options['attendees'], days=options['days'],
+            seed=options['seed'],
+        )
+        if options['url']:
+            load_test.url = options['url']
+            report = load_test.run()
+        else:
+            try:
+                with LocalServer(throttling=options['throttle']) as server:
+                    load_test.url = server.url
+                    report = load_test.run()
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
+        failed = violations(report)
+        if failed:
+            raise CommandError("Invariant violations: " + ', '.join(f'{name}={count}' for name, count in failed.items()))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seeding import DEFAULT_BATCH_SIZE, bench_users, clear_bench_data, seed
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users, meeting pages, customers and bookings for the bench command"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=40)
+        parser.add_argument('--pages-per-user', type=int, default=3)
+        # About three bookings per host and day, leaving free slots to book.
+        parser.add_argument('--bookings-per-page', type=int, default=250)
+        parser.add_argument('--customers', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--reset', action='store_true', help="Delete previously seeded benchmark data first")
+
+    def handle(self, *args, **options):
+        if options['customers'] < 1 or options['pages_per_user'] < 1:
+            raise CommandError("--customers and --pages-per-user must be at least 1")
+        if bench_users().exists():
+            if not options['reset']:
+                raise CommandError("Benchmark data already exists; pass --reset to replace it")
+            clear_bench_data()
+
+        started = time.perf_counter()
+        created = seed(
+            users=options['users'],
+            pages_per_user=options['pages_per_user'],
+            bookings_per_page=options['bookings_per_page'],
+            customers=options['customers'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {time.perf_counter() - started:.1f}s"))
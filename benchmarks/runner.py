@@ -0,0 +1,204 @@
+"""
+Endpoint benchmarks run in-process through the Django test client.
+
+Each scenario issues the same kind of request ``iterations`` times against
+the data generated by ``seed_bench`` and reports latency percentiles and
+query counts. Throttling, slow-request logging and ``DEBUG`` query logging
+are switched off and emails go to the in-memory backend for the run, so
+numbers reflect the application code rather than the sandbox around it.
+"""
+import math
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core import mail
+from django.db import connection, connections
+from django.db.models import Max
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from bookings.models import Booking
+from meebridge_backend.middleware import RequestStats
+from .seeding import bench_users
+
+
+class BenchContext:
+    def __init__(self, host):
+        self.host = host
+        self.pages = list(host.meeting_pages.order_by('slug'))
+        self.anonymous = Client()
+        self.authenticated = Client()
+        self.authenticated.force_login(host)
+        # Past seeded bookings and those of earlier runs, which would
+        # otherwise make the new ones conflict.
+        start = timezone.now() + timedelta(days=400)
+        latest = Booking.objects.filter(meeting_page__user=host).aggregate(latest=Max('date'))['latest']
+        if latest is not None and latest >= start:
+            start = latest + timedelta(days=1)
+        self.booking_start = start.replace(hour=9, minute=0, second=0, microsecond=0)
+
+    def page(self, i):
+        return self.pages[i % len(self.pages)]
+
+
+def _public_page(ctx, i):
+    return ctx.anonymous, 'get', f'/api/public/meeting-pages/{ctx.page(i).slug}/', {}
+
+
+def _available_slots(ctx, i):
+    day = timezone.now().date() + timedelta(days=1 + i % 28)
+    params = {'meeting_page_id': str(ctx.page(i).id), 'date': day.isoformat(), 'timezone': 'America/New_York'}
+    return ctx.anonymous, 'get', '/api/public/bookings/available-slots/', {'data': params}
+
+
+def _create_public(ctx, i):
+    page = ctx.page(i)
+    payload = {
+        'meeting_page': str(page.id),
+        # An hour apart, longer than any seeded meeting, so pages never overlap.
+        'date': (ctx.booking_start + timedelta(hours=i)).isoformat(),
+        'attendee_email': f'load.{i}@bench.example.com',
+        'attendee_name': f'Load {i}',
+        'user_input': {'name': f'Load {i}', 'email': f'load.{i}@bench.example.com', 'timezone': 'Europe/Berlin'},
+    }
+    return ctx.anonymous, 'post', '/api/public/bookings/', {'data': payload, 'content_type': 'application/json'}
+
+
+def _bookings_list(ctx, i):
+    return ctx.authenticated, 'get', '/api/bookings/', {}
+
+
+def _analytics(ctx, i):
+    return ctx.authenticated, 'get', '/api/analytics/', {}
+
+
+def _customers_list(ctx, i):
+    return ctx.authenticated, 'get', '/api/customers/', {}
+
+
+SCENARIOS = {
+    'public_page': _public_page,
+    'available_slots': _available_slots,
+    'create_public': _create_public,
+    'bookings_list': _bookings_list,
+    'analytics': _analytics,
+    'customers_list': _customers_list,
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def _request(ctx, scenario, i):
+    client, method, path, kwargs = scenario(ctx, i)
+    stats = RequestStats()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats.time_query))
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        stats.duration = time.perf_counter() - started
+    stats.status = response.status_code
+    return stats
+
+
+def _summarize(samples):
+    latencies = sorted(stats.duration * 1000 for stats in samples)
+    queries = sorted(stats.queries for stats in samples)
+    db_times = sorted(stats.db_time * 1000 for stats in samples)
+    statuses = Counter(stats.status for stats in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(count for status, count in statuses.items() if status >= 400),
+        'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'max_ms': round(latencies[-1], 3),
+        'db_p50_ms': round(percentile(db_times, 50), 3),
+        'queries_p50': percentile(queries, 50),
+        'queries_max': queries[-1],
+    }
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run(scenarios=None, iterations=200, warmup=5, host=None):
+    """Run the named scenarios (all by default) and return the JSON report."""
+    host = host or bench_users().order_by('username').first()
+    ctx = BenchContext(host)
+    started_at = timezone.now()
+    rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+    results = {}
+    with override_settings(
+        DEBUG=False,
+        REST_FRAMEWORK=rest_framework,
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        REQUEST_SLOW_MS=sys.maxsize,
+        REQUEST_SLOW_QUERY_COUNT=sys.maxsize,
+    ):
+        for name in scenarios or SCENARIOS:
+            scenario = SCENARIOS[name]
+            # Warm-up requests use their own offsets so created bookings
+            # never repeat a slot.
+            for i in range(warmup):
+                _request(ctx, scenario, iterations + i)
+            results[name] = _summarize([_request(ctx, scenario, i) for i in range(iterations)])
+        mail.outbox = []
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'started_at': started_at.isoformat(),
+            'database': connection.vendor,
+            'host': host.username,
+            'bookings': Booking.objects.filter(meeting_page__user=host).count(),
+            'iterations': iterations,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'scenarios': results,
+    }
+
+
+def _change(current, previous):
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 1)
+
+
+def compare(report, baseline):
+    """Percentage change of each scenario's latency against ``baseline``."""
+    changes = {}
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        changes[name] = {
+            'p50_ms_change_pct': _change(current['p50_ms'], previous['p50_ms']),
+            'p95_ms_change_pct': _change(current['p95_ms'], previous['p95_ms']),
+            'p99_ms_change_pct': _change(current['p99_ms'], previous['p99_ms']),
+            'queries_p50_change': current['queries_p50'] - previous['queries_p50'],
+        }
+    return changes
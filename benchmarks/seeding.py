@@ -0,0 +1,210 @@
+"""
+Synthetic data for the endpoint benchmarks.
+
+Everything is inserted with ``bulk_create`` in batches, so memory stays
+bounded by ``batch_size`` and millions of bookings take minutes rather than
+hours. Generated users are named ``bench-<n>`` and customers use
+``@bench.example.com`` addresses, which is how ``clear_bench_data`` finds
+them again. The same ``seed`` produces the same rows, apart from their ids.
+"""
+import random
+from datetime import time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from bookings.caching import invalidate_host_bookings
+from bookings.models import Availability, Booking, IdempotencyRecord
+from customers.activity import recompute_customer_stats
+from customers.models import Customer
+from meeting_pages.models import MeetingPage
+from users.models import User
+from users.quotas import reconcile_usage
+
+USERNAME_PREFIX = 'bench-'
+CUSTOMER_DOMAIN = 'bench.example.com'
+DEFAULT_BATCH_SIZE = 5000
+
+TIMEZONES = [
+    'UTC', 'Europe/London', 'Europe/Berlin', 'America/New_York', 'America/Los_Angeles',
+    'America/Sao_Paulo', 'Asia/Kolkata', 'Asia/Tokyo', 'Australia/Sydney', 'Africa/Lagos',
+]
+FIRST_NAMES = ['Ann', 'Ben', 'Chloe', 'Dev', 'Elif', 'Femi', 'Grace', 'Hiro', 'Ines', 'Jonas', 'Kiran', 'Lea']
+LAST_NAMES = ['Adams', 'Baker', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Gupta', 'Haddad', 'Ito', 'Jensen']
+COMPANIES = ['', '', 'Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries']
+TEAM_SIZES = ['1-10', '11-50', '51-200', '200+']
+DURATIONS = [15, 30, 30, 45, 60]
+PAGE_FIELDS = [
+    {'name': 'name', 'type': 'text', 'required': True},
+    {'name': 'email', 'type': 'email', 'required': True},
+    {'name': 'phone', 'type': 'phone'},
+    {'name': 'company', 'type': 'text'},
+    {'name': 'team_size', 'type': 'select', 'options': TEAM_SIZES},
+    {'name': 'notes', 'type': 'textarea', 'maxLength': 500},
+]
+# Bookings span this window around the time of seeding.
+PAST_DAYS = 180
+FUTURE_DAYS = 60
+
+
+def bench_users():
+    return User.objects.filter(username__startswith=USERNAME_PREFIX)
+
+
+def clear_bench_data():
+    """Delete everything a previous ``seed_bench`` created."""
+    users = bench_users()
+    with transaction.atomic():
+        # Raw deletes skip the per-row booking signals, which would otherwise
+        # make removing millions of rows take hours.
+        Booking.objects.filter(meeting_page__user__in=users)._raw_delete(Booking.objects.db)
+        IdempotencyRecord.objects.filter(meeting_page__user__in=users)._raw_delete(IdempotencyRecord.objects.db)
+        Customer.objects.filter(email__endswith='@' + CUSTOMER_DOMAIN)._raw_delete(Customer.objects.db)
+        users.delete()
+
+
+def _batched(objects, model, batch_size):
+    batch = []
+    created = 0
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def _users(count):
+    # Hashing a password is deliberately slow; benchmarks log in with
+    # force_login, so every user shares one unusable password.
+    password = make_password(None)
+    for n in range(count):
+        yield User(
+            username=f'{USERNAME_PREFIX}{n}',
+            email=f'{USERNAME_PREFIX}{n}@example.com',
+            password=password,
+            plan='premium',
+            organization=f'Bench Org {n}',
+        )
+
+
+def _pages(users, pages_per_user, rng):
+    for n, user in enumerate(users):
+        for m in range(pages_per_user):
+            duration = rng.choice(DURATIONS)
+            yield MeetingPage(
+                user=user,
+                title=f'{duration} minute call {m}',
+                slug=f'{USERNAME_PREFIX}{n}-{m}',
+                theme={'primaryColor': '#%06x' % rng.randrange(0x1000000), 'font': 'Inter'},
+                fields=PAGE_FIELDS,
+                layout_style=rng.choice(['classic', 'minimal', 'modern']),
+                event_type=f'{duration}-min',
+                duration_minutes=duration,
+            )
+
+
+def _availabilities(users):
+    for n, user in enumerate(users):
+        for weekday in range(5):
+            # Every other host takes a lunch break.
+            windows = [(9, 17)] if n % 2 else [(9, 12), (13, 17)]
+            for start, end in windows:
+                yield Availability(user=user, weekday=weekday, start_time=time(start), end_time=time(end))
+
+
+def _person(rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return first, last, f'{first} {last}'
+
+
+def _customers(count, rng):
+    for n in range(count):
+        first, last, name = _person(rng)
+        customer = Customer(
+            name=name,
+            email=f'{first.lower()}.{last.lower()}.{n}@{CUSTOMER_DOMAIN}',
+            phone=f'+1 555 {rng.randrange(10 ** 7):07d}',
+            organization=rng.choice(COMPANIES),
+            metadata={'source': rng.choice(['web', 'referral', 'ads'])},
+        )
+        customer.refresh_search_document()
+        yield customer
+
+
+def _status(date, now, rng):
+    roll = rng.random()
+    if date >= now:
+        return 'cancelled' if roll < 0.15 else 'booked'
+    if roll < 0.6:
+        return 'completed'
+    return 'cancelled' if roll < 0.75 else 'booked'
+
+
+def _bookings(pages, customers, bookings_per_page, now, rng):
+    window = (PAST_DAYS + FUTURE_DAYS) * 24 * 4
+    for page in pages:
+        for _ in range(bookings_per_page):
+            # Quarter-hour slots during the (UTC) working day.
+            date = now - timedelta(days=PAST_DAYS) + timedelta(minutes=15 * rng.randrange(window))
+            date = date.replace(hour=9 + date.hour % 8, second=0, microsecond=0)
+            customer_id, email, name, company = rng.choice(customers)
+            user_input = {
+                'name': name,
+                'email': email,
+                'timezone': rng.choice(TIMEZONES),
+                'team_size': rng.choice(TEAM_SIZES),
+            }
+            if company:
+                user_input['company'] = company
+            if rng.random() < 0.3:
+                user_input['notes'] = 'Would like to discuss pricing and onboarding. ' * rng.randrange(1, 4)
+            yield Booking(
+                meeting_page=page,
+                customer_id=customer_id,
+                user_input=user_input,
+                date=date,
+                status=_status(date, now, rng),
+                attendee_email=email,
+                attendee_name=name,
+            )
+
+
+def seed(users=40, pages_per_user=3, bookings_per_page=250, customers=5000, seed=0,
+         batch_size=DEFAULT_BATCH_SIZE):
+    """Generate a benchmark dataset; returns the number of rows per model."""
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    created = {'users': _batched(_users(users), User, batch_size)}
+    user_list = list(bench_users().order_by('date_joined', 'username'))
+    created['meeting_pages'] = _batched(_pages(user_list, pages_per_user, rng), MeetingPage, batch_size)
+    created['availabilities'] = _batched(_availabilities(user_list), Availability, batch_size)
+    created['customers'] = _batched(_customers(customers, rng), Customer, batch_size)
+
+    pool = list(
+        Customer.objects.filter(email__endswith='@' + CUSTOMER_DOMAIN)
+        .order_by('email').values_list('id', 'email', 'name', 'organization')
+    )
+    pages = MeetingPage.objects.filter(user__in=user_list).order_by('slug')
+    created['bookings'] = _batched(
+        _bookings(pages, pool, bookings_per_page, now, rng), Booking, batch_size,
+    )
+
+    bookings = Booking.objects.filter(meeting_page__user__in=user_list)
+    # auto_now_add overwrote created_at; most people book about a week ahead.
+    bookings.update(created_at=Least(F('date') - timedelta(days=7), Value(now)))
+    # bulk_create skips the signals that maintain these counters.
+    for start in range(0, len(pool), batch_size):
+        recompute_customer_stats([customer_id for customer_id, *_ in pool[start:start + batch_size]])
+    reconcile_usage([user.pk for user in user_list])
+    for user in user_list:
+        invalidate_host_bookings(user.pk)
+    return created
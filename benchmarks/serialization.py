@@ -0,0 +1,61 @@
+"""
+JSON rendering and parsing benchmark for a large booking list.
+
+Serializes ``rows`` of the seeded bookings with ``BookingSerializer`` once,
+then times rendering that data and parsing the result with DRF's stdlib
+classes and with the orjson-backed ones from ``meebridge_backend``, and
+checks that both renderers produce the same bytes.
+"""
+import io
+import time
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from bookings.models import Booking
+from bookings.serializers import BookingSerializer
+from meebridge_backend.parsers import ORJSONParser
+from meebridge_backend.renderers import ORJSONRenderer, orjson
+from .runner import percentile
+from .seeding import bench_users
+
+IMPLEMENTATIONS = {
+    'stdlib': (JSONRenderer(), JSONParser()),
+    'orjson': (ORJSONRenderer(), ORJSONParser()),
+}
+
+
+def _timings(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {'p50_ms': round(percentile(samples, 50), 3), 'p95_ms': round(percentile(samples, 95), 3)}
+
+
+def run(rows=1000, iterations=50):
+    bookings = (
+        Booking.objects.filter(meeting_page__user__in=bench_users())
+        .select_related('meeting_page').order_by('-date', 'id')
+    )
+    started = time.perf_counter()
+    data = BookingSerializer(bookings[:rows], many=True).data
+    serialize_ms = (time.perf_counter() - started) * 1000
+
+    results = {}
+    documents = {}
+    for name, (renderer, parser) in IMPLEMENTATIONS.items():
+        documents[name] = body = renderer.render(data)
+        results[name] = {
+            'render': _timings(lambda: renderer.render(data), iterations),
+            'parse': _timings(lambda: parser.parse(io.BytesIO(body)), iterations),
+        }
+    return {
+        'meta': {'rows': len(data), 'iterations': iterations, 'orjson': orjson.__version__ if orjson else None},
+        'serialize_ms': round(serialize_ms, 3),
+        'bytes': len(documents['stdlib']),
+        'identical': documents['stdlib'] == documents['orjson'],
+        'results': results,
+    }
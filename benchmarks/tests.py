@@ -0,0 +1,167 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from bookings.models import Booking
+from customers.models import Customer
+from users.models import UsageCounter
+from meeting_pages.models import MeetingPage
+from .loadtest import LoadTest, parse_mix, violations
+from .runner import SCENARIOS, compare, percentile
+from .seeding import bench_users, clear_bench_data, seed
+
+
+class SeedBenchTests(TestCase):
+    def test_seed_generates_consistent_data(self):
+        created = seed(users=2, pages_per_user=2, bookings_per_page=25, customers=10, batch_size=7)
+
+        self.assertEqual(created['users'], 2)
+        self.assertEqual(created['bookings'], 100)
+        self.assertEqual(Booking.objects.count(), 100)
+        self.assertEqual(sum(Customer.objects.values_list('booking_count', flat=True)), 100)
+        self.assertFalse(Booking.objects.filter(created_at__gt=Booking.objects.values('date')[:1]).exists())
+        self.assertEqual(UsageCounter.objects.filter(user__in=bench_users()).count(), 2)
+
+        clear_bench_data()
+        self.assertFalse(bench_users().exists())
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(Customer.objects.exists())
+
+    def test_command_refuses_to_seed_twice(self):
+        call_command('seed_bench', users=1, pages_per_user=1, bookings_per_page=5, customers=3, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('seed_bench', users=1, pages_per_user=1, bookings_per_page=5, customers=3, stdout=StringIO())
+        call_command('seed_bench', users=1, pages_per_user=1, bookings_per_page=5, customers=3, reset=True,
+                     stdout=StringIO())
+        self.assertEqual(Booking.objects.count(), 5)
+
+
+class BenchCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_json_benchmark_renders_identical_documents(self):
+        seed(users=1, pages_per_user=1, bookings_per_page=20, customers=5)
+        out = StringIO()
+        call_command('bench_json', rows=10, iterations=2, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['meta']['rows'], 10)
+        self.assertTrue(report['identical'])
+        self.assertEqual(set(report['results']), {'stdlib', 'orjson'})
+
+    def test_reports_every_scenario_without_errors(self):
+        seed(users=1, pages_per_user=2, bookings_per_page=30, customers=10)
+        out = StringIO()
+        call_command('bench', iterations=3, warmup=1, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['meta']['host'], 'bench-0')
+        self.assertEqual(set(report['scenarios']), set(SCENARIOS))
+        for name, result in report['scenarios'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(Booking.objects.count(), 60 + 4)
+
+    def test_comparison_and_percentiles(self):
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+        current = {'scenarios': {'analytics': {'p50_ms': 6, 'p95_ms': 9, 'p99_ms': 12, 'queries_p50': 40}}}
+        baseline = {'scenarios': {'analytics': {'p50_ms': 8, 'p95_ms': 9, 'p99_ms': 10, 'queries_p50': 70}}}
+        self.assertEqual(compare(current, baseline)['analytics'], {
+            'p50_ms_change_pct': -25.0, 'p95_ms_change_pct': 0.0,
+            'p99_ms_change_pct': 20.0, 'queries_p50_change': -30,
+        })
+
+    def test_requires_seeded_data(self):
+        with self.assertRaises(CommandError):
+            call_command('bench', stdout=StringIO())
+
+
+class LoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        seed(users=1, pages_per_user=1, bookings_per_page=20, customers=5)
+        self.pages = list(MeetingPage.objects.all())
+
+    def test_journeys_run_against_a_live_server(self):
+        load_test = LoadTest(self.live_server_url, self.pages, mix=parse_mix('browse=1,book=2,manage=1'),
+                             concurrency=1, journeys=12, attendees=3, days=20)
+        report = load_test.run()
+
+        self.assertEqual(report['summary']['journeys'], 12)
+        self.assertEqual(report['summary']['error_rate'], 0)
+        self.assertEqual(report['steps']['public_page']['status_codes'], {'200': 12})
+        self.assertGreater(report['summary']['bookings_created'], 0)
+        self.assertEqual(violations(report), {})
+
+    def test_invariant_violations_are_reported(self):
+        load_test = LoadTest(self.live_server_url, self.pages)
+        load_test.started_at = timezone.now()
+        page = self.pages[0]
+        start = timezone.now() + timedelta(days=400)
+        first = Booking.objects.create(meeting_page=page, date=start, attendee_email='a@bench.example.com')
+        Booking.objects.create(meeting_page=page, date=start + timedelta(minutes=page.duration_minutes - 1))
+        Customer.objects.bulk_create([Customer(email='a@bench.example.com'), Customer(email='a@bench.example.com')])
+        Booking.objects.filter(pk=first.pk).update(customer=None)
+        load_test.attendee_emails = {'a@bench.example.com'}
+        load_test.created_ids = [str(first.pk)]
+
+        self.assertEqual(violations({'invariants': load_test.check_invariants()}), {
+            'double_bookings': 1,
+            'duplicate_customers': 1,
+            'bookings_without_customer': 1,
+            'unreported_bookings': 1,
+        })
+
+    def test_mix_is_validated(self):
+        self.assertEqual(parse_mix('browse=3, book=1'), {'browse': 3, 'book': 1})
+        for value in ('browse=x', 'checkout=1', 'browse=0'):
+            with self.assertRaises(ValueError):
+                parse_mix(value)
+
+
+class ConcurrentBookingTests(SimpleTestCase):
+    """
+    Runs ``loadtest`` in a subprocess against a throwaway SQLite file: the
+    test database is in memory and shared by the live server's threads,
+    so it cannot show two requests racing for the same slot.
+    """
+
+    def manage(self, *args):
+        return subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+            env=self.env, capture_output=True, text=True, timeout=300,
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.env = {**os.environ, 'DATABASE_ENGINE': 'sqlite',
+                    'DATABASE_NAME': os.path.join(directory.name, 'db.sqlite3')}
+        self.report_path = os.path.join(directory.name, 'report.json')
+        for args in (('migrate', '-v0'), ('seed_bench', '--users', '1', '--pages-per-user', '1',
+                                          '--bookings-per-page', '5', '--customers', '5')):
+            result = self.manage(*args)
+            self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_racing_bookings_never_share_a_slot(self):
+        # Eight visitors booking within a single day compete for few slots.
+        result = self.manage('loadtest', '--concurrency', '8', '--journeys', '40', '--mix', 'book=1',
+                             '--days', '1', '--attendees', '5', '--output', self.report_path)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        with open(self.report_path) as handle:
+            report = json.load(handle)
+        self.assertEqual(report['invariants']['double_bookings'], 0)
+        self.assertGreater(report['summary']['bookings_created'], 0)
@@ -0,0 +1,250 @@
+"""
+Bulk booking operations for hosts: status transitions and file imports.
+
+Imports read the uploaded file one row at a time and insert in batches, so
+memory is bounded by ``batch_size`` plus the host's active bookings, which
+are kept in memory for overlap checks.
+"""
+import json
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from customers.activity import customers_for_attendees, record_bulk_bookings, record_bulk_cancellations
+from customers.bulk import MAX_REPORTED_ERRORS, iter_rows
+from meebridge_backend import metrics
+from meeting_pages.validation import UserInputError, get_user_input_validator
+from users.quotas import consume_imported_bookings
+from .caching import invalidate_host_bookings
+from .emails import queue_booking_emails
+from .models import Booking
+from .serializers import BookingImportSerializer, localize_appointment
+
+BULK_TRANSITIONS = {'cancel': 'cancelled', 'complete': 'completed'}
+DEFAULT_BATCH_SIZE = 2000
+IMPORT_FIELDS = ['date', 'status', 'attendee_email', 'attendee_name', 'notes']
+
+
+def apply_bulk_status(owner, action, ids=None, date_from=None, date_to=None, chunk_size=DEFAULT_BATCH_SIZE):
+    """
+    Move the owner's active bookings matching ``ids`` and/or the date range
+    to the status for ``action`` with one UPDATE, and return a summary.
+
+    ``update()`` skips the booking signals, so the moved rows are read back
+    in chunks, recognised by the ``updated_at`` they were given, to adjust
+    customer cancel counts and queue cancellation emails chunk by chunk.
+    """
+    new_status = BULK_TRANSITIONS[action]
+    bookings = Booking.objects.filter(meeting_page__user=owner)
+    if ids is not None:
+        bookings = bookings.filter(pk__in=ids)
+    if date_from is not None:
+        bookings = bookings.filter(date__gte=date_from)
+    if date_to is not None:
+        bookings = bookings.filter(date__lt=date_to)
+
+    updated_at = timezone.now()
+    updated_ids = set()
+    with transaction.atomic():
+        updated = bookings.filter(status='booked').update(status=new_status, updated_at=updated_at)
+        moved = bookings.filter(status=new_status, updated_at=updated_at)
+        if action == 'cancel':
+            # Full rows (with page and host) are needed for the emails.
+            chunk = []
+            for booking in moved.select_related('meeting_page__user').iterator(chunk_size=chunk_size):
+                chunk.append(booking)
+                if len(chunk) >= chunk_size:
+                    _after_cancel(chunk)
+                    chunk = []
+                if ids is not None:
+                    updated_ids.add(booking.pk)
+            _after_cancel(chunk)
+        elif ids is not None:
+            updated_ids.update(moved.values_list('pk', flat=True).iterator(chunk_size=chunk_size))
+        invalidate_host_bookings(owner.pk)
+
+    summary = {'action': action, 'status': new_status, 'updated': updated}
+    if ids is not None:
+        summary['not_updated'] = sorted(str(pk) for pk in set(ids) - updated_ids)
+    return summary
+
+
+def _after_cancel(bookings):
+    if bookings:
+        record_bulk_cancellations(Counter(booking.customer_id for booking in bookings))
+        queue_booking_emails(bookings, action='cancelled')
+
+
+class _Calendar:
+    """A host's active bookings, bucketed by day for overlap checks."""
+
+    def __init__(self, owner_id):
+        self.buckets = defaultdict(list)
+        rows = Booking.objects.filter(meeting_page__user_id=owner_id, status='booked').values_list(
+            'date', 'meeting_page__duration_minutes',
+        )
+        for start, minutes in rows.iterator(chunk_size=5000):
+            self.add(start, start + timedelta(minutes=minutes))
+
+    @staticmethod
+    def _days(start, end):
+        # An interval is filed under every day it touches, so a lookup only
+        # needs the days of the interval being checked.
+        return range(int(start.timestamp() // 86400), int(end.timestamp() // 86400) + 1)
+
+    def add(self, start, end):
+        for day in self._days(start, end):
+            self.buckets[day].append((start, end))
+
+    def overlaps(self, start, end):
+        return any(
+            other_start < end and start < other_end
+            for day in self._days(start, end)
+            for other_start, other_end in self.buckets.get(day, ())
+        )
+
+
+def _prepare_row(row):
+    """
+    Map a raw row onto serializer input; unknown columns land in user_input.
+
+    Returns ``(data, errors)``.
+    """
+    user_input = row.get('user_input') or {}
+    if isinstance(user_input, str):
+        try:
+            user_input = json.loads(user_input)
+        except ValueError:
+            return None, {'user_input': ['Must be a JSON object.']}
+    if not isinstance(user_input, dict):
+        return None, {'user_input': ['Must be a JSON object.']}
+
+    for key, value in row.items():
+        if key is None or key in IMPORT_FIELDS or key in ('user_input', 'meeting_page'):
+            continue
+        if value not in (None, ''):
+            user_input.setdefault(key, value)
+
+    data = {field: row[field] for field in IMPORT_FIELDS if row.get(field) not in (None, '')}
+    data['user_input'] = user_input
+    return data, None
+
+
+class BookingImport:
+    """Validate rows against one meeting page and insert them in batches."""
+
+    def __init__(self, meeting_page, send_emails=True, batch_size=DEFAULT_BATCH_SIZE):
+        self.meeting_page = meeting_page
+        self.send_emails = send_emails
+        self.batch_size = batch_size
+        self.duration = timedelta(minutes=meeting_page.duration_minutes)
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.emails_queued = 0
+
+    def _record_error(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line_number, 'errors': errors})
+
+    def _validate(self, row, validator, validate_user_input, calendar):
+        data, errors = _prepare_row(row)
+        if errors:
+            return None, errors
+        try:
+            validated = validator.run_validation(data)
+            validate_user_input(validated.get('user_input') or {})
+        except serializers.ValidationError as exc:
+            return None, serializers.as_serializer_error(exc)
+        except UserInputError as exc:
+            return None, {'user_input': exc.errors}
+
+        validated['date'] = localize_appointment(validated['date'], validated.get('user_input') or {})
+        validated.setdefault('status', 'booked')
+        if validated['status'] == 'booked':
+            end = validated['date'] + self.duration
+            if calendar.overlaps(validated['date'], end):
+                return None, {'date': ['Overlaps another active booking.']}
+            calendar.add(validated['date'], end)
+        return validated, None
+
+    def run(self, stream, file_format):
+        """
+        Import the file and return the report. Each batch commits on its own
+        with its customer stats, quota and emails, so when a batch raises
+        ``QuotaExceeded`` (or the file turns out unreadable) the earlier ones
+        stay imported and ``report()`` describes them.
+        """
+        # Shared across rows: building serializer fields or compiling the
+        # page's form config per row would dominate the import.
+        validator = BookingImportSerializer()
+        validate_user_input = get_user_input_validator(self.meeting_page)
+        calendar = _Calendar(self.meeting_page.user_id)
+
+        batch = []
+        for line_number, row, errors in iter_rows(stream, file_format):
+            validated = None
+            if errors is None:
+                validated, errors = self._validate(row, validator, validate_user_input, calendar)
+            if errors is not None:
+                self._record_error(line_number, errors)
+                continue
+            batch.append(validated)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return self.report()
+
+    def _flush(self, batch):
+        with transaction.atomic():
+            # Counted first so that a missing usage row is created from the
+            # bookings that exist before this batch.
+            consume_imported_bookings(self.meeting_page.user, len(batch))
+            customers = customers_for_attendees(
+                self.meeting_page.user,
+                [(data.get('attendee_email'), data.get('attendee_name', ''), data.get('user_input'))
+                 for data in batch],
+            )
+            bookings = []
+            for data in batch:
+                user_input = data.get('user_input') or {}
+                customer = customers.get(data.get('attendee_email') or user_input.get('email'))
+                data.setdefault('attendee_email', None)
+                bookings.append(Booking(meeting_page=self.meeting_page, customer=customer, **data))
+            Booking.objects.bulk_create(bookings)
+
+            # bulk_create skips the booking signals.
+            counts = defaultdict(lambda: [0, 0])
+            for booking in bookings:
+                if booking.customer_id:
+                    counts[booking.customer_id][0] += 1
+                    counts[booking.customer_id][1] += booking.status == 'cancelled'
+            record_bulk_bookings(
+                {pk: tuple(pair) for pk, pair in counts.items()},
+                bookings[0].created_at,
+                bookings[-1].created_at,
+            )
+            invalidate_host_bookings(self.meeting_page.user_id)
+            if self.send_emails:
+                now = timezone.now()
+                to_notify = [b for b in bookings if b.status == 'booked' and b.date > now]
+                queue_booking_emails(to_notify, action='created')
+                self.emails_queued += len(to_notify)
+
+        self.created += len(bookings)
+        metrics.bookings_created.inc(len(bookings), source='import')
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'emails_queued': self.emails_queued,
+        }
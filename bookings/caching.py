@@ -0,0 +1,45 @@
+"""
+Cache keys for data derived from a host's bookings.
+
+Available slots and the analytics summary are cached in the per-host
+``bookings`` namespace of ``meebridge_backend.caching``. Saving or deleting a
+booking or meeting page invalidates the host's namespace through the signal
+handlers; code that writes with ``update()`` or ``bulk_create`` calls
+``invalidate_host_bookings`` itself.
+"""
+from django.core.exceptions import ValidationError
+
+from meebridge_backend.caching import invalidate
+from meeting_pages.models import MeetingPage
+from .models import Booking
+
+BOOKINGS_NAMESPACE = 'bookings'
+
+
+def invalidate_host_bookings(user_id):
+    invalidate(BOOKINGS_NAMESPACE, user_id)
+
+
+def booking_host_id(booking):
+    if Booking.meeting_page.is_cached(booking):
+        return booking.meeting_page.user_id
+    return MeetingPage.objects.filter(pk=booking.meeting_page_id).values_list('user_id', flat=True).first()
+
+
+def available_slots_key(request):
+    params = request.query_params
+    meeting_page_id, date = params.get('meeting_page_id'), params.get('date')
+    if not meeting_page_id or not date:
+        return None
+    try:
+        host_id = MeetingPage.objects.filter(id=meeting_page_id, active=True).values_list('user_id', flat=True).first()
+    except ValidationError:
+        return None
+    if host_id is None:
+        # Not cached, so the view reports the missing page.
+        return None
+    return host_id, ('slots', meeting_page_id, date, params.get('timezone', ''))
+
+
+def analytics_key(request):
+    return request.user.pk, ('analytics',)
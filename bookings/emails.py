@@ -1,19 +1,32 @@
+import atexit
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Literal, Optional
+from typing import Iterable, Literal, Optional
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, connections, transaction
 from django.utils import timezone
 from django.utils.html import escape
 
+from meebridge_backend import metrics
+
 from .models import Booking
 
 logger = logging.getLogger(__name__)
 
+_executor = None
+
 DEFAULT_PRIMARY_COLOR = "#4f46e5"
 DEFAULT_ACCENT_COLOR = "#7c3aed"
+STATUS_LINES = {
+    "created": "confirmed",
+    "updated": "updated",
+    "rescheduled": "rescheduled",
+    "cancelled": "cancelled",
+}
 
 
 def _get_recipient_email(booking: Booking) -> Optional[str]:
@@ -256,19 +269,22 @@ def _build_html_body(
     return html
 
 
-def send_booking_email(booking: Booking, *, action: Literal["created", "updated"] = "created") -> None:
+EmailAction = Literal["created", "updated", "rescheduled", "cancelled"]
+
+
+def build_booking_email(booking: Booking, action: EmailAction = "created") -> Optional[EmailMultiAlternatives]:
     """
-    Send a confirmation email to the attendee.
+    Build the confirmation (or change) email for the attendee, if one can be sent.
     """
     recipient = _get_recipient_email(booking)
     if not recipient:
         logger.info("Skipping email for booking %s: no recipient found", booking.id)
-        return
+        return None
 
     from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "") or getattr(settings, "EMAIL_HOST_USER", "")
     if not from_email:
         logger.warning("Cannot send email for booking %s: DEFAULT_FROM_EMAIL not configured", booking.id)
-        return
+        return None
 
     meeting_title = booking.meeting_page.title if booking.meeting_page else "Meeting"
     meeting_owner = (
@@ -278,7 +294,7 @@ def send_booking_email(booking: Booking, *, action: Literal["created", "updated"
     )
 
     schedule_line, timezone_label = _format_schedule(booking)
-    status_line = "confirmed" if action == "created" else "updated"
+    status_line = STATUS_LINES[action]
     subject = f"Your booking is {status_line} - {meeting_title}"
     meeting_link = getattr(settings, "GOOGLE_MEET_LINK", None)
 
@@ -316,15 +332,76 @@ def send_booking_email(booking: Booking, *, action: Literal["created", "updated"
         accent_light=accent_light,
     )
 
+    message = EmailMultiAlternatives(subject, text_body, from_email, [recipient])
+    message.attach_alternative(html_body, "text/html")
+    return message
+
+
+def send_booking_email(booking: Booking, *, action: EmailAction = "created") -> None:
+    """
+    Send a confirmation (or change) email to the attendee.
+    """
+    message = build_booking_email(booking, action)
+    if message is None:
+        return
     try:
-        send_mail(
-            subject,
-            text_body,
-            from_email,
-            [recipient],
-            fail_silently=False,
-            html_message=html_body,
-        )
+        message.send(fail_silently=False)
     except Exception:  # noqa: BLE001
-        logger.exception("Failed to send booking %s email to %s", booking.id, recipient)
+        logger.exception("Failed to send booking %s email to %s", booking.id, message.to[0])
+        metrics.booking_emails.inc(action=action, outcome="failed")
+    else:
+        metrics.booking_emails.inc(action=action, outcome="sent")
 
+
+def send_booking_emails(bookings: Iterable[Booking], *, action: EmailAction) -> int:
+    """
+    Send one email per booking over a single mail connection; returns how many were sent.
+    """
+    messages = [message for message in (build_booking_email(b, action) for b in bookings) if message]
+    if not messages:
+        return 0
+    try:
+        sent = get_connection(fail_silently=False).send_messages(messages) or 0
+    except Exception:  # noqa: BLE001
+        logger.exception("Failed to send %d booking %s emails", len(messages), action)
+        sent = 0
+    metrics.booking_emails.inc(sent, action=action, outcome="sent")
+    metrics.booking_emails.inc(len(messages) - sent, action=action, outcome="failed")
+    return sent
+
+
+def _send_in_background(bookings: list, action: EmailAction) -> int:
+    close_old_connections()
+    try:
+        return send_booking_emails(bookings, action=action)
+    finally:
+        # Nothing else ends a request in this thread, so its connection
+        # would stay open for the life of the process.
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="booking-emails")
+        # Send what is still queued before the process exits.
+        atexit.register(_executor.shutdown, wait=True)
+    return _executor
+
+
+def queue_booking_emails(bookings: Iterable[Booking], *, action: EmailAction) -> None:
+    """
+    Send a batch of emails once the current transaction commits.
+
+    With ``BOOKING_BULK_EMAIL_DELIVERY = 'background'`` the batch is handed
+    to a worker thread so bulk requests do not wait on SMTP, and the queue
+    is drained when the process exits normally; ``'sync'`` sends it in the
+    committing thread.
+    """
+    bookings = list(bookings)
+    if not bookings:
+        return
+    if settings.BOOKING_BULK_EMAIL_DELIVERY == "background":
+        transaction.on_commit(lambda: _get_executor().submit(_send_in_background, bookings, action))
+    else:
+        transaction.on_commit(lambda: send_booking_emails(bookings, action=action))
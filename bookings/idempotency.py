@@ -0,0 +1,117 @@
+"""
+``Idempotency-Key`` support for public booking creation.
+
+The first request with a key inserts an ``IdempotencyRecord`` in the same
+transaction as the booking, and stores the response in it. A concurrent
+duplicate blocks on the unique ``(meeting_page, key)`` index until that
+transaction finishes. A retry within ``BOOKING_IDEMPOTENCY_TTL`` gets the
+stored response back without the booking tables being touched. Reusing a
+key with a different payload is rejected.
+"""
+import hashlib
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(exceptions.APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used with a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+class IdempotencyKeyInUse(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is already being processed.'
+    default_code = 'idempotency_key_in_use'
+
+
+def expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.BOOKING_IDEMPOTENCY_TTL)
+
+
+def request_hash(data):
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotentRequest:
+    def __init__(self, key, meeting_page_id, fingerprint):
+        self.key = key
+        self.meeting_page_id = meeting_page_id
+        self.fingerprint = fingerprint
+        self.record = None
+
+    @classmethod
+    def from_request(cls, request):
+        """Return ``None`` when the request carries no usable key."""
+        key = request.headers.get(HEADER)
+        if key is None:
+            return None
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise exceptions.ValidationError({HEADER: [f'Must be 1 to {MAX_KEY_LENGTH} characters.']})
+        if not hasattr(request.data, 'get'):
+            return None
+        try:
+            meeting_page_id = uuid.UUID(str(request.data.get('meeting_page')))
+        except ValueError:
+            return None  # the serializer rejects the request
+        return cls(key, meeting_page_id, request_hash(request.data))
+
+    def stored_response(self):
+        """The replayed response for this key, or ``None``."""
+        record = IdempotencyRecord.objects.filter(
+            meeting_page_id=self.meeting_page_id,
+            key=self.key,
+            created_at__gte=expiry_cutoff(),
+        ).first()
+        if record is None:
+            return None
+        if record.request_hash != self.fingerprint:
+            raise IdempotencyKeyReused()
+        if record.response_status is None:
+            raise IdempotencyKeyInUse()
+        response = Response(record.response_body, status=record.response_status)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def claim(self):
+        """
+        Reserve the key inside the caller's transaction.
+
+        Returns ``False`` when another request already holds it.
+        """
+        IdempotencyRecord.objects.filter(
+            meeting_page_id=self.meeting_page_id, key=self.key, created_at__lt=expiry_cutoff(),
+        ).delete()
+        try:
+            with transaction.atomic():
+                self.record = IdempotencyRecord.objects.create(
+                    meeting_page_id=self.meeting_page_id, key=self.key, request_hash=self.fingerprint,
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def store(self, response_status, body):
+        self.record.response_status = response_status
+        self.record.response_body = body
+        self.record.save(update_fields=['response_status', 'response_body'])
+
+
+def purge_expired_records():
+    deleted, _ = IdempotencyRecord.objects.filter(created_at__lt=expiry_cutoff()).delete()
+    return deleted
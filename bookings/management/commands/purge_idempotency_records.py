@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bookings.idempotency import purge_expired_records
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than BOOKING_IDEMPOTENCY_TTL"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_records()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency records"))
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+
+
+def link_bookings_to_customers(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    Customer = apps.get_model('customers', 'Customer')
+    alias = schema_editor.connection.alias
+
+    # Earliest customer wins when several share an email.
+    customer_by_email = {}
+    for customer_id, email in (
+        Customer.objects.using(alias).exclude(email=None).exclude(email='')
+        .order_by('-created_at').values_list('id', 'email').iterator()
+    ):
+        customer_by_email[email] = customer_id
+
+    batch = []
+    for booking in Booking.objects.using(alias).only('id', 'attendee_email', 'user_input').iterator(chunk_size=2000):
+        email = booking.attendee_email or (booking.user_input or {}).get('email')
+        customer_id = customer_by_email.get(email)
+        if customer_id:
+            booking.customer_id = customer_id
+            batch.append(booking)
+        if len(batch) >= 2000:
+            Booking.objects.using(alias).bulk_update(batch, ['customer'])
+            batch = []
+    if batch:
+        Booking.objects.using(alias).bulk_update(batch, ['customer'])
+
+    rows = (
+        Booking.objects.using(alias).exclude(customer=None).values('customer').order_by()
+        .annotate(
+            total=Count('id'),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            first=Min('created_at'),
+            last=Max('created_at'),
+        )
+    )
+    for row in rows.iterator():
+        Customer.objects.using(alias).filter(pk=row['customer']).update(
+            booking_count=row['total'],
+            cancel_count=row['cancelled'],
+            first_booked_at=row['first'],
+            last_booked_at=row['last'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_management_token'),
+        ('customers', '0005_customer_booking_stats'),
+        ('meeting_pages', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='customers.customer'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['customer', '-date'], name='booking_customer_timeline'),
+        ),
+        migrations.RunPython(link_bookings_to_customers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:39
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_customer'),
+        ('meeting_pages', '0003_meetingpage_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('request_hash', models.CharField(max_length=64)),
+                ('response_status', models.PositiveSmallIntegerField(null=True)),
+                ('response_body', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('meeting_page', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='meeting_pages.meetingpage')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('meeting_page', 'key'), name='booking_idempotency_key_per_page')],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth import get_user_model
 from meeting_pages.models import MeetingPage
@@ -43,6 +44,14 @@ class Booking(models.Model):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     meeting_page = models.ForeignKey(MeetingPage, on_delete=models.CASCADE, related_name='bookings')
+    customer = models.ForeignKey(
+        'customers.Customer',
+        on_delete=models.SET_NULL,
+        related_name='bookings',
+        blank=True,
+        null=True,
+        db_index=False,  # covered by the (customer, -date) timeline index
+    )
     user_input = models.JSONField(default=dict, help_text="Form data submitted by the user")
     date = models.DateTimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='booked')
@@ -55,6 +64,43 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['customer', '-date'], name='booking_customer_timeline'),
+        ]
 
     def __str__(self):
         return f"Booking {self.id} - {self.attendee_email or 'No email'} - {self.date}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_state()
+        return instance
+
+    def _remember_loaded_state(self):
+        # Lets the customer stats signal handlers tell what changed on save.
+        self._loaded_status = self.__dict__.get('status')
+        self._loaded_customer_id = self.__dict__.get('customer_id')
+
+
+class IdempotencyRecord(models.Model):
+    """Response stored for an ``Idempotency-Key`` sent with a public booking."""
+    meeting_page = models.ForeignKey(
+        MeetingPage,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False,  # covered by the unique (meeting_page, key) constraint
+    )
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['meeting_page', 'key'], name='booking_idempotency_key_per_page'),
+        ]
+
+    def __str__(self):
+        return f"{self.meeting_page_id}:{self.key}"
@@ -0,0 +1,111 @@
+"""
+Attendee-initiated changes to a booking, authorised by its management token.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import exceptions, status
+
+from .emails import send_booking_email
+from .models import Booking
+from .serializers import booking_timezone
+
+# Longest meeting considered when looking for overlapping bookings.
+MAX_MEETING_LENGTH = timedelta(hours=24)
+
+
+class BookingConflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'That time is no longer available.'
+    default_code = 'booking_conflict'
+
+
+class BookingNotChangeable(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Only upcoming, active bookings can be changed.'
+    default_code = 'booking_not_changeable'
+
+
+def _duration(meeting_page):
+    return timedelta(minutes=meeting_page.duration_minutes)
+
+
+def lock_host(user_id):
+    """
+    Lock the host's user row until the transaction ends. Everything that
+    checks a host's calendar before writing to it takes this lock first,
+    so two writers cannot both see the same time as free.
+    """
+    get_user_model().objects.select_for_update().only('pk').get(pk=user_id)
+
+
+def find_conflict(meeting_page, start, exclude=None):
+    """Another active booking of the page's host overlapping ``start``."""
+    end = start + _duration(meeting_page)
+    candidates = (
+        Booking.objects.filter(
+            meeting_page__user_id=meeting_page.user_id,
+            status='booked',
+            date__gt=start - MAX_MEETING_LENGTH,
+            date__lt=end,
+        )
+        .select_related('meeting_page')
+    )
+    if exclude is not None:
+        candidates = candidates.exclude(pk=exclude.pk)
+    for other in candidates:
+        if other.date + _duration(other.meeting_page) > start:
+            return other
+    return None
+
+
+def _locked_booking(token):
+    booking = (
+        Booking.objects.select_for_update(of=('self',))
+        .select_related('meeting_page__user')
+        .filter(management_token=token)
+        .first()
+    )
+    if booking is None:
+        raise exceptions.NotFound()
+    if booking.status != 'booked' or booking.date <= timezone.now():
+        raise BookingNotChangeable()
+    return booking
+
+
+@transaction.atomic
+def cancel_booking(token):
+    booking = _locked_booking(token)
+    booking.status = 'cancelled'
+    booking.save(update_fields=['status', 'updated_at'])
+    transaction.on_commit(lambda: send_booking_email(booking, action='cancelled'))
+    return booking
+
+
+@transaction.atomic
+def reschedule_booking(token, start):
+    """
+    Move the booking to ``start`` if the host is free then.
+
+    The booking row is locked for the update, and the host (``lock_host``)
+    for the conflict check. The form's ``selected_date``/
+    ``selected_time`` follow the new time so the slot listing shows it
+    correctly.
+    """
+    booking = _locked_booking(token)
+    lock_host(booking.meeting_page.user_id)
+    if find_conflict(booking.meeting_page, start, exclude=booking):
+        raise BookingConflict()
+
+    user_input = dict(booking.user_input or {})
+    local_start = start.astimezone(booking_timezone(user_input))
+    if 'selected_date' in user_input or 'selected_time' in user_input:
+        user_input['selected_date'] = local_start.date().isoformat()
+        user_input['selected_time'] = local_start.strftime('%H:%M')
+    booking.date = start
+    booking.user_input = user_input
+    booking.save(update_fields=['date', 'user_input', 'updated_at'])
+    transaction.on_commit(lambda: send_booking_email(booking, action='rescheduled'))
+    return booking
@@ -2,7 +2,32 @@ from rest_framework import serializers
 from django.utils import timezone
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from .models import Booking, Availability
+from meeting_pages.models import MeetingPage
 from meeting_pages.serializers import MeetingPageSerializer
+from meeting_pages.validation import UserInputError, get_user_input_validator
+
+
+def booking_timezone(user_input):
+    """The attendee's timezone from the booking form, or the default one."""
+    tz_key = (
+        user_input.get('timezone')
+        or user_input.get('time_zone')
+        or user_input.get('timeZone')
+    )
+    if tz_key:
+        try:
+            return ZoneInfo(tz_key)
+        except ZoneInfoNotFoundError:
+            pass
+    return timezone.get_default_timezone()
+
+
+def localize_appointment(appointment_dt, user_input):
+    """Interpret a naive appointment time in the attendee's timezone."""
+    if timezone.is_naive(appointment_dt):
+        localized = timezone.make_aware(appointment_dt, booking_timezone(user_input))
+        return localized.astimezone(timezone.utc)
+    return appointment_dt
 
 
 class AvailabilitySerializer(serializers.ModelSerializer):
@@ -24,11 +49,11 @@ class BookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = [
-            'id', 'meeting_page', 'meeting_page_id', 'user_input', 'date',
+            'id', 'meeting_page', 'meeting_page_id', 'customer', 'user_input', 'date',
             'status', 'attendee_email', 'attendee_name', 'notes',
-            'created_at', 'updated_at'
+            'management_token', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'customer', 'management_token', 'created_at', 'updated_at']
 
 
 class BookingCreateSerializer(serializers.ModelSerializer):
@@ -41,6 +66,8 @@ class BookingCreateSerializer(serializers.ModelSerializer):
             'attendee_name', 'notes', 'status'
         ]
         extra_kwargs = {
+            # The owner is needed for quota checks and notifications.
+            'meeting_page': {'queryset': MeetingPage.objects.select_related('user')},
             'attendee_email': {'required': False, 'allow_null': True, 'allow_blank': True},
             'attendee_name': {'required': False, 'allow_blank': True},
             'notes': {'required': False, 'allow_blank': True},
@@ -51,6 +78,13 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         # Ensure meeting_page is provided
         if 'meeting_page' not in attrs or attrs['meeting_page'] is None:
             raise serializers.ValidationError({'meeting_page': 'Meeting page is required.'})
+
+        # Check the submitted form against the page's field configuration
+        validate_user_input = get_user_input_validator(attrs['meeting_page'])
+        try:
+            validate_user_input(attrs.get('user_input') or {})
+        except UserInputError as exc:
+            raise serializers.ValidationError({'user_input': exc.errors})
         return attrs
 
     def create(self, validated_data):
@@ -62,21 +96,53 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         appointment_dt = validated_data.get('date')
         user_input = validated_data.get('user_input') or {}
 
-        if appointment_dt and timezone.is_naive(appointment_dt):
-            tz_key = (
-                user_input.get('timezone')
-                or user_input.get('time_zone')
-                or user_input.get('timeZone')
-            )
-            tzinfo = timezone.get_default_timezone()
-            if tz_key:
-                try:
-                    tzinfo = ZoneInfo(tz_key)
-                except ZoneInfoNotFoundError:
-                    pass
-
-            localized = timezone.make_aware(appointment_dt, tzinfo)
-            validated_data['date'] = localized.astimezone(timezone.utc)
+        if appointment_dt:
+            validated_data['date'] = localize_appointment(appointment_dt, user_input)
 
         return super().create(validated_data)
 
+
+
+class BookingManageSerializer(serializers.Serializer):
+    """An attendee's change to their own booking."""
+    action = serializers.ChoiceField(choices=['cancel', 'reschedule'])
+    date = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if attrs['action'] == 'reschedule':
+            if 'date' not in attrs:
+                raise serializers.ValidationError({'date': 'This field is required to reschedule.'})
+            attrs['date'] = localize_appointment(attrs['date'], self.context['booking'].user_input or {})
+            if attrs['date'] <= timezone.now():
+                raise serializers.ValidationError({'date': 'Choose a time in the future.'})
+        return attrs
+
+
+class BookingBulkStatusSerializer(serializers.Serializer):
+    """Bookings to transition, selected by id or by a ``[date_from, date_to)`` range."""
+    action = serializers.ChoiceField(choices=['cancel', 'complete'])
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False, max_length=5000)
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if 'ids' not in attrs and not ('date_from' in attrs and 'date_to' in attrs):
+            raise serializers.ValidationError('Provide ids or both date_from and date_to.')
+        if 'date_from' in attrs and 'date_to' in attrs and attrs['date_from'] >= attrs['date_to']:
+            raise serializers.ValidationError({'date_to': 'Must be after date_from.'})
+        return attrs
+
+
+class BookingImportSerializer(serializers.ModelSerializer):
+    """One row of a booking import; the meeting page is fixed per file."""
+
+    class Meta:
+        model = Booking
+        fields = ['date', 'status', 'attendee_email', 'attendee_name', 'notes', 'user_input']
+        extra_kwargs = {
+            'attendee_email': {'required': False, 'allow_null': True, 'allow_blank': True},
+            'attendee_name': {'required': False, 'allow_blank': True},
+            'notes': {'required': False, 'allow_blank': True},
+            'status': {'required': False},
+            'user_input': {'required': False},
+        }
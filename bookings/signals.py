@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from customers.activity import recompute_customer_stats, record_booking, record_status_change
+from .caching import booking_host_id, invalidate_host_bookings
+from .models import Booking
+
+
+@receiver(post_save, sender=Booking)
+def update_customer_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        record_booking(instance.customer_id, instance.status, instance.created_at)
+    elif not hasattr(instance, '_loaded_status'):
+        # Saved without being loaded first, so there is nothing to diff against.
+        recompute_customer_stats([instance.customer_id])
+    elif instance._loaded_customer_id != instance.customer_id:
+        recompute_customer_stats([instance._loaded_customer_id, instance.customer_id])
+    else:
+        record_status_change(instance.customer_id, instance._loaded_status, instance.status)
+
+    instance._remember_loaded_state()
+
+
+@receiver(post_delete, sender=Booking)
+def update_customer_stats_on_delete(sender, instance, **kwargs):
+    if instance.customer_id:
+        recompute_customer_stats([instance.customer_id])
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_host_cache(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_host_bookings(booking_host_id(instance))
@@ -1,3 +1,450 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from meeting_pages.models import MeetingPage
+from meeting_pages.validation import get_user_input_validator
+from users.quotas import QuotaExceeded
+from . import emails
+from .bulk import BookingImport, apply_bulk_status
+from .emails import queue_booking_emails
+from .idempotency import IdempotentRequest
+from .models import Booking, IdempotencyRecord
+from .throttling import TokenBucketThrottle
+
+User = get_user_model()
+
+FIELDS = [
+    {'name': 'name', 'type': 'text', 'required': True, 'maxLength': 20},
+    {'name': 'email', 'type': 'email', 'required': True},
+    {'name': 'phone', 'type': 'tel'},
+    {'name': 'team', 'type': 'select', 'options': [{'label': 'Small', 'value': 'small'}, 'large']},
+    {'name': 'agree', 'type': 'checkbox', 'required': True},
+]
+
+
+class BookingUserInputValidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro', fields=FIELDS)
+        self.client = APIClient()
+
+    def book(self, user_input):
+        return self.client.post('/api/public/bookings/', {
+            'meeting_page': str(self.page.id),
+            'date': (timezone.now() + timedelta(days=1)).isoformat(),
+            'user_input': user_input,
+        }, format='json')
+
+    def test_valid_input_is_accepted(self):
+        response = self.book({
+            'name': 'Ann', 'email': 'ann@example.com', 'phone': '+1 (555) 010-2030',
+            'team': 'small', 'agree': True, 'selected_time': '10:00',
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_invalid_input_is_rejected_per_field(self):
+        response = self.book({'name': 'x' * 21, 'email': 'nope', 'phone': 'call me', 'team': 'huge'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['user_input']), {'name', 'email', 'phone', 'team', 'agree'})
+        self.assertFalse(Booking.objects.exists())
+
+    def test_oversized_payload_is_rejected(self):
+        response = self.book({'name': 'Ann', 'email': 'ann@example.com', 'agree': True, 'blob': 'x' * 20000})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data['user_input'])
+
+    def test_validator_is_cached_until_page_changes(self):
+        validator = get_user_input_validator(self.page)
+        self.assertIs(get_user_input_validator(MeetingPage.objects.get(pk=self.page.pk)), validator)
+        self.page.fields = []
+        self.page.save()
+        self.assertIsNot(get_user_input_validator(self.page), validator)
+        self.assertEqual(self.book({}).status_code, 201)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        'public_slots_ip_burst': '3/min',
+        'public_slots_ip_sustained': '5/day',
+        'public_slots_page_burst': '4/min',
+    },
+})
+class PublicThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro')
+        self.other_page = MeetingPage.objects.create(user=self.user, title='Demo', slug='demo')
+        self.client = APIClient()
+        self.now = 1_000_000.0
+        patcher = mock.patch.object(TokenBucketThrottle, 'timer', lambda throttle: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def slots(self, page, ip='10.0.0.1', **headers):
+        return self.client.get(
+            '/api/public/bookings/available-slots/',
+            {'meeting_page_id': str(page.id), 'date': '2030-01-07'},
+            REMOTE_ADDR=ip, **headers,
+        )
+
+    def test_burst_limit_sets_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.slots(self.page).status_code, 200)
+        response = self.slots(self.page)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
+
+        # Tokens refill at the burst rate until the sustained bucket runs dry.
+        self.now += 20
+        self.assertEqual(self.slots(self.page).status_code, 200)
+        self.now += 60
+        self.assertEqual(self.slots(self.page).status_code, 200)
+        self.now += 60
+        self.assertEqual(self.slots(self.page).status_code, 429)
+
+    def test_page_limit_applies_across_addresses(self):
+        for number in range(4):
+            self.assertEqual(self.slots(self.page, ip=f'10.0.1.{number}').status_code, 200)
+        self.assertEqual(self.slots(self.page, ip='10.0.2.1').status_code, 429)
+        self.assertEqual(self.slots(self.other_page, ip='10.0.2.1').status_code, 200)
+
+    def test_spoofed_forwarded_for_does_not_reset_the_bucket(self):
+        for number in range(3):
+            self.assertEqual(self.slots(self.page, HTTP_X_FORWARDED_FOR=f'203.0.113.{number}').status_code, 200)
+        response = self.slots(self.other_page, HTTP_X_FORWARDED_FOR='203.0.113.99')
+        self.assertEqual(response.status_code, 429)
+
+
+class IdempotentBookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro')
+        self.client = APIClient()
+        self.date = (timezone.now() + timedelta(days=1)).isoformat()
+
+    def book(self, key, page=None, name='Ann', date=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/public/bookings/', {
+                'meeting_page': str((page or self.page).id),
+                'date': date or self.date,
+                'attendee_email': 'ann@example.com',
+                'attendee_name': name,
+                'user_input': {},
+            }, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_replay_the_first_response(self):
+        first = self.book('retry-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):
+            second = self.book('retry-1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_reusing_a_key_with_another_payload_is_rejected(self):
+        self.book('retry-1')
+        self.assertEqual(self.book('retry-1', name='Bob').status_code, 422)
+
+    def test_keys_are_scoped_per_page(self):
+        other_page = MeetingPage.objects.create(user=self.user, title='Demo', slug='demo')
+        self.assertEqual(self.book('retry-1').status_code, 201)
+        later = (timezone.now() + timedelta(days=2)).isoformat()
+        self.assertEqual(self.book('retry-1', page=other_page, date=later).status_code, 201)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_expired_keys_can_be_reused(self):
+        self.book('retry-1')
+        IdempotencyRecord.objects.update(created_at=timezone.now() - timedelta(days=2))
+        later = (timezone.now() + timedelta(days=2)).isoformat()
+        self.assertEqual(self.book('retry-1', name='Bob', date=later).status_code, 201)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_concurrent_duplicate_replays_the_winner(self):
+        first = self.book('retry-1')
+        # A duplicate that did its initial lookup just before the first request
+        # committed: its claim then fails and it replays the stored response.
+        original = IdempotentRequest.stored_response
+        calls = []
+
+        def stale_then_stored(idempotency):
+            calls.append(idempotency)
+            return None if len(calls) == 1 else original(idempotency)
+
+        with mock.patch.object(IdempotentRequest, 'stored_response', stale_then_stored):
+            second = self.book('retry-1')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class SelfServiceBookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro', duration_minutes=30)
+        self.start = (timezone.now() + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+        self.booking = Booking.objects.create(
+            meeting_page=self.page, date=self.start, attendee_email='ann@example.com',
+            user_input={'selected_date': '2000-01-01', 'selected_time': '10:00', 'timezone': 'UTC'},
+        )
+        self.url = f'/api/public/bookings/manage/{self.booking.management_token}/'
+        self.client = APIClient()
+
+    def manage(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, data, format='json')
+
+    def test_view_booking(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], str(self.booking.id))
+        self.assertNotIn('api_key_prefix', str(response.data))
+        self.assertEqual(self.client.get(f'/api/public/bookings/manage/{uuid.uuid4()}/').status_code, 404)
+
+    def test_cancel_sends_one_notification(self):
+        response = self.manage(action='cancel')
+        self.assertEqual(response.data['status'], 'cancelled')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('cancelled', mail.outbox[0].subject)
+        self.assertEqual(self.manage(action='cancel').status_code, 409)
+
+    def test_past_bookings_cannot_be_changed(self):
+        Booking.objects.filter(pk=self.booking.pk).update(date=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.manage(action='cancel').status_code, 409)
+        new_start = self.start + timedelta(hours=2)
+        self.assertEqual(self.manage(action='reschedule', date=new_start.isoformat()).status_code, 409)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'booked')
+        self.assertLess(self.booking.date, timezone.now())
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_reschedule_moves_the_booking(self):
+        new_start = self.start + timedelta(hours=2)
+        response = self.manage(action='reschedule', date=new_start.isoformat())
+        self.assertEqual(response.status_code, 200)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.date, new_start)
+        self.assertEqual(self.booking.user_input['selected_date'], new_start.date().isoformat())
+        self.assertEqual(self.booking.user_input['selected_time'], '12:00')
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_reschedule_rejects_overlapping_times(self):
+        Booking.objects.create(meeting_page=self.page, date=self.start + timedelta(hours=1))
+        response = self.manage(action='reschedule', date=(self.start + timedelta(minutes=45)).isoformat())
+        self.assertEqual(response.status_code, 409)
+        response = self.manage(action='reschedule', date=(self.start + timedelta(minutes=90)).isoformat())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.manage(action='reschedule').status_code, 400)
+
+
+@override_settings(BOOKING_BULK_EMAIL_DELIVERY='background')
+class BackgroundEmailTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        page = MeetingPage.objects.create(user=user, title='Intro', slug='intro')
+        self.booking = Booking.objects.select_related('meeting_page__user').get(pk=Booking.objects.create(
+            meeting_page=page, date=timezone.now() + timedelta(days=1), attendee_email='ann@example.com',
+        ).pk)
+
+    def queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            queue_booking_emails([self.booking], action='cancelled')
+        return emails._get_executor()
+
+    def test_worker_sends_after_commit(self):
+        self.queue().submit(lambda: None).result()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_worker_closes_its_database_connections(self):
+        # The in-memory test database ignores close(), so check the call.
+        with mock.patch.object(emails.connections, 'close_all') as close_all:
+            self.queue().submit(lambda: None).result()
+        close_all.assert_called_once_with()
+
+
+@override_settings(BOOKING_BULK_EMAIL_DELIVERY='sync')
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro')
+        self.other_page = MeetingPage.objects.create(user=other, title='Other', slug='other')
+        self.customer = Customer.objects.create(name='Ann', email='ann@example.com')
+        self.day = (timezone.now() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make(self, count, page=None, hours=9, **kwargs):
+        return [
+            Booking.objects.create(
+                meeting_page=page or self.page, date=self.day + timedelta(hours=hours, minutes=i),
+                attendee_email=f'guest{i}@example.com', customer=self.customer, **kwargs,
+            )
+            for i in range(count)
+        ]
+
+    def post(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/bookings/bulk-status/', data, format='json')
+
+    def test_cancel_by_ids_updates_only_owned_active_bookings(self):
+        mine = self.make(3)
+        completed = self.make(1, status='completed')[0]
+        foreign = self.make(1, page=self.other_page)[0]
+        ids = [str(b.id) for b in [*mine, completed, foreign]]
+
+        response = self.post(action='cancel', ids=ids)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(sorted(response.data['not_updated']), sorted([str(completed.id), str(foreign.id)]))
+        self.assertEqual(Booking.objects.filter(status='cancelled').count(), 3)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.cancel_count, 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_complete_by_date_range(self):
+        self.make(2, hours=9)
+        self.make(1, hours=30)
+        response = self.post(
+            action='complete',
+            date_from=self.day.isoformat(),
+            date_to=(self.day + timedelta(days=1)).isoformat(),
+        )
+        self.assertEqual(response.data, {'action': 'complete', 'status': 'completed', 'updated': 2})
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_cancel_reads_back_in_chunks(self):
+        self.make(5)
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = apply_bulk_status(self.user, 'cancel', date_from=self.day,
+                                        date_to=self.day + timedelta(days=1), chunk_size=2)
+        self.assertEqual(summary['updated'], 5)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.cancel_count, 5)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_thousand_bookings_use_a_fixed_number_of_queries(self):
+        Booking.objects.bulk_create([
+            Booking(meeting_page=self.page, date=self.day + timedelta(minutes=i), customer=self.customer)
+            for i in range(1000)
+        ])
+        with self.assertNumQueries(5):
+            response = self.post(action='cancel', date_from=self.day.isoformat(),
+                                 date_to=(self.day + timedelta(days=1)).isoformat())
+        self.assertEqual(response.data['updated'], 1000)
+
+    def test_requires_ids_or_range(self):
+        self.assertEqual(self.post(action='cancel').status_code, 400)
+
+
+@override_settings(BOOKING_BULK_EMAIL_DELIVERY='sync')
+class BookingImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(
+            user=self.user, title='Intro', slug='intro', duration_minutes=30,
+            fields=[{'name': 'company', 'type': 'text', 'maxLength': 10}],
+        )
+        self.existing_customer = Customer.objects.create(owner=self.user, name='Ann', email='ann@example.com')
+        self.start = (timezone.now() + timedelta(days=5)).replace(hour=9, minute=0, second=0, microsecond=0)
+        Booking.objects.create(meeting_page=self.page, date=self.start)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **params):
+        params.setdefault('meeting_page', str(self.page.id))
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f'/api/bookings/import/?{query}',
+                {'file': SimpleUploadedFile(name, content.encode())},
+                format='multipart',
+            )
+
+    def at(self, minutes):
+        return (self.start + timedelta(minutes=minutes)).isoformat()
+
+    def test_csv_import_validates_and_links_customers(self):
+        content = (
+            'date,status,attendee_email,attendee_name,company,source\n'
+            f'{self.at(60)},booked,ann@example.com,Ann,Acme,webinar\n'
+            f'{self.at(120)},booked,new@example.com,Ned,,\n'
+            f'{self.at(-600)},completed,new@example.com,Ned,,\n'
+            f'{self.at(15)},booked,late@example.com,Lee,,\n'
+            f'{self.at(200)},booked,bad@example.com,Bo,Much Too Long Inc,\n'
+            'not-a-date,booked,x@example.com,X,,\n'
+        )
+        response = self.upload('bookings.csv', content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['failed']), (3, 3))
+        self.assertEqual([error['row'] for error in response.data['errors']], [5, 6, 7])
+        self.assertIn('date', response.data['errors'][0]['errors'])
+        self.assertIn('user_input', response.data['errors'][1]['errors'])
+
+        imported = Booking.objects.get(attendee_email='ann@example.com')
+        self.assertEqual(imported.customer, self.existing_customer)
+        self.assertEqual(imported.user_input, {'company': 'Acme', 'source': 'webinar'})
+        ned = Customer.objects.get(email='new@example.com')
+        self.assertEqual(ned.booking_count, 2)
+        self.assertEqual(ned.bookings.count(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(self.user.usage.bookings, 4)
+
+    def test_ndjson_import_without_emails(self):
+        content = '\n'.join(
+            json.dumps({'date': self.at(60 * (i + 1)), 'attendee_email': f'g{i}@example.com'})
+            for i in range(5)
+        )
+        response = self.upload('bookings.ndjson', content, send_emails='false')
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(response.data['emails_queued'], 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(PLAN_QUOTAS={'free': {'bookings_per_month': 4}})
+    def test_quota_is_enforced_per_batch(self):
+        lines = [
+            json.dumps({'date': self.at(60 * (i + 1)), 'attendee_email': f'g{i}@example.com'}).encode() + b'\n'
+            for i in range(5)
+        ]
+        importer = BookingImport(self.page, batch_size=2)
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(QuotaExceeded):
+            importer.run(lines, 'ndjson')
+        self.assertEqual((importer.created, importer.emails_queued), (2, 2))
+        self.assertEqual(Booking.objects.count(), 3)
+        self.assertEqual(Customer.objects.get(email='g1@example.com').booking_count, 1)
+        self.user.usage.refresh_from_db()
+        self.assertEqual(self.user.usage.bookings, 3)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_unreadable_file_is_rejected_with_row(self):
+        response = self.client.post(
+            f'/api/bookings/import/?meeting_page={self.page.id}',
+            {'file': SimpleUploadedFile('b.csv', f'date\n{self.at(60)}\n\xff\n'.encode('latin-1'))},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['row'], response.data['created']), (3, 0))
+
+    def test_target_page_must_be_owned(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        page = MeetingPage.objects.create(user=other, title='Other', slug='other')
+        self.assertEqual(self.upload('b.csv', 'date\n', meeting_page=str(page.id)).status_code, 400)
+        self.assertEqual(self.upload('b.csv', 'date\n', meeting_page='nope').status_code, 400)
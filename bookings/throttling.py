@@ -0,0 +1,91 @@
+"""
+Token-bucket throttles for the anonymous booking endpoints.
+
+A view opts in with a ``throttle_scope``; rates are read from
+``DEFAULT_THROTTLE_RATES`` as ``<scope>_<key>_burst`` and
+``<scope>_<key>_sustained``. Both buckets for one client live in a single
+cache entry, so a throttle costs one cache read and one write per request.
+Read-modify-write is not atomic across processes; concurrent requests may
+overshoot a limit slightly, which is acceptable for abuse protection.
+"""
+import time
+import uuid
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    cache = default_cache
+    timer = time.time
+    key_name = None
+    parse_rate = SimpleRateThrottle.parse_rate
+
+    def get_ident_value(self, request, view):
+        raise NotImplementedError('.get_ident_value() must be overridden')
+
+    def get_rates(self, scope):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        parsed = []
+        for kind in ('burst', 'sustained'):
+            rate = rates.get(f'{scope}_{self.key_name}_{kind}')
+            if rate:
+                parsed.append(self.parse_rate(rate))
+        return parsed
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rates = self.get_rates(scope) if scope else []
+        ident = self.get_ident_value(request, view) if rates else None
+        if ident is None:
+            return True
+
+        key = f'throttle:{scope}:{self.key_name}:{ident}'
+        now = self.timer()
+        state = self.cache.get(key)
+        if state is None or len(state) != len(rates) + 1:
+            tokens = [float(limit) for limit, _ in rates]
+        else:
+            elapsed = max(0.0, now - state[0])
+            tokens = [
+                min(float(limit), level + elapsed * limit / duration)
+                for (limit, duration), level in zip(rates, state[1:])
+            ]
+
+        if any(level < 1 for level in tokens):
+            self.wait_seconds = max(
+                (1 - level) * duration / limit
+                for (limit, duration), level in zip(rates, tokens) if level < 1
+            )
+            return False
+
+        tokens = [level - 1 for level in tokens]
+        self.cache.set(key, (now, *tokens), max(duration for _, duration in rates))
+        return True
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class PublicIPThrottle(TokenBucketThrottle):
+    """Limits each client address."""
+    key_name = 'ip'
+
+    def get_ident_value(self, request, view):
+        return self.get_ident(request)
+
+
+class PublicPageThrottle(TokenBucketThrottle):
+    """Limits traffic to each meeting page, whichever addresses it comes from."""
+    key_name = 'page'
+
+    def get_ident_value(self, request, view):
+        value = request.query_params.get('meeting_page_id')
+        if value is None and request.method == 'POST' and hasattr(request.data, 'get'):
+            value = request.data.get('meeting_page')
+        try:
+            return uuid.UUID(str(value)).hex
+        except ValueError:
+            # The view rejects it; the address throttle still applies.
+            return None
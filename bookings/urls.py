@@ -6,9 +6,12 @@ router = DefaultRouter()
 router.register(r'bookings', BookingViewSet, basename='booking')
 router.register(r'availabilities', AvailabilityViewSet, basename='availability')
 
+# Routes outside the router must pass the action's initkwargs themselves,
+# otherwise its AllowAny permission_classes would be ignored.
 urlpatterns = [
-    path('public/bookings/', BookingViewSet.as_view({'post': 'create_public'}), name='booking-create-public'),
-    path('public/bookings/available-slots/', BookingViewSet.as_view({'get': 'available_slots'}), name='booking-available-slots'),
+    path('public/bookings/', BookingViewSet.as_view({'post': 'create_public'}, **BookingViewSet.create_public.kwargs), name='booking-create-public'),
+    path('public/bookings/available-slots/', BookingViewSet.as_view({'get': 'available_slots'}, **BookingViewSet.available_slots.kwargs), name='booking-available-slots'),
+    path('public/bookings/manage/<uuid:token>/', BookingViewSet.as_view({'get': 'manage', 'post': 'manage'}, **BookingViewSet.manage.kwargs), name='booking-manage-public'),
     path('', include(router.urls)),
 ]
 
@@ -1,15 +1,33 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 from django.db import transaction
 from datetime import timedelta, datetime
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from .models import Booking, Availability
-from .serializers import BookingSerializer, BookingCreateSerializer, AvailabilitySerializer
-from customers.models import Customer
+from .serializers import (
+    AvailabilitySerializer,
+    BookingBulkStatusSerializer,
+    BookingCreateSerializer,
+    BookingManageSerializer,
+    BookingSerializer,
+    localize_appointment,
+)
+from .bulk import BookingImport, apply_bulk_status
+from .caching import BOOKINGS_NAMESPACE, available_slots_key
+from customers.bulk import ImportFileError, detect_format
+from customers.activity import customer_for_attendee
+from meebridge_backend import metrics
+from meebridge_backend.caching import cache_response
+from users.quotas import QuotaExceeded, consume_booking
 from .emails import send_booking_email
+from .idempotency import IdempotencyKeyInUse, IdempotentRequest
+from .self_service import BookingConflict, cancel_booking, find_conflict, lock_host, reschedule_booking
+from .throttling import PublicIPThrottle, PublicPageThrottle
 
 
 class AvailabilityViewSet(viewsets.ModelViewSet):
@@ -26,15 +44,28 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
 class BookingViewSet(viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = None  # set per public action
 
     def perform_create(self, serializer):
-        booking = serializer.save()
+        with transaction.atomic():
+            consume_booking(serializer.validated_data['meeting_page'].user)
+            booking = serializer.save(customer=self._customer_for(serializer.validated_data))
+        metrics.bookings_created.inc(source='dashboard')
         transaction.on_commit(lambda: send_booking_email(booking, action='created'))
 
     def perform_update(self, serializer):
         booking = serializer.save()
         transaction.on_commit(lambda: send_booking_email(booking, action='updated'))
 
+    @staticmethod
+    def _customer_for(validated_data):
+        return customer_for_attendee(
+            validated_data['meeting_page'].user,
+            validated_data.get('attendee_email'),
+            validated_data.get('attendee_name', ''),
+            validated_data.get('user_input'),
+        )
+
     def get_queryset(self):
         # Get bookings for meeting pages owned by the user
         return Booking.objects.filter(meeting_page__user=self.request.user)
@@ -44,41 +75,74 @@ class BookingViewSet(viewsets.ModelViewSet):
             return BookingCreateSerializer
         return BookingSerializer
 
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny],
+            throttle_classes=[PublicIPThrottle, PublicPageThrottle], throttle_scope='public_booking')
     def create_public(self, request):
         """Create booking from public page"""
+        idempotency = IdempotentRequest.from_request(request)
+        if idempotency is not None:
+            replayed = idempotency.stored_response()
+            if replayed is not None:
+                return replayed
+
         serializer = BookingCreateSerializer(data=request.data)
         if serializer.is_valid():
             with transaction.atomic():
-                booking = serializer.save(status='booked')
-
-                # Auto-create customer record based on booking data
-                user_input = booking.user_input or {}
-                attendee_email = booking.attendee_email or user_input.get('email')
-                attendee_name = booking.attendee_name or user_input.get('name', '')
-                phone = user_input.get('phone', '')
-                organization = user_input.get('organization', '')
-
-                customer_defaults = {
-                    'name': attendee_name or '',
-                    'phone': phone or '',
-                    'organization': organization or '',
-                    'metadata': user_input,
-                }
-
-                Customer.objects.create(
-                    name=attendee_name or '',
-                    email=attendee_email,
-                    phone=phone or '',
-                    organization=organization or '',
-                    metadata=user_input
+                if idempotency is not None and not idempotency.claim():
+                    # A concurrent duplicate committed first.
+                    replayed = idempotency.stored_response()
+                    if replayed is None:
+                        raise IdempotencyKeyInUse()
+                    return replayed
+                meeting_page = serializer.validated_data['meeting_page']
+                lock_host(meeting_page.user_id)
+                start = localize_appointment(
+                    serializer.validated_data['date'], serializer.validated_data.get('user_input') or {},
                 )
+                if find_conflict(meeting_page, start):
+                    raise BookingConflict()
+                # Counted inside the transaction so a failed save gives the
+                # quota back.
+                consume_booking(meeting_page.user)
+                # Link the booking to the attendee's customer record, creating
+                # one on their first booking.
+                customer = self._customer_for(serializer.validated_data)
+                booking = serializer.save(status='booked', customer=customer)
+                data = BookingSerializer(booking).data
+                if idempotency is not None:
+                    idempotency.store(status.HTTP_201_CREATED, data)
 
                 transaction.on_commit(lambda: send_booking_email(booking, action='created'))
 
-            return Response(BookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+            metrics.bookings_created.inc(source='public')
+            return Response(data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get', 'post'], permission_classes=[AllowAny],
+            url_path=r'manage/(?P<token>[0-9a-f-]{36})',
+            throttle_classes=[PublicIPThrottle], throttle_scope='public_manage')
+    def manage(self, request, token=None):
+        """View, cancel or reschedule a booking with its management token"""
+        if request.method == 'GET':
+            booking = (
+                Booking.objects.select_related('meeting_page__user')
+                .filter(management_token=token).first()
+            )
+            if booking is None:
+                return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(BookingSerializer(booking).data)
+
+        booking = Booking.objects.filter(management_token=token).only('user_input').first()
+        if booking is None:
+            return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
+        serializer = BookingManageSerializer(data=request.data, context={'booking': booking})
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data['action'] == 'cancel':
+            booking = cancel_booking(token)
+        else:
+            booking = reschedule_booking(token, serializer.validated_data['date'])
+        return Response(BookingSerializer(booking).data)
+
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel a booking"""
@@ -96,6 +160,44 @@ class BookingViewSet(viewsets.ModelViewSet):
         booking.save()
         return Response(BookingSerializer(booking).data)
 
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """Cancel or complete many bookings at once"""
+        serializer = BookingBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = apply_bulk_status(request.user, **serializer.validated_data)
+        return Response(summary)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_bookings(self, request):
+        """Create bookings for one of the user's meeting pages from a CSV or NDJSON file"""
+        from meeting_pages.models import MeetingPage
+        try:
+            meeting_page = MeetingPage.objects.select_related('user').get(
+                id=request.query_params.get('meeting_page'), user=request.user,
+            )
+        except (MeetingPage.DoesNotExist, DjangoValidationError):
+            return Response({'error': 'meeting_page must be one of your meeting pages'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = detect_format(upload.name, request.query_params.get('file_format'))
+        if file_format is None:
+            return Response({'error': 'file_format must be csv or ndjson'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        send_emails = request.query_params.get('send_emails', 'true').lower() not in ('false', '0', 'no')
+        importer = BookingImport(meeting_page, send_emails=send_emails)
+        try:
+            report = importer.run(upload, file_format)
+        except ImportFileError as exc:
+            return Response({'error': str(exc), 'row': exc.row, **importer.report()},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except QuotaExceeded as exc:
+            # Batches before the one that did not fit stay imported.
+            return Response({'error': exc.detail, **importer.report()}, status=exc.status_code)
+        return Response(report)
+
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Get upcoming bookings"""
@@ -106,7 +208,9 @@ class BookingViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(upcoming, many=True)
         return Response(serializer.data)
 
-    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny],
+            throttle_classes=[PublicIPThrottle, PublicPageThrottle], throttle_scope='public_slots')
+    @cache_response(BOOKINGS_NAMESPACE, available_slots_key, 'AVAILABLE_SLOTS_CACHE_TIMEOUT', 'available_slots')
     def available_slots(self, request):
         """Get available time slots for a meeting page"""
         meeting_page_id = request.query_params.get('meeting_page_id')
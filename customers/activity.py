@@ -0,0 +1,178 @@
+"""
+Incremental maintenance of the denormalized booking stats on ``Customer``.
+
+Bookings report their changes through the signal handlers in
+``bookings.signals``; each change is applied as a single ``UPDATE`` with
+``F()`` expressions so concurrent bookings never lose an increment.
+``recompute_customer_stats`` rebuilds the counters from the bookings table
+for deletes (where min/max cannot be decremented) and drift repair.
+"""
+from django.db.models import Count, F, Max, Min, Q, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from .models import Customer
+
+CANCELLED = 'cancelled'
+
+
+def host_customers(user):
+    """Customers ``user`` owns or that booked one of ``user``'s pages."""
+    from bookings.models import Booking
+
+    booked = Booking.objects.filter(meeting_page__user=user).exclude(customer=None).values('customer_id')
+    return Customer.objects.filter(Q(owner=user) | Q(pk__in=booked))
+
+
+def customer_for_attendee(owner, email, name='', user_input=None):
+    """
+    Return ``owner``'s customer for a booking's attendee, creating it if
+    needed. The unique (owner, email) constraint settles concurrent first
+    bookings from one attendee on a single customer.
+    """
+    user_input = user_input or {}
+    email = email or user_input.get('email')
+    if not email:
+        customer = _new_customer(owner, None, name, user_input)
+        customer.save()
+        return customer
+    customer, _ = Customer.objects.get_or_create(
+        owner=owner, email=email, defaults=_customer_fields(name, user_input),
+    )
+    return customer
+
+
+def _customer_fields(name, user_input):
+    return {
+        'name': name or user_input.get('name', '') or '',
+        'phone': user_input.get('phone', '') or '',
+        'organization': user_input.get('organization', '') or '',
+        'metadata': user_input,
+    }
+
+
+def _new_customer(owner, email, name, user_input):
+    return Customer(owner=owner, email=email or None, **_customer_fields(name, user_input))
+
+
+def customers_for_attendees(owner, attendees):
+    """
+    Bulk version of ``customer_for_attendee`` for ``(email, name, user_input)``
+    tuples; returns ``{email: customer}``. Attendees without an email are
+    skipped rather than each getting an anonymous customer.
+    """
+    wanted = {}
+    for email, name, user_input in attendees:
+        user_input = user_input or {}
+        email = email or user_input.get('email')
+        if email:
+            wanted.setdefault(email, (name, user_input))
+    if not wanted:
+        return {}
+
+    customers = {customer.email: customer for customer in Customer.objects.filter(owner=owner, email__in=wanted)}
+    missing = []
+    for email, (name, user_input) in wanted.items():
+        if email not in customers:
+            customer = _new_customer(owner, email, name, user_input)
+            customer.refresh_search_document()
+            missing.append(customer)
+    if missing:
+        Customer.objects.bulk_create(missing, ignore_conflicts=True)
+        # Rows that a concurrent booking created first were skipped; use theirs.
+        customers.update(
+            (customer.email, customer)
+            for customer in Customer.objects.filter(owner=owner, email__in=[c.email for c in missing])
+        )
+    return customers
+
+
+def record_booking(customer_id, status, booked_at):
+    if not customer_id:
+        return
+    booked_at = Value(booked_at)
+    Customer.objects.filter(pk=customer_id).update(
+        booking_count=F('booking_count') + 1,
+        cancel_count=F('cancel_count') + (1 if status == CANCELLED else 0),
+        first_booked_at=Coalesce(Least('first_booked_at', booked_at), booked_at),
+        last_booked_at=Coalesce(Greatest('last_booked_at', booked_at), booked_at),
+    )
+
+
+def record_status_change(customer_id, old_status, new_status):
+    delta = (new_status == CANCELLED) - (old_status == CANCELLED)
+    if customer_id and delta:
+        Customer.objects.filter(pk=customer_id).update(cancel_count=F('cancel_count') + delta)
+
+
+def record_bulk_bookings(counts, first_booked_at, last_booked_at, chunk_size=5000):
+    """
+    Apply bookings inserted with ``bulk_create``, which skips the booking
+    signals. ``counts`` maps customer ids to ``(bookings, cancelled)``;
+    every booking was created between ``first_booked_at`` and
+    ``last_booked_at``. Customers sharing the same counts are updated
+    together, so a large import needs only a handful of UPDATEs.
+    """
+    groups = {}
+    for customer_id, delta in counts.items():
+        if customer_id:
+            groups.setdefault(delta, []).append(customer_id)
+    first, last = Value(first_booked_at), Value(last_booked_at)
+    for (booked, cancelled), customer_ids in groups.items():
+        for start in range(0, len(customer_ids), chunk_size):
+            Customer.objects.filter(pk__in=customer_ids[start:start + chunk_size]).update(
+                booking_count=F('booking_count') + booked,
+                cancel_count=F('cancel_count') + cancelled,
+                first_booked_at=Coalesce(Least('first_booked_at', first), first),
+                last_booked_at=Coalesce(Greatest('last_booked_at', last), last),
+            )
+
+
+def record_bulk_cancellations(cancelled_per_customer):
+    """
+    Apply ``{customer_id: cancelled bookings}`` from a bulk ``update()``,
+    which bypasses the booking signals. Customers are grouped by how many
+    of their bookings were cancelled, so this is usually a single UPDATE.
+    """
+    by_delta = {}
+    for customer_id, delta in cancelled_per_customer.items():
+        if customer_id and delta:
+            by_delta.setdefault(delta, []).append(customer_id)
+    for delta, customer_ids in by_delta.items():
+        Customer.objects.filter(pk__in=customer_ids).update(cancel_count=F('cancel_count') + delta)
+
+
+def recompute_customer_stats(customer_ids=None):
+    """Rebuild stats from bookings; ``None`` recomputes every customer."""
+    from bookings.models import Booking
+
+    bookings = Booking.objects.exclude(customer=None)
+    customers = Customer.objects.all()
+    if customer_ids is not None:
+        customer_ids = [pk for pk in customer_ids if pk]
+        bookings = bookings.filter(customer_id__in=customer_ids)
+        customers = customers.filter(pk__in=customer_ids)
+
+    stats = {
+        row['customer']: row
+        for row in bookings.values('customer').order_by().annotate(
+            total=Count('id'),
+            cancelled=Count('id', filter=Q(status=CANCELLED)),
+            first=Min('created_at'),
+            last=Max('created_at'),
+        )
+    }
+
+    updated = 0
+    fields = ['id', 'booking_count', 'cancel_count', 'first_booked_at', 'last_booked_at']
+    for customer in customers.only(*fields).iterator(chunk_size=2000):
+        row = stats.get(customer.pk, {})
+        values = {
+            'booking_count': row.get('total', 0),
+            'cancel_count': row.get('cancelled', 0),
+            'first_booked_at': row.get('first'),
+            'last_booked_at': row.get('last'),
+        }
+        if any(getattr(customer, field) != value for field, value in values.items()):
+            Customer.objects.filter(pk=customer.pk).update(**values)
+            updated += 1
+    return updated
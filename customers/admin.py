@@ -4,6 +4,6 @@ from .models import Customer
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'phone', 'organization', 'created_at']
+    list_display = ['name', 'email', 'phone', 'organization', 'booking_count', 'last_booked_at', 'created_at']
     search_fields = ['name', 'email', 'phone', 'organization']
     list_filter = ['created_at']
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    from .search import SEARCH_TABLE, install_sqlite_search_index
+
+    # Only repair an index that a migration has already created.
+    if SEARCH_TABLE in connection.introspection.table_names():
+        install_sqlite_search_index(connection)
 
 
 class CustomersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customers'
+
+    def ready(self):
+        post_migrate.connect(ensure_search_index, sender=self)
@@ -0,0 +1,248 @@
+"""
+Streaming bulk import and export of customers.
+
+Imports read the uploaded file one row at a time and upsert in batches, so
+memory is bounded by ``batch_size`` rather than by the size of the file.
+"""
+import codecs
+import csv
+import json
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import serializers
+
+from .activity import host_customers
+from .models import Customer
+from .serializers import CustomerSerializer
+
+FILE_FORMATS = ('csv', 'ndjson')
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FIELDS = ['name', 'email', 'phone', 'organization', 'metadata']
+EXPORT_FIELDS = [
+    'id', 'name', 'email', 'phone', 'organization', 'metadata',
+    'booking_count', 'cancel_count', 'first_booked_at', 'last_booked_at',
+    'created_at', 'updated_at',
+]
+UPSERT_FIELDS = [*IMPORT_FIELDS, 'search_document', 'updated_at']
+
+
+class ImportFileError(ValueError):
+    """The upload cannot be read from ``row`` on; earlier batches are saved."""
+
+    def __init__(self, row, message):
+        super().__init__(f'Row {row}: {message}')
+        self.row = row
+
+
+def detect_format(filename, requested=None):
+    if requested:
+        return requested if requested in FILE_FORMATS else None
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    return None
+
+
+def iter_rows(stream, file_format):
+    """
+    Yield ``(line_number, row, errors)`` without reading the whole file.
+
+    Raises ``ImportFileError`` when the rest of the file cannot be read:
+    bytes that are not UTF-8, or CSV that cannot be tokenized.
+    """
+    text = codecs.iterdecode(stream, 'utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        try:
+            for row in reader:
+                yield reader.line_num, row, None
+        except UnicodeDecodeError:
+            raise ImportFileError(reader.line_num + 1, 'File is not valid UTF-8.') from None
+        except csv.Error as exc:
+            raise ImportFileError(reader.line_num, f'Malformed CSV: {exc}') from None
+        return
+
+    line_number = 0
+    try:
+        for line in text:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_number, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, {'non_field_errors': ['Each line must be a JSON object.']}
+                continue
+            yield line_number, row, None
+    except UnicodeDecodeError:
+        raise ImportFileError(line_number + 1, 'File is not valid UTF-8.') from None
+
+
+def _prepare_row(row):
+    """
+    Map a raw row onto serializer input; unknown columns land in metadata.
+
+    Returns ``(customer_id, data, errors)``.
+    """
+    customer_id = row.get('id') or None
+    if customer_id:
+        try:
+            customer_id = uuid.UUID(str(customer_id))
+        except ValueError:
+            return None, None, {'id': ['Must be a valid UUID.']}
+
+    data = {}
+    metadata = row.get('metadata') or {}
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata)
+        except ValueError:
+            return None, None, {'metadata': ['Must be a JSON object.']}
+    if not isinstance(metadata, dict):
+        return None, None, {'metadata': ['Must be a JSON object.']}
+
+    for key, value in row.items():
+        if key is None or key in EXPORT_FIELDS:
+            continue
+        if value not in (None, ''):
+            metadata.setdefault(key, value)
+
+    for field in IMPORT_FIELDS[:-1]:
+        if field in row:
+            data[field] = row[field] if row[field] is not None else ''
+    if metadata or 'metadata' in row:
+        data['metadata'] = metadata
+    return customer_id, data, None
+
+
+class CustomerImport:
+    """
+    Validate rows with ``CustomerSerializer`` and upsert them in batches.
+
+    Rows match ``owner``'s customers (see ``host_customers``) by id, then
+    by email; new customers belong to ``owner``. An id of another host's
+    customer is reported as a row error rather than overwritten.
+    """
+
+    def __init__(self, owner, batch_size=DEFAULT_BATCH_SIZE):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def _record_error(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line_number, 'errors': errors})
+
+    def run(self, stream, file_format):
+        # One serializer validates every row: building its fields is far more
+        # expensive than validating a row, so it must not happen per row.
+        validator = CustomerSerializer(partial=True)
+        batch = []
+        for line_number, row, errors in iter_rows(stream, file_format):
+            if errors is None:
+                customer_id, data, errors = _prepare_row(row)
+            if errors is None:
+                try:
+                    validated = validator.run_validation(data)
+                except serializers.ValidationError as exc:
+                    errors = serializers.as_serializer_error(exc)
+                else:
+                    batch.append((line_number, customer_id, validated))
+                    if len(batch) >= self.batch_size:
+                        self._flush(batch)
+                        batch = []
+                    continue
+            self._record_error(line_number, errors)
+        if batch:
+            self._flush(batch)
+        return self.report()
+
+    def _flush(self, batch):
+        ids = {pk for _, pk, _ in batch if pk}
+        emails = {data['email'] for _, _, data in batch if data.get('email')}
+        existing = host_customers(self.owner).filter(Q(pk__in=ids) | Q(email__in=emails)).order_by('-created_at')
+        by_id, by_email = {}, {}
+        for customer in existing:
+            by_id[customer.pk] = customer
+            if customer.email:
+                by_email[customer.email] = customer  # earliest customer wins
+        foreign = set(Customer.objects.filter(pk__in=ids - by_id.keys()).values_list('pk', flat=True))
+
+        pending = {}
+        for line_number, pk, data in batch:
+            if pk in foreign:
+                self._record_error(line_number, {'id': ['Unknown customer.']})
+                continue
+            email = data.get('email') or None
+            customer = by_id.get(pk) if pk else None
+            customer = customer or (by_email.get(email) if email else None)
+            if customer is None:
+                customer = Customer(pk=pk, owner=self.owner) if pk else Customer(owner=self.owner)
+                if email:
+                    by_email[email] = customer
+                self.created += 1
+            elif customer.pk in pending:
+                pass  # repeated within the batch, counted once
+            else:
+                self.updated += 1
+            for field, value in data.items():
+                setattr(customer, field, value)
+            if 'email' in data and not customer.email:
+                customer.email = None
+            customer.refresh_search_document()
+            pending[customer.pk] = customer
+
+        if not pending:
+            return
+        with transaction.atomic():
+            Customer.objects.bulk_create(
+                pending.values(),
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=UPSERT_FIELDS,
+            )
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_export(queryset, file_format, chunk_size=2000):
+    """Yield the export one encoded row at a time."""
+    rows = queryset.order_by('created_at', 'id').values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    if file_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['metadata'] = json.dumps(row['metadata'], cls=DjangoJSONEncoder)
+        yield writer.writerow([
+            '' if row[field] is None else row[field] for field in EXPORT_FIELDS
+        ])
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from customers.models import Customer
+from customers.search import install_sqlite_search_index
+
+
+class Command(BaseCommand):
+    help = "Recompute customer search documents and rebuild the full-text index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        updated = 0
+        with transaction.atomic():
+            for customer in Customer.objects.order_by().iterator(chunk_size=batch_size):
+                customer.refresh_search_document()
+                batch.append(customer)
+                if len(batch) >= batch_size:
+                    Customer.objects.bulk_update(batch, ['search_document'])
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                Customer.objects.bulk_update(batch, ['search_document'])
+                updated += len(batch)
+
+            if connection.vendor == 'sqlite':
+                # bulk_update() goes through the triggers, but rebuilding also
+                # repairs an index that has drifted.
+                install_sqlite_search_index(connection, rebuild=True)
+
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {updated} customers"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from customers.activity import recompute_customer_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized customer booking stats from the bookings table"
+
+    def handle(self, *args, **options):
+        updated = recompute_customer_stats()
+        self.stdout.write(self.style.SUCCESS(f"Corrected stats for {updated} customers"))
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+from customers.search import FTS_TABLE, build_search_document
+
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        customer_id UNINDEXED,
+        document,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON customers_customer BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, customer_id, document)
+        VALUES (new.rowid, new.id, new.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON customers_customer BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_document ON customers_customer BEGIN
+        UPDATE {FTS_TABLE} SET document = new.search_document WHERE rowid = old.rowid;
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, customer_id, document)
+    SELECT rowid, id, search_document FROM customers_customer
+    """,
+]
+
+SQLITE_REVERSE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS customers_customer_search_trgm "
+    "ON customers_customer USING gin (search_document gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS customers_customer_search_trgm",
+]
+
+
+def populate_search_documents(apps, schema_editor):
+    Customer = apps.get_model('customers', 'Customer')
+    customers = Customer.objects.using(schema_editor.connection.alias)
+    batch = []
+    for customer in customers.iterator(chunk_size=2000):
+        customer.search_document = build_search_document(
+            customer.name, customer.email, customer.phone, customer.organization, customer.metadata
+        )
+        batch.append(customer)
+        if len(batch) >= 2000:
+            customers.bulk_update(batch, ['search_document'])
+            batch = []
+    if batch:
+        customers.bulk_update(batch, ['search_document'])
+
+
+def _run_vendor_sql(schema_editor, statements_by_vendor):
+    for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run_vendor_sql(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    _run_vendor_sql(schema_editor, {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_alter_customer_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Normalized text indexed for customer search'),
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0004_customer_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='booking_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='cancel_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='first_booked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='last_booked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='email',
+            field=models.EmailField(blank=True, db_index=True, max_length=254, null=True),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:10
+
+from django.db import migrations
+
+# The FTS index used to be keyed by the implicit rowid of customers_customer,
+# which VACUUM may renumber. It now lives in an external-content FTS table
+# over a shadow table keyed by customer id (copied from customers.search as
+# of this migration).
+FTS_TABLE = 'customers_customer_fts'
+SEARCH_TABLE = 'customers_customer_search'
+
+DROP_ROWID_INDEX = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+CREATE_ROWID_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        customer_id UNINDEXED,
+        document,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON customers_customer BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, customer_id, document)
+        VALUES (new.rowid, new.id, new.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON customers_customer BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_document ON customers_customer BEGIN
+        UPDATE {FTS_TABLE} SET document = new.search_document WHERE rowid = old.rowid;
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, customer_id, document)
+    SELECT rowid, id, search_document FROM customers_customer
+    """,
+]
+
+DROP_KEYED_INDEX = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_customer_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_customer_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_customer_au",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+]
+
+CREATE_KEYED_INDEX = [
+    f"""
+    CREATE TABLE {SEARCH_TABLE} (
+        id integer NOT NULL PRIMARY KEY,
+        customer_id char(32) NOT NULL UNIQUE,
+        document text NOT NULL
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        document,
+        content = '{SEARCH_TABLE}',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"INSERT INTO {SEARCH_TABLE}(customer_id, document) SELECT id, search_document FROM customers_customer",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    f"""
+    CREATE TRIGGER {SEARCH_TABLE}_ai AFTER INSERT ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.id, new.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {SEARCH_TABLE}_ad AFTER DELETE ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.id, old.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {SEARCH_TABLE}_au AFTER UPDATE ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.id, new.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_customer_ai AFTER INSERT ON customers_customer BEGIN
+        INSERT INTO {SEARCH_TABLE}(customer_id, document) VALUES (new.id, new.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_customer_ad AFTER DELETE ON customers_customer BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE customer_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_customer_au
+    AFTER UPDATE OF search_document ON customers_customer BEGIN
+        UPDATE {SEARCH_TABLE} SET document = new.search_document WHERE customer_id = old.id;
+    END
+    """,
+]
+
+
+def _run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_customer_booking_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run(DROP_ROWID_INDEX + CREATE_KEYED_INDEX),
+            _run(DROP_KEYED_INDEX + CREATE_ROWID_INDEX),
+        ),
+    ]
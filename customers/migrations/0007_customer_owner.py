@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_owners(apps, schema_editor):
+    """
+    Give existing customers the host of their bookings. Customers booked
+    with several hosts, or a later duplicate of a host's customer, keep no
+    owner; bookings create new, owned customers from now on.
+    """
+    Booking = apps.get_model('bookings', 'Booking')
+    Customer = apps.get_model('customers', 'Customer')
+    db = schema_editor.connection.alias
+
+    hosts = {}
+    rows = (
+        Booking.objects.using(db).exclude(customer=None)
+        .values_list('customer_id', 'meeting_page__user_id').distinct()
+    )
+    for customer_id, host_id in rows.iterator(chunk_size=2000):
+        hosts.setdefault(customer_id, set()).add(host_id)
+
+    taken = set()
+    batch = []
+    customers = Customer.objects.using(db).exclude(email=None).order_by('created_at').only('id', 'email')
+    for customer in customers.iterator(chunk_size=2000):
+        owners = hosts.get(customer.pk, ())
+        if len(owners) != 1:
+            continue
+        (owner_id,) = owners
+        if (owner_id, customer.email) in taken:
+            continue
+        taken.add((owner_id, customer.email))
+        customer.owner_id = owner_id
+        batch.append(customer)
+        if len(batch) >= 2000:
+            Customer.objects.using(db).bulk_update(batch, ['owner'])
+            batch = []
+    if batch:
+        Customer.objects.using(db).bulk_update(batch, ['owner'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_idempotencyrecord'),
+        ('customers', '0006_customer_search_stable_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='owner',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Host whose bookings and imports this customer belongs to', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='customers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(assign_owners, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.UniqueConstraint(condition=models.Q(('email__isnull', False), ('owner__isnull', False)), fields=('owner', 'email'), name='customers_customer_owner_email_unique'),
+        ),
+    ]
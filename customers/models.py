@@ -1,19 +1,68 @@
+from django.conf import settings
 from django.db import models
 import uuid
 
+from .search import build_search_document
+
 
 class Customer(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='customers',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Host whose bookings and imports this customer belongs to",
+    )
     name = models.CharField(max_length=255, blank=True)
-    email = models.EmailField(blank=True, null=True)
+    email = models.EmailField(blank=True, null=True, db_index=True)
     phone = models.CharField(max_length=20, blank=True)
     organization = models.CharField(max_length=255, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
+    search_document = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        help_text="Normalized text indexed for customer search",
+    )
+    booking_count = models.PositiveIntegerField(default=0, editable=False)
+    cancel_count = models.PositiveIntegerField(default=0, editable=False)
+    first_booked_at = models.DateTimeField(blank=True, null=True, editable=False)
+    last_booked_at = models.DateTimeField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    SEARCH_SOURCE_FIELDS = ('name', 'email', 'phone', 'organization', 'metadata')
+
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # One customer per attendee email for each host, so concurrent
+            # first bookings cannot create duplicates.
+            models.UniqueConstraint(
+                fields=['owner', 'email'],
+                condition=models.Q(owner__isnull=False, email__isnull=False),
+                name='customers_customer_owner_email_unique',
+            ),
+        ]
 
     def __str__(self):
         return self.email or self.name or str(self.id)
+
+    def refresh_search_document(self):
+        self.search_document = build_search_document(
+            self.name, self.email, self.phone, self.organization, self.metadata
+        )
+
+    def save(self, *args, **kwargs):
+        # The search index is kept in sync from this column (by triggers on
+        # SQLite), so it must be recomputed whenever a source field changes.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.refresh_search_document()
+        elif set(update_fields) & set(self.SEARCH_SOURCE_FIELDS):
+            self.refresh_search_document()
+            kwargs['update_fields'] = {*update_fields, 'search_document'}
+        super().save(*args, **kwargs)
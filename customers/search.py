@@ -0,0 +1,220 @@
+import re
+import unicodedata
+
+from django.db import connections
+
+SEARCH_DOCUMENT_MAX_LENGTH = 4096
+FTS_TABLE = 'customers_customer_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SEARCH_TABLE = 'customers_customer_search'
+
+# SQLite shadow index. Triggers copy each customer's document into
+# SEARCH_TABLE, keyed by customer id, whose INTEGER PRIMARY KEY is the rowid
+# of the external-content FTS table; unlike the implicit rowid of the
+# UUID-keyed customer table, VACUUM never renumbers it.
+SQLITE_SEARCH_SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+        id integer NOT NULL PRIMARY KEY,
+        customer_id char(32) NOT NULL UNIQUE,
+        document text NOT NULL
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        document,
+        content = '{SEARCH_TABLE}',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.id, new.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.id, old.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.id, new.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_customer_ai AFTER INSERT ON customers_customer BEGIN
+        INSERT INTO {SEARCH_TABLE}(customer_id, document) VALUES (new.id, new.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_customer_ad AFTER DELETE ON customers_customer BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE customer_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_customer_au
+    AFTER UPDATE OF search_document ON customers_customer BEGIN
+        UPDATE {SEARCH_TABLE} SET document = new.search_document WHERE customer_id = old.id;
+    END
+    """,
+]
+
+# The shadow table's triggers are dropped while it is refilled, since they
+# assume the FTS index matches it; install_sqlite_search_index recreates them.
+SQLITE_SEARCH_REBUILD = [
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au",
+    f"DELETE FROM {SEARCH_TABLE}",
+    f"INSERT INTO {SEARCH_TABLE}(customer_id, document) SELECT id, search_document FROM customers_customer",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def install_sqlite_search_index(connection, rebuild=False):
+    """
+    Create the FTS table and its triggers if they are missing.
+
+    SQLite migrations that alter ``customers_customer`` copy it into a new
+    table, which drops the triggers on it, so this runs after every migrate
+    and rebuilds the index whenever the triggers had to be recreated.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = %s",
+            [f'{FTS_TABLE}_customer_ai'],
+        )
+        rebuild = rebuild or cursor.fetchone() is None
+        for statement in SQLITE_SEARCH_SCHEMA:
+            cursor.execute(statement)
+        if rebuild:
+            for statement in SQLITE_SEARCH_REBUILD + SQLITE_SEARCH_SCHEMA:
+                cursor.execute(statement)
+
+
+def normalize_search_text(value: str) -> str:
+    """Casefold and strip diacritics so 'José' and 'jose' index the same."""
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+
+def _flatten_metadata(value, parts):
+    if isinstance(value, dict):
+        for item in value.values():
+            _flatten_metadata(item, parts)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _flatten_metadata(item, parts)
+    elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        parts.append(str(value))
+
+
+def build_search_document(name='', email='', phone='', organization='', metadata=None) -> str:
+    """
+    Build the normalized text that backs customer search.
+
+    Phone numbers are indexed both as entered and as bare digits so that
+    '+1 (555) 010-2030' is found by '15550102030'.
+    """
+    parts = [name or '', email or '', phone or '', organization or '']
+    digits = ''.join(ch for ch in phone or '' if ch.isdigit())
+    if digits:
+        parts.append(digits)
+    _flatten_metadata(metadata or {}, parts)
+    document = normalize_search_text(' '.join(part for part in parts if part))
+    return document[:SEARCH_DOCUMENT_MAX_LENGTH]
+
+
+def tokenize_query(query: str):
+    return _TOKEN_RE.findall(normalize_search_text(query or ''))
+
+
+def _fts_match_expression(tokens):
+    # Every token must match; the last one is treated as a prefix so that
+    # results appear while the user is still typing.
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] = f'{quoted[-1]}*'
+    return ' '.join(quoted)
+
+
+class SQLiteSearchResults:
+    """
+    Ranked customer search results driven by the FTS5 shadow table.
+
+    Exposes ``count()`` and slicing so it can be handed straight to Django's
+    ``Paginator``. Matches are restricted to ``queryset`` inside the same
+    statement, so counts and pages agree for scoped querysets, and customer
+    rows are fetched for the requested page alone.
+    """
+
+    def __init__(self, queryset, tokens):
+        self.queryset = queryset
+        self.match = _fts_match_expression(tokens)
+        self._count = None
+
+    def _execute(self, select, suffix='', suffix_params=()):
+        scope_sql, scope_params = self.queryset.order_by().values('pk').query.sql_with_params()
+        sql = (
+            f'SELECT {select} FROM {FTS_TABLE} JOIN {SEARCH_TABLE} AS search ON search.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND search.customer_id IN ({scope_sql}) {suffix}'
+        )
+        with connections[self.queryset.db].cursor() as cursor:
+            cursor.execute(sql, [self.match, *scope_params, *suffix_params])
+            return cursor.fetchall()
+
+    def count(self):
+        if self._count is None:
+            self._count = self._execute('COUNT(*)')[0][0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        if stop <= start:
+            return []
+        rows = self._execute(
+            'search.customer_id', f'ORDER BY {FTS_TABLE}.rank LIMIT %s OFFSET %s', [stop - start, start],
+        )
+        field = self.queryset.model._meta.pk
+        ids = [field.to_python(row[0]) for row in rows]
+        customers = self.queryset.in_bulk(ids)
+        return [customers[pk] for pk in ids if pk in customers]
+
+
+def search_customers(queryset, query):
+    """
+    Return ranked customers matching every word in ``query``.
+
+    SQLite uses the FTS5 table maintained by triggers on the customer table;
+    PostgreSQL uses the trigram index on ``search_document``. Other backends
+    fall back to substring matching on the normalized column.
+    """
+    tokens = tokenize_query(query)
+    if not tokens:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return SQLiteSearchResults(queryset, tokens)
+
+    for token in tokens:
+        queryset = queryset.filter(search_document__icontains=token)
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return queryset.annotate(
+            search_rank=TrigramSimilarity('search_document', ' '.join(tokens)),
+        ).order_by('-search_rank', '-created_at')
+    return queryset.order_by('-created_at')
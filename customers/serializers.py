@@ -5,8 +5,15 @@ from .models import Customer
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
-        fields = ['id', 'name', 'email', 'phone', 'organization', 'metadata', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = [
+            'id', 'name', 'email', 'phone', 'organization', 'metadata',
+            'booking_count', 'cancel_count', 'first_booked_at', 'last_booked_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'booking_count', 'cancel_count', 'first_booked_at', 'last_booked_at',
+            'created_at', 'updated_at'
+        ]
         extra_kwargs = {
             'name': {'required': False, 'allow_blank': True},
             'email': {'required': False, 'allow_null': True, 'allow_blank': True},
@@ -14,3 +21,16 @@ class CustomerSerializer(serializers.ModelSerializer):
             'organization': {'required': False, 'allow_blank': True},
             'metadata': {'required': False}
         }
+
+    def validate_email(self, value):
+        # Mirrors the unique (owner, email) constraint, which the serializer
+        # does not see because owner is not one of its fields.
+        request = self.context.get('request')
+        owner = self.instance.owner if self.instance is not None else getattr(request, 'user', None)
+        if value and owner is not None:
+            customers = Customer.objects.filter(owner=owner, email=value)
+            if self.instance is not None:
+                customers = customers.exclude(pk=self.instance.pk)
+            if customers.exists():
+                raise serializers.ValidationError('A customer with this email already exists.')
+        return value
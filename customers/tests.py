@@ -1,3 +1,263 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.models import Booking
+from meeting_pages.models import MeetingPage
+from .activity import customer_for_attendee, customers_for_attendees, recompute_customer_stats
+from .bulk import CustomerImport, ImportFileError
+from .models import Customer
+from .search import build_search_document, install_sqlite_search_index, search_customers
+
+User = get_user_model()
+
+
+class CustomerSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Customer.objects.create(owner=self.user, name='José Álvarez', email='jose@acme.io', phone='+1 (555) 010-2030',
+                                organization='Acme', metadata={'notes': 'prefers mornings'})
+        Customer.objects.create(owner=self.user, name='Jane Doe', email='jane@globex.com', organization='Globex')
+
+    def search(self, query):
+        response = self.client.get('/api/customers/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_document_is_normalized(self):
+        document = build_search_document('José', 'J@X.io', '555-01', '', {'a': ['Über', 3]})
+        self.assertEqual(document, 'jose j@x.io 555-01 55501 uber 3')
+
+    def test_matches_every_source_field(self):
+        for query in ['jose', 'ALVAREZ', 'acme.io', '15550102030', 'acme', 'morn']:
+            with self.subTest(query=query):
+                data = self.search(query)
+                self.assertEqual([row['name'] for row in data['results']], ['José Álvarez'])
+
+    def test_index_follows_updates_and_deletes(self):
+        customer = Customer.objects.get(email='jane@globex.com')
+        customer.organization = 'Initech'
+        customer.save(update_fields=['organization'])
+        self.assertEqual(self.search('globex')['count'], 1)  # still matched by email
+        self.assertEqual(self.search('initech')['count'], 1)
+        customer.delete()
+        self.assertEqual(self.search('initech')['count'], 0)
+
+    def test_results_are_paginated(self):
+        Customer.objects.bulk_create([Customer(owner=self.user, name=f'Bulk {i}', search_document=f'bulk {i}') for i in range(25)])
+        data = self.search('bulk')
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(len(data['results']), 20)
+        self.assertIsNotNone(data['next'])
+
+    def test_blank_query_returns_nothing(self):
+        self.assertEqual(self.search('  ')['count'], 0)
+
+    def test_scoped_querysets_count_and_page_alike(self):
+        Customer.objects.bulk_create([
+            Customer(owner=self.user, name=f'Bulk {i}', organization='Acme' if i % 2 else '', search_document=f'bulk {i}')
+            for i in range(10)
+        ])
+        results = search_customers(Customer.objects.filter(organization='Acme'), 'bulk')
+        self.assertEqual(results.count(), 5)
+        self.assertEqual(len(results[0:20]), 5)
+
+    def test_rebuild_keeps_matching_by_customer_id(self):
+        install_sqlite_search_index(connection, rebuild=True)
+        customer = Customer.objects.get(email='jane@globex.com')
+        customer.organization = 'Initech'
+        customer.save(update_fields=['organization'])
+        self.assertEqual([row['id'] for row in self.search('initech')['results']], [str(customer.pk)])
+
+
+class CustomerActivityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro')
+        self.client = APIClient()
+
+    def book(self, email='ann@example.com', days=1):
+        response = self.client.post('/api/public/bookings/', {
+            'meeting_page': str(self.page.id),
+            'date': (timezone.now() + timedelta(days=days)).isoformat(),
+            'attendee_email': email,
+            'attendee_name': 'Ann',
+            'user_input': {'email': email},
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Booking.objects.get(pk=response.data['id'])
+
+    def test_bookings_reuse_customer_and_update_stats(self):
+        first = self.book()
+        second = self.book(days=2)
+        self.assertEqual(Customer.objects.count(), 1)
+        customer = Customer.objects.get()
+        self.assertEqual(first.customer_id, customer.pk)
+        self.assertEqual(second.customer_id, customer.pk)
+        self.assertEqual((customer.booking_count, customer.cancel_count), (2, 0))
+        self.assertEqual(customer.first_booked_at, first.created_at)
+        self.assertEqual(customer.last_booked_at, second.created_at)
+
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/bookings/{first.pk}/cancel/')
+        self.client.post(f'/api/bookings/{first.pk}/cancel/')  # idempotent
+        customer.refresh_from_db()
+        self.assertEqual(customer.cancel_count, 1)
+
+        second.delete()
+        customer.refresh_from_db()
+        self.assertEqual((customer.booking_count, customer.last_booked_at), (1, first.created_at))
+
+    def test_customers_are_kept_per_host(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        theirs = customer_for_attendee(other, 'ann@example.com', 'Ann')
+        mine = self.book()
+        self.assertNotEqual(mine.customer_id, theirs.pk)
+        self.assertEqual(Customer.objects.get(pk=mine.customer_id).owner, self.user)
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.booking_count, 0)
+
+        self.assertEqual(customer_for_attendee(other, 'ann@example.com'), theirs)
+        found = customers_for_attendees(other, [('ann@example.com', 'Ann', {}), ('bo@example.com', 'Bo', {})])
+        self.assertEqual(found['ann@example.com'], theirs)
+        self.assertEqual(Customer.objects.filter(owner=other).count(), 2)
+
+    def test_owner_and_email_are_unique(self):
+        Customer.objects.create(owner=self.user, email='ann@example.com')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Customer.objects.create(owner=self.user, email='ann@example.com')
+
+    def test_recompute_corrects_drift(self):
+        self.book()
+        Customer.objects.update(booking_count=7, cancel_count=3)
+        self.assertEqual(recompute_customer_stats(), 1)
+        customer = Customer.objects.get()
+        self.assertEqual((customer.booking_count, customer.cancel_count), (1, 0))
+
+    def test_timeline_is_paginated_and_scoped_to_owner(self):
+        for day in range(1, 4):
+            self.book(days=day)
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        other_page = MeetingPage.objects.create(user=other, title='Other', slug='other')
+        customer = Customer.objects.get()
+        Booking.objects.create(meeting_page=other_page, customer=customer, date=timezone.now())
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(f'/api/customers/{customer.pk}/bookings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        dates = [row['date'] for row in response.data['results']]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+
+class CustomerBulkTransferTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.existing = Customer.objects.create(
+            owner=self.user, name='Old Name', email='old@example.com', organization='Keep',
+        )
+
+    def upload(self, name, content, **params):
+        return self.client.post(
+            '/api/customers/import/' + ('?file_format=' + params['file_format'] if params else ''),
+            {'file': SimpleUploadedFile(name, content.encode())},
+            format='multipart',
+        )
+
+    def test_csv_import_upserts_and_reports_errors(self):
+        content = (
+            'name,email,phone,source\n'
+            'New Person,new@example.com,555,webinar\n'
+            'Renamed,old@example.com,,\n'
+            'Broken,not-an-email,,\n'
+        )
+        response = self.upload('contacts.csv', content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 4)
+        self.assertIn('email', response.data['errors'][0]['errors'])
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.organization), ('Renamed', 'Keep'))
+        created = Customer.objects.get(email='new@example.com')
+        self.assertEqual(created.metadata, {'source': 'webinar'})
+        search = self.client.get('/api/customers/search/', {'q': 'webinar'})
+        self.assertEqual(search.data['count'], 1)
+
+    def test_ndjson_import_in_small_batches(self):
+        lines = [json.dumps({'name': f'P{i}', 'email': f'p{i}@example.com'}) for i in range(5)]
+        lines.append('{broken')
+        report = CustomerImport(self.user, batch_size=2).run([line.encode() + b'\n' for line in lines], 'ndjson')
+        self.assertEqual((report['created'], report['failed']), (5, 1))
+        self.assertEqual(Customer.objects.count(), 6)
+
+    def test_export_round_trips_through_import(self):
+        response = self.client.get('/api/customers/export/', {'file_format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('old@example.com', content)
+
+        response = self.upload('customers.csv', content)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (0, 1, 0))
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_other_hosts_customers_stay_hidden(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        foreign = Customer.objects.create(owner=other, name='Foreign Person', email='old@example.com')
+        page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro')
+        booked = Customer.objects.create(name='Booked Guest', email='guest@example.com')
+        Booking.objects.create(meeting_page=page, customer=booked, date=timezone.now())
+
+        content = b''.join(self.client.get('/api/customers/export/').streaming_content).decode()
+        self.assertIn('Booked Guest', content)
+        self.assertNotIn('Foreign Person', content)
+        self.assertEqual(self.client.get('/api/customers/search/', {'q': 'foreign'}).data['count'], 0)
+        self.assertEqual(self.client.get(f'/api/customers/{foreign.pk}/').status_code, 404)
+
+        response = self.upload('contacts.csv', f'id,name\n{foreign.pk},Hijacked\n')
+        self.assertEqual((response.data['updated'], response.data['failed']), (0, 1))
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.name, 'Foreign Person')
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Old Name')
+
+    def test_create_rejects_a_duplicate_email(self):
+        response = self.client.post('/api/customers/', {'name': 'Again', 'email': 'old@example.com'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+        response = self.client.post('/api/customers/', {'name': 'New', 'email': 'new@example.com'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Customer.objects.get(email='new@example.com').owner, self.user)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.upload('contacts.xlsx', 'x')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unreadable_file_is_rejected_with_row(self):
+        response = self.client.post(
+            '/api/customers/import/',
+            {'file': SimpleUploadedFile('contacts.csv', b'name,email\nAnn,ann@example.com\nB\xe9a,bea@example.com\n')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['row'], 3)
+        self.assertIn('Row 3', response.data['error'])
+
+        response = self.upload('contacts.csv', 'name,email\nAnn,"' + 'x' * 200000 + '"\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Malformed CSV', response.data['error'])
 
-# Create your tests here.
+    def test_ndjson_decode_error_names_the_row(self):
+        lines = [b'{"name": "Ann"}\n', b'{"name": "B\xe9a"}\n']
+        with self.assertRaisesMessage(ImportFileError, 'Row 2'):
+            CustomerImport(self.user).run(lines, 'ndjson')
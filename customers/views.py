@@ -1,7 +1,16 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from bookings.models import Booking
+from bookings.serializers import BookingSerializer
+from .activity import host_customers
+from .bulk import FILE_FORMATS, CustomerImport, ImportFileError, detect_format, iter_export
 from .models import Customer
+from .search import search_customers
 from .serializers import CustomerSerializer
 
 
@@ -13,4 +22,60 @@ class CustomerViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Customer.objects.all()
+        # Only the user's own customers: search, export and the stats
+        # columns must not reveal other hosts' attendees.
+        return host_customers(self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked search across name, email, phone, organization and metadata"""
+        results = search_customers(self.get_queryset(), request.query_params.get('q', ''))
+        page = self.paginate_queryset(results)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_customers(self, request):
+        """Upsert customers from an uploaded CSV or NDJSON file"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = detect_format(upload.name, request.query_params.get('file_format'))
+        if file_format is None:
+            return Response({'error': 'file_format must be csv or ndjson'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        importer = CustomerImport(request.user)
+        try:
+            report = importer.run(upload, file_format)
+        except ImportFileError as exc:
+            return Response({'error': str(exc), 'row': exc.row, **importer.report()},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the user's customers as CSV or NDJSON"""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FILE_FORMATS:
+            return Response({'error': 'file_format must be csv or ndjson'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(iter_export(self.get_queryset(), file_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="customers.{file_format}"'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def bookings(self, request, pk=None):
+        """Paginated booking timeline for a customer, newest first"""
+        customer = self.get_object()
+        bookings = (
+            Booking.objects.filter(customer=customer, meeting_page__user=request.user)
+            .select_related('meeting_page__user')
+            .order_by('-date')
+        )
+        page = self.paginate_queryset(bookings)
+        serializer = BookingSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class MeebridgeBackendConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'meebridge_backend'
+
+    def ready(self):
+        from . import signals  # noqa: F401
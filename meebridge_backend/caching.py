@@ -0,0 +1,201 @@
+"""
+Application data cache on top of Django's cache framework.
+
+Entries live in the ``API_CACHE_ALIAS`` cache (see ``CACHE_BACKEND`` in the
+settings). Keys built with ``make_key`` are namespaced per owner and carry
+the owner's current version of the namespace; ``invalidate`` bumps that
+version, which makes every entry of the owner stale at once without having
+to find and delete them, something file and Redis caches cannot do cheaply.
+Stale entries simply expire.
+
+Misses are recomputed single-flight: within a process one thread computes
+while the others wait for its result, and across processes a short-lived
+lock entry (``cache.add``) makes the others poll for the value for up to
+``CACHE_LOCK_TIMEOUT`` seconds before computing it themselves. Values
+are computed from the primary database: one filled from a lagging read
+replica would be served to every client until it expires.
+
+Every lookup is counted in ``metrics.cache_lookups`` and sent as the
+``cache_lookup`` signal for other listeners.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import Signal
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import db_router, metrics
+
+# Sent with ``name`` (the cache's label) and ``hit`` for every lookup.
+cache_lookup = Signal()
+
+_MISS = object()
+_POLL_SECONDS = 0.02
+_local_locks = {}
+_local_locks_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def record_lookup(name, hit):
+    metrics.record_cache_lookup(name, hit)
+    cache_lookup.send(sender=None, name=name, hit=hit)
+
+
+def _version_key(namespace, owner):
+    return f'version:{namespace}:{owner}'
+
+
+def _initial_version():
+    # Versions start from the clock so that a version key that was evicted
+    # never comes back at a number whose entries may still be cached.
+    return int(time.time() * 1000)
+
+
+def version(namespace, owner):
+    cache = get_cache()
+    key = _version_key(namespace, owner)
+    current = cache.get(key)
+    if current is None:
+        cache.add(key, _initial_version(), None)
+        current = cache.get(key)
+    return current
+
+
+def make_key(namespace, owner, *parts):
+    """A key for ``parts`` in the owner's current version of ``namespace``."""
+    return ':'.join([namespace, str(owner), f'v{version(namespace, owner)}', *map(str, parts)])
+
+
+def _bump(namespace, owner):
+    cache = get_cache()
+    key = _version_key(namespace, owner)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def invalidate(namespace, owner):
+    """
+    Make every cached entry of ``owner`` in ``namespace`` stale. Inside a
+    transaction the version is bumped again once it commits: a miss
+    recomputed in between read the old rows and stored them under the
+    new version.
+    """
+    _bump(namespace, owner)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(namespace, owner))
+
+
+@contextmanager
+def _local_lock(key):
+    with _local_locks_lock:
+        entry = _local_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _local_locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _local_locks[key]
+
+
+def _wait_for(cache, key, lock_key):
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(_POLL_SECONDS)
+        value = cache.get(key, _MISS)
+        # Without the lock the other process failed, so stop waiting.
+        if value is not _MISS or lock_key not in cache:
+            return value
+    return _MISS
+
+
+def _fill(cache, key, compute, timeout):
+    with db_router.primary_reads():
+        value = compute()
+    cache.set(key, value, timeout)
+    return value
+
+
+def get_or_set(key, compute, timeout, name):
+    """
+    Return the cached value for ``key``, computing and storing it with
+    ``compute()`` on a miss. ``compute`` may raise to store nothing. A
+    ``timeout`` of 0 stores nothing, so ``compute()`` then runs as usual,
+    replicas included.
+    """
+    if timeout == 0:
+        record_lookup(name, False)
+        return compute()
+    cache = get_cache()
+    value = cache.get(key, _MISS)
+    record_lookup(name, value is not _MISS)
+    if value is not _MISS:
+        return value
+
+    with _local_lock(key):
+        value = cache.get(key, _MISS)
+        if value is not _MISS:
+            return value
+        lock_key = f'{key}:lock'
+        if cache.add(lock_key, True, settings.CACHE_LOCK_TIMEOUT):
+            try:
+                value = _fill(cache, key, compute, timeout)
+            finally:
+                cache.delete(lock_key)
+            return value
+        value = _wait_for(cache, key, lock_key)
+        if value is _MISS:
+            value = _fill(cache, key, compute, timeout)
+        return value
+
+
+class _Uncacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def cache_response(namespace, key_func, timeout_setting, name):
+    """
+    Cache the data of successful responses of a DRF view method.
+
+    ``key_func(request, *args, **kwargs)`` returns ``(owner, parts)``, which
+    are passed to ``make_key``, or ``None`` to bypass the cache. Entries
+    expire after the number of seconds in the ``timeout_setting`` setting;
+    other status codes are never cached.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            resolved = key_func(request, *args, **kwargs)
+            if resolved is None:
+                return method(view, request, *args, **kwargs)
+            owner, parts = resolved
+
+            def compute():
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    raise _Uncacheable(response)
+                return response.data
+
+            try:
+                data = get_or_set(
+                    make_key(namespace, owner, *parts), compute, getattr(settings, timeout_setting), name,
+                )
+            except _Uncacheable as uncacheable:
+                return uncacheable.response
+            return Response(data)
+        return wrapper
+    return decorator
@@ -0,0 +1,128 @@
+"""
+Read-replica routing.
+
+Reads are sent to a replica only while a view listed in
+``READ_REPLICA_VIEWS`` runs; everything else, and every write, uses the
+primary. ``ReplicaRoutingMiddleware`` keeps the per-request state here:
+once a request writes, its remaining reads go to the primary, and the
+client is pinned to the primary for ``DATABASE_REPLICA_PIN_SECONDS`` so it
+reads its own writes despite replication lag. A replica that cannot be
+connected to is skipped for ``DATABASE_REPLICA_RETRY_SECONDS``; with none
+left, reads fall back to the primary. Data computed for other clients,
+such as cache fills, is read from the primary within ``primary_reads``.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_state = ContextVar('replica_routing', default=None)
+_round_robin = itertools.count()
+_unavailable = {}
+_unavailable_lock = threading.Lock()
+
+
+class RoutingState:
+    __slots__ = ('replica_allowed', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.replica_allowed = False
+        # Reads go to the primary: the client recently wrote, or this request has.
+        self.pinned = pinned
+        self.wrote = False
+
+
+def activate(state):
+    return _state.set(state)
+
+
+def deactivate(token):
+    _state.reset(token)
+
+
+def current_state():
+    return _state.get()
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, even in a replica view."""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    replica_allowed = state.replica_allowed
+    state.replica_allowed = False
+    try:
+        yield
+    finally:
+        state.replica_allowed = replica_allowed
+
+
+def _available(alias):
+    with _unavailable_lock:
+        retry_at = _unavailable.get(alias)
+        if retry_at is None:
+            return True
+        if time.monotonic() < retry_at:
+            return False
+        del _unavailable[alias]
+    return True
+
+
+def _connects(alias):
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        logger.warning("Read replica %s is unavailable; using the primary", alias, exc_info=True)
+        with _unavailable_lock:
+            _unavailable[alias] = time.monotonic() + settings.DATABASE_REPLICA_RETRY_SECONDS
+        return False
+    return True
+
+
+def choose_replica():
+    """A reachable replica alias, in round-robin order, or ``None``."""
+    replicas = settings.DATABASE_READ_REPLICAS
+    if not replicas:
+        return None
+    start = next(_round_robin)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if _available(alias) and _connects(alias):
+            return alias
+    return None
+
+
+def reset_unavailable():
+    with _unavailable_lock:
+        _unavailable.clear()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_allowed or state.pinned:
+            return None
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = True
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's rows.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
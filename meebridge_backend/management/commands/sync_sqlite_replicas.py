@@ -0,0 +1,27 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = "Copy the SQLite primary into each SQLite read replica (for local replica testing)"
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("The primary database is not SQLite")
+        replicas = [alias for alias in settings.DATABASE_READ_REPLICAS if connections[alias].vendor == 'sqlite']
+        if not replicas:
+            raise CommandError("No SQLite replicas configured; set DATABASE_REPLICAS")
+
+        primary.ensure_connection()
+        for alias in replicas:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"Copied the primary to {alias}"))
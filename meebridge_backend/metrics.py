@@ -0,0 +1,268 @@
+"""
+In-process metrics with a Prometheus text exposition endpoint.
+
+Counters and fixed-bucket histograms are kept per process, each behind its
+own lock that is held only for a dict update. When ``METRICS_DIR`` is set
+(one directory shared by all workers of a deployment), every process writes
+a snapshot of its metrics to ``<METRICS_DIR>/<pid>.json`` at most once per
+``METRICS_FLUSH_INTERVAL`` seconds, and ``/metrics`` sums the snapshots of
+all workers. Without it, ``/metrics`` reports the serving process only.
+
+A worker removes its snapshot when it exits, and ``/metrics`` deletes the
+snapshots of pids that are no longer running (workers that were killed),
+so the directory must not be shared between hosts.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_registry = {}
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+_cleanup_registered = False
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), register=True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if register:
+            _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            samples = [[list(key), self._copy(value)] for key, value in self._values.items()]
+        return {'kind': self.kind, 'help': self.documentation, 'labelnames': list(self.labelnames),
+                'samples': samples, **self._extra()}
+
+    def _copy(self, value):
+        return value
+
+    def _extra(self):
+        return {}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        maybe_flush()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS, register=True):
+        super().__init__(name, documentation, labelnames, register)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket (non-cumulative) counts, then sum and count.
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+        maybe_flush()
+
+    def _copy(self, value):
+        return list(value)
+
+    def _extra(self):
+        return {'buckets': list(self.buckets)}
+
+
+requests_total = Counter(
+    'meebridge_http_requests_total', 'HTTP requests by route, method and status.',
+    ['route', 'method', 'status'],
+)
+request_duration = Histogram(
+    'meebridge_http_request_duration_seconds', 'HTTP request latency by route.', ['route', 'method'],
+)
+request_queries = Histogram(
+    'meebridge_http_request_queries', 'Database queries per HTTP request by route.', ['route'],
+    buckets=QUERY_BUCKETS,
+)
+booking_emails = Counter(
+    'meebridge_booking_emails_total', 'Booking emails by action and outcome.', ['action', 'outcome'],
+)
+cache_lookups = Counter(
+    'meebridge_cache_lookups_total', 'Application cache lookups by cache and result.', ['cache', 'result'],
+)
+response_bytes = Counter(
+    'meebridge_http_response_bytes_total', 'Compressed response bodies before and after compression.',
+    ['encoding', 'stage'],
+)
+bookings_created = Counter(
+    'meebridge_bookings_created_total', 'Bookings created by source.', ['source'],
+)
+
+
+def observe_request(method, stats):
+    route = stats.route or 'unmatched'
+    requests_total.inc(route=route, method=method, status=stats.status)
+    request_duration.observe(stats.duration, route=route, method=method)
+    request_queries.observe(stats.queries, route=route)
+
+
+def record_cache_lookup(cache, hit):
+    cache_lookups.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_compression(encoding, original, compressed):
+    response_bytes.inc(original, encoding=encoding, stage='original')
+    response_bytes.inc(compressed, encoding=encoding, stage='compressed')
+
+
+def snapshot():
+    return {name: metric.snapshot() for name, metric in _registry.items()}
+
+
+def _snapshot_path(directory, pid=None):
+    return os.path.join(directory, f'{pid or os.getpid()}.json')
+
+
+def _remove_snapshot(directory, pid=None):
+    try:
+        os.remove(_snapshot_path(directory, pid))
+    except FileNotFoundError:
+        pass
+
+
+def _is_running(pid):
+    if os.name != 'posix':
+        return True  # os.kill() would terminate the process
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # running as another user
+    return True
+
+
+def flush():
+    global _cleanup_registered
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    if not _cleanup_registered:
+        # Resolves the pid at exit, so forked workers remove their own file.
+        atexit.register(_remove_snapshot, directory)
+        _cleanup_registered = True
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as handle:
+        json.dump(snapshot(), handle)
+    os.replace(tmp_path, _snapshot_path(directory))
+
+
+def maybe_flush():
+    global _last_flush
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if now - _last_flush < settings.METRICS_FLUSH_INTERVAL or not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _last_flush = now
+        flush()
+    finally:
+        _flush_lock.release()
+
+
+def _merge(total, other):
+    for name, metric in other.items():
+        merged = total.setdefault(name, {**metric, 'samples': []})
+        values = {tuple(labels): value for labels, value in merged['samples']}
+        for labels, value in metric['samples']:
+            labels = tuple(labels)
+            if labels not in values:
+                values[labels] = value
+            elif metric['kind'] == 'histogram':
+                values[labels] = [a + b for a, b in zip(values[labels], value)]
+            else:
+                values[labels] += value
+        merged['samples'] = [[list(labels), value] for labels, value in values.items()]
+
+
+def collect():
+    """Metrics of this process, or of every worker when ``METRICS_DIR`` is set."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return snapshot()
+    flush()
+    total = {}
+    for filename in sorted(os.listdir(directory)):
+        pid = filename[:-len('.json')]
+        if not filename.endswith('.json') or not pid.isdigit():
+            continue
+        if not _is_running(int(pid)):
+            _remove_snapshot(directory, pid)
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as handle:
+                _merge(total, json.load(handle))
+        except (OSError, ValueError):
+            continue  # a worker is replacing its file
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(metrics):
+    """Render collected metrics in the Prometheus text format (0.0.4)."""
+    lines = []
+    for name, metric in sorted(metrics.items()):
+        lines.append(f'# HELP {name} {metric["help"]}')
+        lines.append(f'# TYPE {name} {metric["kind"]}')
+        names = metric['labelnames']
+        for labels, value in sorted(metric['samples']):
+            if metric['kind'] != 'histogram':
+                lines.append(f'{name}{_labels(names, labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip([*metric['buckets'], '+Inf'], value):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{name}_bucket{_labels(names, labels, [("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(names, labels)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(names, labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
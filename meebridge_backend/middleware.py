@@ -1,4 +1,22 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from . import db_router, metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('meebridge.requests')
 
 
 class DisableCSRFMiddleware(MiddlewareMixin):
@@ -13,3 +31,225 @@ class DisableCSRFMiddleware(MiddlewareMixin):
             setattr(request, '_dont_enforce_csrf_checks', True)
         return None
 
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Measure each request's wall time, query count and database time.
+
+    Queries are timed with ``connection.execute_wrapper`` on every database
+    alias, which costs one extra Python call per query. Results are exposed
+    as a ``Server-Timing`` header, as ``request.instrumentation`` and in the
+    per-route metrics served at ``/metrics``, and
+    requests slower than ``REQUEST_SLOW_MS`` or running more than
+    ``REQUEST_SLOW_QUERY_COUNT`` queries are logged with their slowest
+    statements.
+    """
+    SLOWEST_QUERIES = 3
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        request.instrumentation = stats
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats.time_query))
+            started = time.perf_counter()
+            response = self.get_response(request)
+            stats.duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        stats.route = match.view_name if match else None
+        stats.status = response.status_code
+        metrics.observe_request(request.method, stats)
+        if settings.REQUEST_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'app;dur={stats.duration * 1000:.1f}, '
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+            )
+        if (
+            stats.duration * 1000 >= settings.REQUEST_SLOW_MS
+            or stats.queries >= settings.REQUEST_SLOW_QUERY_COUNT
+        ):
+            self.log_slow_request(request, stats)
+        return response
+
+    def log_slow_request(self, request, stats):
+        slowest = '\n'.join(f'  {duration * 1000:.1f} ms  {sql}' for duration, sql in stats.slowest)
+        logger.warning(
+            "Slow request %s %s (%s) -> %s: %.0f ms, %d queries, %.0f ms in database\n%s",
+            request.method, request.path, stats.route, stats.status,
+            stats.duration * 1000, stats.queries, stats.db_time * 1000, slowest,
+        )
+
+
+class RequestStats:
+    __slots__ = ('duration', 'queries', 'db_time', 'slowest', 'route', 'status')
+
+    def __init__(self):
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        # The few slowest statements as (seconds, sql), slowest first.
+        self.slowest = []
+        self.route = None
+        self.status = None
+
+    def time_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            slowest = self.slowest
+            if len(slowest) < RequestInstrumentationMiddleware.SLOWEST_QUERIES or elapsed > slowest[-1][0]:
+                slowest.append((elapsed, sql))
+                slowest.sort(key=lambda item: item[0], reverse=True)
+                del slowest[RequestInstrumentationMiddleware.SLOWEST_QUERIES:]
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let the views in ``READ_REPLICA_VIEWS`` read from replicas (see
+    ``meebridge_backend.db_router``) and pin clients that wrote to the
+    primary with a short-lived cookie.
+    """
+    PIN_COOKIE = 'mb_read_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_READ_REPLICAS:
+            return self.get_response(request)
+        state = db_router.RoutingState(pinned=self.PIN_COOKIE in request.COOKIES)
+        token = db_router.activate(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.deactivate(token)
+        if state.wrote:
+            response.set_cookie(
+                self.PIN_COOKIE, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = db_router.current_state()
+        if state is not None:
+            state.replica_allowed = request.resolver_match.view_name in settings.READ_REPLICA_VIEWS
+
+
+def _gzip(content):
+    # Random bytes in the gzip header, as Django's GZipMiddleware adds, make
+    # BREACH-style length probing harder.
+    return compress_string(content, max_random_bytes=GZipMiddleware.max_random_bytes)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+
+# In order of preference when the client weighs them equally.
+ENCODERS = {'br': _brotli} if brotli is not None else {}
+ENCODERS['gzip'] = _gzip
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'application/x-ndjson',
+    'image/svg+xml',
+)
+
+
+def choose_encoding(accept_encoding):
+    """The supported encoding the ``Accept-Encoding`` value prefers, if any."""
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        weight = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = weight
+    wildcard = weights.get('*', 0.0)
+    best, best_weight = None, 0.0
+    for encoding in ENCODERS:
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress text and JSON responses of at least ``COMPRESSION_MIN_BYTES``
+    with brotli (when the ``brotli`` package is installed) or gzip, as
+    negotiated with ``Accept-Encoding``. Streaming responses, such as the
+    customer export, are passed through: compressing them would hold back
+    each chunk until the compressor flushes, delaying the download.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.COMPRESSION_MIN_BYTES
+            or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        original = len(response.content)
+        compressed = ENCODERS[encoding](response.content)
+        if len(compressed) >= original:
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The representation changed, so a strong ETag has to become weak.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        metrics.record_compression(encoding, original, len(compressed))
+        return response
+
+
+class CacheControlMiddleware:
+    """
+    Give GET and HEAD responses without a ``Cache-Control`` header the
+    policy of their view in ``CACHE_CONTROL_POLICIES``, or else
+    ``CACHE_CONTROL_AUTHENTICATED`` for signed-in users and
+    ``CACHE_CONTROL_DEFAULT`` for everyone else.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD') or response.has_header('Cache-Control'):
+            return response
+        match = request.resolver_match
+        policy = settings.CACHE_CONTROL_POLICIES.get(match.view_name) if match else None
+        if policy is None:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                policy = settings.CACHE_CONTROL_AUTHENTICATED
+            else:
+                policy = settings.CACHE_CONTROL_DEFAULT
+        patch_cache_control(response, **policy)
+        return response
@@ -10,10 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import copy
 import os
 from pathlib import Path
 
 import certifi
+from django.core.exceptions import ImproperlyConfigured
 
 os.environ.setdefault('SSL_CERT_FILE', certifi.where())
 os.environ.setdefault('REQUESTS_CA_BUNDLE', certifi.where())
@@ -84,9 +86,15 @@ INSTALLED_APPS = [
     'bookings',
     'analytics',
     'customers',
+    'benchmarks',
+    'meebridge_backend',
 ]
 
 MIDDLEWARE = [
+    'meebridge_backend.middleware.RequestInstrumentationMiddleware',
+    'meebridge_backend.middleware.CompressionMiddleware',
+    'meebridge_backend.middleware.CacheControlMiddleware',
+    'meebridge_backend.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -121,13 +129,132 @@ WSGI_APPLICATION = 'meebridge_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_ENGINE selects a profile: 'sqlite' (default) or 'postgres'.
+
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DATABASE_NAME', 'meebridge'),
+            'USER': os.environ.get('DATABASE_USER', ''),
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('DATABASE_HOST', ''),
+            'PORT': os.environ.get('DATABASE_PORT', ''),
+            # Persistent connections, checked before reuse after a request.
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    # psycopg connection pool (needs psycopg[pool]); replaces persistent
+    # connections, which Django does not allow together with a pool.
+    if os.environ.get('DATABASE_POOL', 'False').lower() in ('true', '1', 'yes'):
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+        }
+elif DATABASE_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so concurrent
+                # writers wait for busy_timeout instead of failing with
+                # "database is locked" when upgrading a read lock.
+                'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DATABASE_ENGINE {DATABASE_ENGINE!r}; use 'sqlite' or 'postgres'")
+
+# Read replicas: DATABASE_REPLICAS lists, comma-separated, the replica files
+# (SQLite) or hosts (Postgres), which become the 'replica_<n>' aliases with
+# otherwise the primary's settings. Only the views named in
+# READ_REPLICA_VIEWS read from them (meebridge_backend.db_router); a client
+# that writes reads from the primary for DATABASE_REPLICA_PIN_SECONDS, and
+# an unreachable replica is skipped for DATABASE_REPLICA_RETRY_SECONDS.
+DATABASE_READ_REPLICAS = []
+for number, target in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), start=1):
+    replica = copy.deepcopy(DATABASES['default'])
+    replica['HOST' if DATABASE_ENGINE == 'postgres' else 'NAME'] = target.strip()
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{number}'] = replica
+    DATABASE_READ_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['meebridge_backend.db_router.ReplicaRouter']
+READ_REPLICA_VIEWS = ['meeting-page-public', 'booking-available-slots', 'analytics']
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', 10))
+DATABASE_REPLICA_RETRY_SECONDS = int(os.environ.get('DATABASE_REPLICA_RETRY_SECONDS', 30))
+
+# Pragmas applied to every new SQLite connection (meebridge_backend.signals).
+# SQLITE_TUNING=False keeps SQLite's defaults (rollback journal, FULL sync).
+if os.environ.get('SQLITE_TUNING', 'True').lower() in ('true', '1', 'yes'):
+    SQLITE_PRAGMAS = {
+        # Readers no longer block the writer, nor the writer readers.
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+        # Durable across application crashes; in WAL mode only a power loss
+        # can drop the last commits.
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
     }
+else:
+    SQLITE_PRAGMAS = {}
+
+
+# Caches and sessions
+# CACHE_BACKEND selects the default cache: 'locmem' (per process), 'file'
+# (CACHE_LOCATION is a directory shared by the workers on one host), 'redis'
+# (CACHE_LOCATION is a redis:// URL of Redis or a compatible server such as
+# Valkey or KeyDB; needs the redis package) or a backend's dotted path.
+# locmem stands in for Redis in tests and local runs.
+# The 'sessions' cache is local to each process by default; point
+# SESSION_CACHE_BACKEND/SESSION_CACHE_LOCATION at a shared cache when running
+# several workers.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+_cache_backend, _cache_location = _CACHE_BACKENDS.get(CACHE_BACKEND, (CACHE_BACKEND, ''))
+
+CACHES = {
+    'default': {
+        'BACKEND': _cache_backend,
+        'LOCATION': os.environ.get('CACHE_LOCATION', _cache_location),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'meebridge'),
+    },
+    'sessions': {
+        'BACKEND': os.environ.get('SESSION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('SESSION_CACHE_LOCATION', 'sessions'),
+    },
 }
 
+# meebridge_backend.caching: the cache holding API data, and how long a miss
+# being recomputed by another worker is waited for.
+API_CACHE_ALIAS = 'default'
+CACHE_LOCK_TIMEOUT = int(os.environ.get('CACHE_LOCK_TIMEOUT', 10))
+# Seconds cached slot lookups and analytics are served. Booking and meeting
+# page changes invalidate them; analytics also shift with the clock. 0 turns
+# the cache off, letting these views read from replicas.
+AVAILABLE_SLOTS_CACHE_TIMEOUT = int(os.environ.get('AVAILABLE_SLOTS_CACHE_TIMEOUT', 300))
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get('ANALYTICS_CACHE_TIMEOUT', 60))
+
+# Database-backed sessions read through the cache; unchanged sessions are not
+# written back (see users.sessions).
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'users.sessions')
+SESSION_CACHE_ALIAS = 'sessions'
+# Longest a session may be served from cache without re-reading the database.
+SESSION_CACHE_TIMEOUT = int(os.environ.get('SESSION_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -173,26 +300,136 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
+# The session user is loaded from the cache; saves invalidate it.
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
+
+# Plan limits enforced by users.quotas; None means unlimited.
+PLAN_QUOTAS = {
+    'free': {
+        'bookings_per_month': int(os.environ.get('FREE_PLAN_BOOKINGS_PER_MONTH', 100)),
+        'active_pages': int(os.environ.get('FREE_PLAN_ACTIVE_PAGES', 5)),
+    },
+    'premium': {
+        'bookings_per_month': None,
+        'active_pages': None,
+    },
+}
+
 # Booking defaults
 GOOGLE_MEET_LINK = os.environ.get('GOOGLE_MEET_LINK', 'https://meet.google.com/kro-egve-ssm')
+
+# Seconds a public booking response is replayed for a repeated Idempotency-Key.
+BOOKING_IDEMPOTENCY_TTL = int(os.environ.get('BOOKING_IDEMPOTENCY_TTL', 86400))
+
+# How emails from bulk booking changes are sent after commit: 'background'
+# (one worker thread, a single SMTP connection per batch) or 'sync'.
+BOOKING_BULK_EMAIL_DELIVERY = os.environ.get('BOOKING_BULK_EMAIL_DELIVERY', 'background')
+
+# Largest booking form submission (user_input JSON) accepted, in bytes.
+BOOKING_USER_INPUT_MAX_BYTES = int(os.environ.get('BOOKING_USER_INPUT_MAX_BYTES', 16384))
+
+# Seconds a public meeting page response may be served from cache. Saves and
+# deletes invalidate it immediately; this bounds staleness across processes.
+MEETING_PAGE_PUBLIC_CACHE_TIMEOUT = int(os.environ.get('MEETING_PAGE_PUBLIC_CACHE_TIMEOUT', 300))
+
+# How resized meeting page images are generated after upload: 'background'
+# (thread pool after commit), 'sync' (after commit, in the request) or 'off'
+# (only via the process_meeting_page_images command).
+MEETING_PAGE_IMAGE_PROCESSING = os.environ.get('MEETING_PAGE_IMAGE_PROCESSING', 'background')
+MEETING_PAGE_IMAGE_WORKERS = int(os.environ.get('MEETING_PAGE_IMAGE_WORKERS', 2))
+
+# Request instrumentation (meebridge_backend.middleware): add Server-Timing
+# headers, and log requests slower than REQUEST_SLOW_MS or running at least
+# REQUEST_SLOW_QUERY_COUNT queries together with their slowest statements.
+REQUEST_SERVER_TIMING = os.environ.get('REQUEST_SERVER_TIMING', 'True').lower() in ('true', '1', 'yes')
+REQUEST_SLOW_MS = int(os.environ.get('REQUEST_SLOW_MS', 500))
+REQUEST_SLOW_QUERY_COUNT = int(os.environ.get('REQUEST_SLOW_QUERY_COUNT', 50))
+
+# Metrics served at /metrics (meebridge_backend.metrics). With several worker
+# processes, set METRICS_DIR to a directory shared by all of them; each worker
+# writes its snapshot there at most every METRICS_FLUSH_INTERVAL seconds.
+# When METRICS_TOKEN is set, scrapes must send "Authorization: Bearer <token>".
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Seconds an authenticated API key stays cached in-process. Rotation and
+# revocation clear it locally; this bounds staleness across processes.
+API_KEY_CACHE_TTL = int(os.environ.get('API_KEY_CACHE_TTL', 60))
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
+        'users.authentication.ApiKeyAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # orjson-backed JSON (meebridge_backend.renderers/parsers); both behave
+    # like DRF's own classes when orjson is not installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'meebridge_backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'meebridge_backend.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20
+    'PAGE_SIZE': 20,
+    # Public booking routes (bookings.throttling): per client address and
+    # per meeting page, each with a burst and a sustained rate.
+    'DEFAULT_THROTTLE_RATES': {
+        'public_booking_ip_burst': '10/min',
+        'public_booking_ip_sustained': '100/day',
+        'public_booking_page_burst': '60/min',
+        'public_booking_page_sustained': '2000/day',
+        'public_slots_ip_burst': '60/min',
+        'public_slots_ip_sustained': '2000/day',
+        'public_slots_page_burst': '300/min',
+        'public_slots_page_sustained': '50000/day',
+        'public_manage_ip_burst': '30/min',
+        'public_manage_ip_sustained': '500/day',
+    },
+    # Reverse proxies in front of the app. Throttles identify clients by the
+    # X-Forwarded-For entry this many hops from the end, and by REMOTE_ADDR
+    # when it is 0, so clients cannot pick their own address.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+# PUBLIC_THROTTLING=False turns the public rate limits off, e.g. for load tests.
+if os.environ.get('PUBLIC_THROTTLING', 'True').lower() not in ('true', '1', 'yes'):
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {}
+
+# Response compression (meebridge_backend.middleware): brotli when the
+# package is installed and the client accepts it, otherwise gzip, for text
+# and JSON bodies of at least COMPRESSION_MIN_BYTES.
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Cache-Control for GET/HEAD responses that do not set their own, as
+# patch_cache_control() arguments: by view name, then for signed-in users,
+# then for everyone else. The public meeting page sets its own (public, but
+# revalidated through its ETag).
+CACHE_CONTROL_POLICIES = {
+    # Slots list attendee names and emails, so only the visitor's browser
+    # may keep them, and briefly since they change with every booking.
+    'booking-available-slots': {'private': True, 'max_age': 30},
+    # Reached with a secret token and shows the attendee's details; the
+    # router publishes the same action as /api/bookings/manage/<token>/.
+    'booking-manage-public': {'private': True, 'no_store': True},
+    'booking-manage': {'private': True, 'no_store': True},
 }
+CACHE_CONTROL_AUTHENTICATED = {'private': True, 'no_cache': True}
+CACHE_CONTROL_DEFAULT = {'no_cache': True}
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 # Email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.zoho.com')
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True').lower() in ('true', '1', 'yes')
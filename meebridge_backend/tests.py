@@ -0,0 +1,413 @@
+import gzip
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from bookings.models import Booking
+from meeting_pages.models import MeetingPage
+from . import caching, db_router, metrics
+from .middleware import ENCODERS, ReplicaRoutingMiddleware, choose_encoding
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+
+User = get_user_model()
+
+
+class RequestInstrumentationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_reports_queries(self):
+        response = self.client.get('/api/meeting-pages/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="1 queries"$')
+        self.assertEqual(response.wsgi_request.instrumentation.route, 'meeting-page-list')
+
+    @override_settings(REQUEST_SLOW_QUERY_COUNT=1)
+    def test_slow_requests_are_logged_with_their_queries(self):
+        with self.assertLogs('meebridge.requests', 'WARNING') as logs:
+            self.client.get('/api/meeting-pages/')
+        self.assertIn('Slow request GET /api/meeting-pages/ (meeting-page-list) -> 200', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    @override_settings(REQUEST_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/meeting-pages/'))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sample(self, body, line):
+        for row in body.splitlines():
+            if row.startswith(line + ' '):
+                return float(row.rsplit(' ', 1)[1])
+        return 0.0
+
+    def test_requests_are_counted_per_route(self):
+        route = 'meebridge_http_requests_total{route="meeting-page-list",method="GET",status="200"}'
+        count = 'meebridge_http_request_duration_seconds_count{route="meeting-page-list",method="GET"}'
+        before = self.client.get('/metrics').content.decode()
+        self.client.get('/api/meeting-pages/')
+        body = self.client.get('/metrics').content.decode()
+
+        self.assertIn('# TYPE meebridge_http_request_duration_seconds histogram', body)
+        self.assertEqual(self.sample(body, route) - self.sample(before, route), 1)
+        self.assertEqual(self.sample(body, count) - self.sample(before, count), 1)
+        self.assertIn(
+            'meebridge_http_request_queries_bucket{route="meeting-page-list",le="+Inf"}', body,
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('test_histogram_seconds', 'Test.', ['route'], buckets=(0.1, 1), register=False)
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, route='x')
+        body = metrics.render({'test_histogram_seconds': histogram.snapshot()})
+        self.assertIn('test_histogram_seconds_bucket{route="x",le="0.1"} 1', body)
+        self.assertIn('test_histogram_seconds_bucket{route="x",le="1"} 2', body)
+        self.assertIn('test_histogram_seconds_bucket{route="x",le="+Inf"} 3', body)
+        self.assertIn('test_histogram_seconds_sum{route="x"} 5.55', body)
+        self.assertIn('test_histogram_seconds_count{route="x"} 3', body)
+
+    def test_worker_snapshots_are_merged(self):
+        line = 'meebridge_bookings_created_total{source="import"}'
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            own = self.sample(metrics.render(metrics.collect()), line)
+            other = metrics.snapshot()
+            other['meebridge_bookings_created_total']['samples'] = [[['import'], 7]]
+            with open(os.path.join(directory, f'{os.getppid()}.json'), 'w') as handle:
+                json.dump(other, handle)
+
+            body = self.client.get('/metrics').content.decode()
+        self.assertEqual(self.sample(body, line), own + 7)
+
+    def test_snapshots_of_exited_workers_are_pruned(self):
+        line = 'meebridge_bookings_created_total{source="import"}'
+        worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+        worker.wait()
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            own = self.sample(metrics.render(metrics.collect()), line)
+            stale = metrics.snapshot()
+            stale['meebridge_bookings_created_total']['samples'] = [[['import'], 7]]
+            path = os.path.join(directory, f'{worker.pid}.json')
+            with open(path, 'w') as handle:
+                json.dump(stale, handle)
+
+            self.assertEqual(self.sample(metrics.render(metrics.collect()), line), own)
+            self.assertFalse(os.path.exists(path))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+class SqliteTuningTests(TestCase):
+    def pragmas(self, path):
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': path}, alias='tuning')
+        try:
+            with wrapper.cursor() as cursor:
+                return {
+                    name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout')
+                }
+        finally:
+            wrapper.close()
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(self.pragmas(os.path.join(directory, 'db.sqlite3')), {
+                'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+            })
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_tuning_can_be_disabled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(self.pragmas(os.path.join(directory, 'db.sqlite3'))['journal_mode'], 'delete')
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.host, title='Call', slug='call')
+        self.date = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=2)
+        self.client = APIClient()
+
+    def test_invalidation_moves_the_owner_to_a_new_version(self):
+        key = caching.make_key('bookings', self.host.pk, 'slots')
+        other = caching.make_key('bookings', 'someone-else', 'slots')
+        caching.invalidate('bookings', self.host.pk)
+        self.assertNotEqual(caching.make_key('bookings', self.host.pk, 'slots'), key)
+        self.assertEqual(caching.make_key('bookings', 'someone-else', 'slots'), other)
+
+    def test_fills_before_commit_do_not_outlive_it(self):
+        parts = ('slots', self.page.id, self.date.date().isoformat(), '')
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(meeting_page=self.page, date=self.date)
+            # Another worker's miss, which cannot see the booking yet.
+            caching.get_or_set(caching.make_key('bookings', self.host.pk, *parts), lambda: 'stale', 60, 'test')
+        value = caching.get_or_set(caching.make_key('bookings', self.host.pk, *parts), lambda: 'fresh', 60, 'test')
+        self.assertEqual(value, 'fresh')
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(caching.get_or_set('k', compute, 60, 'test')))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+
+    def test_lookups_are_reported(self):
+        lookups = []
+
+        def receiver(name, hit, **kwargs):
+            lookups.append((name, hit))
+
+        caching.cache_lookup.connect(receiver)
+        self.addCleanup(caching.cache_lookup.disconnect, receiver)
+        for _ in range(2):
+            caching.get_or_set('k', lambda: None, 60, 'test')
+        self.assertEqual(lookups, [('test', False), ('test', True)])
+
+    def test_slots_are_cached_until_a_booking_changes(self):
+        Booking.objects.create(meeting_page=self.page, date=self.date)
+        params = {'meeting_page_id': str(self.page.id), 'date': self.date.date().isoformat()}
+        url = '/api/public/bookings/available-slots/'
+        self.assertEqual(len(self.client.get(url, params).data['slots']), 1)
+        # Only the page owner lookup for the key.
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get(url, params).data['slots']), 1)
+
+        Booking.objects.create(meeting_page=self.page, date=self.date + timedelta(hours=1))
+        self.assertEqual(len(self.client.get(url, params).data['slots']), 2)
+        self.assertEqual(self.client.get(url, {**params, 'meeting_page_id': str(uuid.uuid4())}).status_code, 404)
+
+    # A miss runs more queries than the slow request log threshold.
+    @override_settings(REQUEST_SLOW_QUERY_COUNT=1000)
+    def test_analytics_are_cached_per_host(self):
+        self.client.force_authenticate(self.host)
+        self.assertEqual(self.client.get('/api/analytics/').data['total_bookings'], 0)
+        with self.assertNumQueries(0):
+            self.client.get('/api/analytics/')
+        Booking.objects.create(meeting_page=self.page, date=self.date)
+        self.assertEqual(self.client.get('/api/analytics/').data['total_bookings'], 1)
+
+
+class JSONRendererTests(TestCase):
+    data = {
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'utc': datetime(2024, 3, 1, 9, 30, 15, 250000, tzinfo=dt_timezone.utc),
+        'offset': datetime(2024, 3, 1, 9, 30, tzinfo=dt_timezone(timedelta(hours=2))),
+        'day': datetime(2024, 3, 1).date(),
+        'price': Decimal('12.50'),
+        'label': gettext_lazy('Booked'),
+        'text': 'caf\u00e9 \u2028 line',
+        'counts': {1: 'one'},
+        'rows': [(1, 2.5, None, True)],
+    }
+
+    def test_output_matches_the_drf_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indented_output_uses_the_drf_renderer(self):
+        media_type = 'application/json; indent=2'
+        self.assertEqual(
+            ORJSONRenderer().render(self.data, media_type), JSONRenderer().render(self.data, media_type),
+        )
+
+    def test_parser_matches_the_drf_parser(self):
+        body = JSONRenderer().render(self.data)
+        self.assertEqual(ORJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"a": NaN}'))
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch('meebridge_backend.renderers.orjson', None), \
+                mock.patch('meebridge_backend.parsers.orjson', None):
+            body = ORJSONRenderer().render(self.data)
+            self.assertEqual(body, JSONRenderer().render(self.data))
+            self.assertEqual(ORJSONParser().parse(BytesIO(body))['price'], 12.5)
+
+
+@override_settings(COMPRESSION_MIN_BYTES=200)
+class CompressionTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        for n in range(3):
+            MeetingPage.objects.create(user=self.host, title=f'Call {n}', slug=f'call-{n}')
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+    def test_large_responses_are_gzipped(self):
+        plain = self.client.get('/api/meeting-pages/')
+        compressed = self.client.get('/api/meeting-pages/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertLess(int(compressed['Content-Length']), len(plain.content))
+
+    def test_small_refused_and_streaming_responses_are_left_alone(self):
+        with self.settings(COMPRESSION_MIN_BYTES=100000):
+            self.assertNotIn('Content-Encoding', self.client.get('/api/meeting-pages/', HTTP_ACCEPT_ENCODING='gzip'))
+        response = self.client.get('/api/meeting-pages/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', response)
+        response = self.client.get('/api/customers/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response.streaming)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_encoding_negotiation(self):
+        with mock.patch.dict(ENCODERS, {'br': lambda content: b'br'}):
+            self.assertEqual(choose_encoding('gzip;q=0.5, br'), 'br')
+            self.assertEqual(choose_encoding('br;q=0.1, gzip'), 'gzip')
+            self.assertEqual(choose_encoding('*'), 'gzip')
+        self.assertIsNone(choose_encoding(''))
+
+
+class CacheControlTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.host, title='Call', slug='call')
+        self.booking = Booking.objects.create(meeting_page=self.page, date=timezone.now() + timedelta(days=1))
+        self.client = APIClient()
+
+    def test_public_routes(self):
+        self.assertEqual(self.client.get('/api/public/meeting-pages/call/')['Cache-Control'], 'public, no-cache')
+        response = self.client.get('/api/public/bookings/available-slots/', {
+            'meeting_page_id': str(self.page.id), 'date': self.booking.date.date().isoformat(),
+        })
+        self.assertEqual(response['Cache-Control'], 'private, max-age=30')
+        for prefix in ('/api/public/bookings', '/api/bookings'):
+            response = self.client.get(f'{prefix}/manage/{self.booking.management_token}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'private, no-store')
+        self.assertEqual(self.client.get('/api/public/meeting-pages/missing/')['Cache-Control'], 'no-cache')
+
+    def test_authenticated_data_is_private(self):
+        self.client.force_authenticate(self.host)
+        self.assertEqual(self.client.get('/api/bookings/')['Cache-Control'], 'private, no-cache')
+        self.assertNotIn('Cache-Control', self.client.post('/api/meeting-pages/', {'title': 'New'}, format='json'))
+
+
+@override_settings(DATABASE_READ_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """A second SQLite file stands in for the replica."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test runner set up its databases, so it does not
+        # create or check a test database for the replica.
+        connections.settings['replica'] = {**connection.settings_dict, 'NAME': ':memory:'}
+        cls.databases = cls.databases | {'replica'}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del connections.settings['replica']
+
+    def setUp(self):
+        cache.clear()
+        db_router.reset_unavailable()
+        self.directory = tempfile.TemporaryDirectory()
+        self.host = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.host, title='Call', slug='call')
+        self.date = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=2)
+        Booking.objects.create(meeting_page=self.page, date=self.date)
+        self.use_replica(os.path.join(self.directory.name, 'replica.sqlite3'), copy_primary=True)
+        # Only the primary has this one.
+        Booking.objects.create(meeting_page=self.page, date=self.date + timedelta(hours=1))
+        self.client = APIClient()
+
+    def use_replica(self, path, copy_primary=False):
+        if copy_primary:
+            target = sqlite3.connect(path)
+            connection.ensure_connection()
+            connection.connection.backup(target)
+            target.close()
+        connections['replica'].close()
+        del connections['replica']
+        connections.settings['replica']['NAME'] = path
+
+    def tearDown(self):
+        # An empty in-memory replica leaves nothing for the flush after the test.
+        self.use_replica(':memory:')
+        self.directory.cleanup()
+
+    def slots(self):
+        response = self.client.get('/api/public/bookings/available-slots/', {
+            'meeting_page_id': str(self.page.id), 'date': self.date.date().isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        return len(response.data['slots'])
+
+    @override_settings(AVAILABLE_SLOTS_CACHE_TIMEOUT=0)
+    def test_designated_views_read_from_the_replica(self):
+        self.assertEqual(self.slots(), 1)
+        self.client.force_authenticate(self.host)
+        self.assertEqual(self.client.get('/api/bookings/').data['count'], 2)
+
+    def test_cache_fills_read_from_the_primary(self):
+        # Cached for every client, so not taken from the lagging replica.
+        self.assertEqual(self.slots(), 2)
+        MeetingPage.objects.filter(pk=self.page.pk).update(title='Renamed')
+        self.assertEqual(self.client.get('/api/public/meeting-pages/call/').data['title'], 'Renamed')
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        response = self.client.post('/api/public/bookings/', {
+            'meeting_page': str(self.page.id),
+            'date': (self.date + timedelta(hours=2)).isoformat(),
+            'attendee_email': 'ann@example.com',
+            'user_input': {},
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(ReplicaRoutingMiddleware.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.slots(), 3)
+
+    def test_unavailable_replica_falls_back_to_the_primary(self):
+        self.use_replica(os.path.join(self.directory.name, 'missing', 'replica.sqlite3'))
+        with self.assertLogs('meebridge_backend.db_router', 'WARNING'):
+            self.assertEqual(self.slots(), 2)
@@ -23,6 +23,7 @@ from . import views
 urlpatterns = [
     path('', views.api_root, name='api-root'),
     path('admin/', admin.site.urls),
+    path('metrics', views.metrics, name='metrics'),
     path('api/', include('users.urls')),
     path('api/', include('meeting_pages.urls')),
     path('api/', include('bookings.urls')),
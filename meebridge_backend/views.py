@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.http import JsonResponse, HttpResponse
+from django.utils.crypto import constant_time_compare
 import json
 
+from . import metrics as app_metrics
+
 
 def api_root(request):
     """Root API endpoint with API information"""
@@ -91,3 +95,13 @@ def api_root(request):
             }
         })
 
+
+def metrics(request):
+    """Prometheus text exposition of the application metrics"""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return JsonResponse({'error': 'Invalid metrics token.'}, status=403)
+    return HttpResponse(
+        app_metrics.render(app_metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
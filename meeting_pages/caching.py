@@ -0,0 +1,65 @@
+"""
+Response cache for the public booking page.
+
+Entries hold the already-serialized payload together with its ETag and
+Last-Modified values, keyed by slug. They are dropped by the signal
+handlers in ``meeting_pages.signals`` whenever a page is saved or deleted,
+and again when its transaction commits; the timeout only bounds staleness
+in caches that those handlers cannot reach (e.g. per-process local memory
+in other workers). Misses are rebuilt single-flight by
+``meebridge_backend.caching``.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from meebridge_backend.caching import get_cache, get_or_set
+
+from .models import MeetingPage
+from .serializers import MeetingPagePublicSerializer
+
+_MISSING = 'missing'
+
+
+def public_page_cache_key(slug):
+    return f'meeting_pages:public:{slug}'
+
+
+def _build_entry(slug):
+    meeting_page = MeetingPage.objects.filter(slug=slug, active=True).first()
+    if meeting_page is None:
+        return _MISSING
+    data = MeetingPagePublicSerializer(meeting_page).data
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return {
+        'data': data,
+        'etag': '"%s"' % hashlib.sha256(body.encode()).hexdigest()[:32],
+        'last_modified': meeting_page.updated_at.timestamp(),
+    }
+
+
+def get_public_page(slug):
+    """Return the cached public payload for ``slug`` or ``None`` if not public."""
+    entry = get_or_set(
+        public_page_cache_key(slug), lambda: _build_entry(slug),
+        settings.MEETING_PAGE_PUBLIC_CACHE_TIMEOUT, 'public_page',
+    )
+    return None if entry == _MISSING else entry
+
+
+def _delete(keys):
+    get_cache().delete_many(keys)
+
+
+def invalidate_public_page(*slugs):
+    """
+    Drop the cached pages now and, inside a transaction, again once it
+    commits, in case a miss in between cached the uncommitted state.
+    """
+    keys = [public_page_cache_key(slug) for slug in slugs if slug]
+    _delete(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _delete(keys))
@@ -0,0 +1,181 @@
+"""
+Resized, metadata-free derivatives of meeting page images.
+
+Uploaded logos, banners and backgrounds are re-encoded as WebP plus a JPEG
+(or PNG, when the image has transparency) fallback at a few widths and
+stored next to the original under ``<upload dir>/derived/``. What was
+generated is recorded in ``MeetingPage.image_variants`` keyed by field,
+together with the source file it was generated from, so a replaced image
+is detected and reprocessed.
+
+Processing is scheduled after the saving transaction commits and runs on a
+small thread pool, keeping Pillow work off the request path.
+"""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .caching import invalidate_public_page
+from .models import MeetingPage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_WIDTHS = {
+    'logo': (128, 256, 512),
+    'banner_image': (640, 1280, 1920),
+    'background_image': (640, 1280, 1920),
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.MEETING_PAGE_IMAGE_WORKERS,
+            thread_name_prefix='meeting-page-images',
+        )
+    return _executor
+
+
+def stale_image_fields(page):
+    """Image fields whose recorded variants do not match the current file."""
+    variants = page.image_variants or {}
+    stale = []
+    for field in IMAGE_WIDTHS:
+        name = getattr(page, field).name or ''
+        recorded = variants.get(field, {}).get('source', '')
+        if name != recorded:
+            stale.append(field)
+    return stale
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, file_format):
+    buffer = BytesIO()
+    if file_format == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif file_format == 'jpeg':
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def build_variants(field_file, widths):
+    """Write derivatives for ``field_file`` and return their descriptions."""
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+    # Applying the EXIF orientation first means dropping EXIF (which encoding
+    # without passing ``exif=`` does) cannot leave photos rotated.
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+    fallback = 'png' if image.mode == 'RGBA' else 'jpeg'
+
+    directory, filename = posixpath.split(field_file.name)
+    stem = filename.rsplit('.', 1)[0]
+    # Never upscale; an image narrower than every width gets one variant at
+    # its own size so it is still re-encoded and stripped.
+    targets = sorted({min(width, image.width) for width in widths})
+
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for file_format in ('webp', fallback):
+            extension = 'jpg' if file_format == 'jpeg' else file_format
+            name = posixpath.join(directory, 'derived', f'{stem}-{width}w.{extension}')
+            name = storage.save(name, ContentFile(_encode(resized, file_format)))
+            variants.append({'name': name, 'width': width, 'height': height, 'format': file_format})
+    return variants
+
+
+def _delete_variants(storage, entry):
+    for variant in entry.get('variants', []):
+        try:
+            storage.delete(variant['name'])
+        except OSError:
+            logger.warning("Could not delete image variant %s", variant['name'])
+
+
+def process_page_images(page_id, force=False):
+    """Generate missing or outdated derivatives for one meeting page."""
+    page = MeetingPage.objects.filter(pk=page_id).first()
+    if page is None:
+        return []
+    fields = list(IMAGE_WIDTHS) if force else stale_image_fields(page)
+    if not fields:
+        return []
+
+    generated = {}
+    for field in fields:
+        field_file = getattr(page, field)
+        if not field_file.name:
+            generated[field] = None
+            continue
+        try:
+            generated[field] = {
+                'source': field_file.name,
+                'variants': build_variants(field_file, IMAGE_WIDTHS[field]),
+            }
+        except (OSError, Image.DecompressionBombError):
+            logger.exception("Could not process %s for meeting page %s", field, page_id)
+
+    with transaction.atomic():
+        page = MeetingPage.objects.select_for_update().filter(pk=page_id).first()
+        if page is None:
+            return []
+        variants = dict(page.image_variants or {})
+        for field, entry in generated.items():
+            # The image may have been replaced while we were encoding.
+            current = getattr(page, field).name or ''
+            if entry is not None and entry['source'] != current:
+                _delete_variants(getattr(page, field).storage, entry)
+                continue
+            # Superseded variants are left in place, as Django leaves replaced
+            # originals: a duplicated page may still reference them.
+            if entry is None:
+                variants.pop(field, None)
+            else:
+                variants[field] = entry
+        # update() skips post_save, so bump updated_at for Last-Modified and
+        # drop the cached public payload here.
+        MeetingPage.objects.filter(pk=page_id).update(image_variants=variants, updated_at=timezone.now())
+        transaction.on_commit(lambda: invalidate_public_page(page.slug))
+    return list(generated)
+
+
+def _process_in_background(page_id):
+    try:
+        process_page_images(page_id)
+    except Exception:  # noqa: BLE001
+        logger.exception("Image processing failed for meeting page %s", page_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_page_images(page):
+    """Queue derivative generation for ``page`` once the transaction commits."""
+    if not stale_image_fields(page):
+        return
+    mode = settings.MEETING_PAGE_IMAGE_PROCESSING
+    if mode == 'sync':
+        transaction.on_commit(lambda: process_page_images(page.pk))
+    elif mode == 'background':
+        transaction.on_commit(lambda: _get_executor().submit(_process_in_background, page.pk))
+
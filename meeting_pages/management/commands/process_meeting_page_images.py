@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from meeting_pages.images import process_page_images
+from meeting_pages.models import MeetingPage
+
+
+class Command(BaseCommand):
+    help = "Generate resized image variants for existing meeting pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate variants that are already current")
+
+    def handle(self, *args, **options):
+        with_images = ~Q(logo='') | ~Q(banner_image='') | ~Q(background_image='') | ~Q(image_variants={})
+        page_ids = MeetingPage.objects.filter(with_images).values_list('pk', flat=True)
+        processed = 0
+        for page_id in page_ids.iterator():
+            fields = process_page_images(page_id, force=options['force'])
+            if fields:
+                processed += 1
+                self.stdout.write(f"{page_id}: {', '.join(fields)}")
+        self.stdout.write(self.style.SUCCESS(f"Processed images for {processed} meeting pages"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting_pages', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meetingpage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized derivatives of the page images, see meeting_pages.images'),
+        ),
+    ]
@@ -20,6 +20,12 @@ class MeetingPage(models.Model):
     logo = models.ImageField(upload_to='logos/', blank=True, null=True)
     banner_image = models.ImageField(upload_to='banners/', blank=True, null=True)
     background_image = models.ImageField(upload_to='backgrounds/', blank=True, null=True)
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized derivatives of the page images, see meeting_pages.images",
+    )
     active = models.BooleanField(default=True)
     event_type = models.CharField(max_length=100, default='default', help_text="15-min, 30-min, 60-min, etc.")
     duration_minutes = models.IntegerField(default=30)
@@ -31,3 +37,24 @@ class MeetingPage(models.Model):
 
     def __str__(self):
         return f"{self.title} - {self.user.email}"
+
+    def image_srcsets(self):
+        """``{field: {format: "url 320w, url 640w"}}`` for current derivatives"""
+        result = {}
+        for field, entry in (self.image_variants or {}).items():
+            field_file = getattr(self, field, None)
+            if field_file is None or not entry or field_file.name != entry.get('source'):
+                continue
+            by_format = {}
+            for variant in entry['variants']:
+                url = field_file.storage.url(variant['name'])
+                by_format.setdefault(variant['format'], []).append(f"{url} {variant['width']}w")
+            result[field] = {file_format: ', '.join(items) for file_format, items in by_format.items()}
+        return result
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a slug change also invalidates the old public URL.
+        instance._loaded_slug = instance.__dict__.get('slug')
+        return instance
@@ -15,6 +15,9 @@ class MeetingPageSerializer(serializers.ModelSerializer):
             'active', 'event_type', 'duration_minutes', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        extra_kwargs = {
+            'slug': {'required': False},
+        }
 
     def create(self, validated_data):
         validated_data.pop('user_id', None)
@@ -22,12 +25,28 @@ class MeetingPageSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class MeetingPageListSerializer(MeetingPageSerializer):
+    """Meeting page with the booking stats annotated by the list query"""
+    total_bookings = serializers.IntegerField(read_only=True)
+    upcoming_bookings = serializers.IntegerField(read_only=True)
+    cancelled_bookings = serializers.IntegerField(read_only=True)
+    last_booked_at = serializers.DateTimeField(read_only=True)
+
+    class Meta(MeetingPageSerializer.Meta):
+        fields = MeetingPageSerializer.Meta.fields + [
+            'total_bookings', 'upcoming_bookings', 'cancelled_bookings', 'last_booked_at'
+        ]
+
+
 class MeetingPagePublicSerializer(serializers.ModelSerializer):
     """Serializer for public booking page (no sensitive data)"""
+    image_srcsets = serializers.ReadOnlyField()
+
     class Meta:
         model = MeetingPage
         fields = [
             'id', 'title', 'slug', 'theme', 'fields', 'layout_style',
-            'logo', 'banner_image', 'background_image', 'event_type', 'duration_minutes'
+            'logo', 'banner_image', 'background_image', 'image_srcsets',
+            'event_type', 'duration_minutes'
         ]
 
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bookings.caching import invalidate_host_bookings
+from .caching import invalidate_public_page
+from .images import schedule_page_images
+from .models import MeetingPage
+
+
+@receiver(post_save, sender=MeetingPage)
+def invalidate_public_page_on_save(sender, instance, **kwargs):
+    invalidate_public_page(instance.slug, getattr(instance, '_loaded_slug', None))
+    instance._loaded_slug = instance.slug
+    # Slot lookups show the page's duration.
+    invalidate_host_bookings(instance.user_id)
+    if not kwargs.get('raw'):
+        schedule_page_images(instance)
+
+
+@receiver(post_delete, sender=MeetingPage)
+def invalidate_public_page_on_delete(sender, instance, **kwargs):
+    invalidate_public_page(instance.slug, getattr(instance, '_loaded_slug', None))
+    invalidate_host_bookings(instance.user_id)
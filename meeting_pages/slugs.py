@@ -0,0 +1,52 @@
+"""
+Allocation of unique meeting page slugs.
+
+Candidates are ``base``, ``base-2``, ``base-3`` ... The next free one is
+found with a single prefix query over the unique slug index instead of
+probing one candidate per query.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .models import MeetingPage
+
+SLUG_MAX_LENGTH = MeetingPage._meta.get_field('slug').max_length
+SUFFIX_RESERVE = 8  # room for "-" and a seven digit counter
+ALLOCATION_ATTEMPTS = 5
+
+
+def slug_base(value):
+    base = slugify(value or '') or 'meeting'
+    return base[:SLUG_MAX_LENGTH - SUFFIX_RESERVE].strip('-') or 'meeting'
+
+
+def allocate_slug(base):
+    """Return the first free slug among ``base``, ``base-2``, ``base-3`` ..."""
+    prefix = f'{base}-'
+    taken = set(
+        MeetingPage.objects.filter(Q(slug=base) | Q(slug__startswith=prefix))
+        .values_list('slug', flat=True)
+    )
+    if base not in taken:
+        return base
+    suffix = re.compile(rf'^{re.escape(prefix)}(\d+)$')
+    numbers = [int(match.group(1)) for match in map(suffix.match, taken) if match]
+    return f'{prefix}{max(numbers, default=1) + 1}'
+
+
+def save_with_unique_slug(save, base):
+    """
+    Call ``save(slug)`` with a freshly allocated slug, retrying when a
+    concurrent request claims the same slug first.
+    """
+    for attempt in range(ALLOCATION_ATTEMPTS):
+        slug = allocate_slug(base)
+        try:
+            with transaction.atomic():
+                return save(slug)
+        except IntegrityError:
+            if attempt == ALLOCATION_ATTEMPTS - 1 or not MeetingPage.objects.filter(slug=slug).exists():
+                raise
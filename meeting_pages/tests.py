@@ -1,3 +1,226 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from bookings.models import Booking
+from .caching import public_page_cache_key
+from .models import MeetingPage
+from .slugs import allocate_slug, save_with_unique_slug
+
+User = get_user_model()
+
+
+class PublicMeetingPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro')
+        self.client = APIClient()
+
+    def get(self, slug='intro', **headers):
+        return self.client.get(f'/api/public/meeting-pages/{slug}/', **headers)
+
+    def test_repeat_loads_are_served_from_cache(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.get()
+        self.assertEqual(response.data['title'], 'Intro')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_conditional_requests_return_not_modified(self):
+        first = self.get()
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_save_and_delete_invalidate(self):
+        etag = self.get()['ETag']
+        self.page.title = 'Renamed'
+        self.page.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Renamed')
+
+        page = MeetingPage.objects.get(pk=self.page.pk)
+        page.slug = 'moved'
+        page.save()
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.get('moved').status_code, 200)
+
+        page.delete()
+        self.assertEqual(self.get('moved').status_code, 404)
+
+    def test_fills_before_commit_do_not_outlive_it(self):
+        self.get()
+        stale = cache.get(public_page_cache_key('intro'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.title = 'Renamed'
+            self.page.save()
+            # Another worker's miss, which cannot see the rename yet.
+            cache.set(public_page_cache_key('intro'), stale)
+        self.assertEqual(self.get().data['title'], 'Renamed')
+
+    def test_inactive_pages_are_not_public(self):
+        self.assertEqual(self.get('missing').status_code, 404)
+        MeetingPage.objects.create(user=self.user, title='Later', slug='missing')
+        self.assertEqual(self.get('missing').status_code, 200)
+        self.page.active = False
+        self.page.save()
+        self.assertEqual(self.get().status_code, 404)
+
+
+@override_settings(MEETING_PAGE_IMAGE_PROCESSING='sync')
+class MeetingPageImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=self.media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+
+    def make_upload(self, name, size, mode='RGB'):
+        image = Image.new(mode, size, 'red')
+        exif = Image.Exif()
+        exif[0x010F] = 'CameraMaker'
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG' if mode == 'RGB' else 'PNG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def test_variants_are_generated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            page = MeetingPage.objects.create(
+                user=self.user, title='Intro', slug='intro',
+                banner_image=self.make_upload('banner.jpg', (1500, 500)),
+                logo=self.make_upload('logo.png', (100, 100), mode='RGBA'),
+            )
+        page.refresh_from_db()
+
+        banner = page.image_variants['banner_image']
+        self.assertEqual(banner['source'], page.banner_image.name)
+        self.assertEqual(sorted({v['width'] for v in banner['variants']}), [640, 1280, 1500])
+        self.assertEqual({v['format'] for v in banner['variants']}, {'webp', 'jpeg'})
+        self.assertEqual({v['format'] for v in page.image_variants['logo']['variants']}, {'webp', 'png'})
+        with Image.open(page.banner_image.storage.path(banner['variants'][0]['name'])) as derived:
+            self.assertEqual(len(derived.getexif()), 0)
+
+        data = APIClient().get('/api/public/meeting-pages/intro/').data
+        self.assertIn('banner_image', data['image_srcsets'])
+        self.assertTrue(data['image_srcsets']['banner_image']['webp'].endswith('1500w'))
+
+    def test_replaced_image_hides_outdated_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            page = MeetingPage.objects.create(
+                user=self.user, title='Intro', slug='intro',
+                logo=self.make_upload('logo.jpg', (600, 600)),
+            )
+        page.refresh_from_db()
+        page.logo = self.make_upload('new-logo.jpg', (300, 300))
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            page.save()
+        self.assertEqual(page.image_srcsets(), {})
+        # Processing the new logo, after commit, brings its variants back.
+        for callback in callbacks:
+            callback()
+        page.refresh_from_db()
+        self.assertIn('logo', page.image_srcsets())
+
+    def test_backfill_command(self):
+        with self.settings(MEETING_PAGE_IMAGE_PROCESSING='off'):
+            page = MeetingPage.objects.create(
+                user=self.user, title='Intro', slug='intro',
+                background_image=self.make_upload('bg.jpg', (800, 400)),
+            )
+        call_command('process_meeting_page_images', stdout=StringIO())
+        page.refresh_from_db()
+        self.assertIn('background_image', page.image_srcsets())
+
+
+class MeetingPageListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_annotates_booking_stats_in_one_query(self):
+        now = timezone.now()
+        for index in range(5):
+            page = MeetingPage.objects.create(user=self.user, title=f'Page {index}', slug=f'page-{index}')
+            Booking.objects.create(meeting_page=page, date=now + timedelta(days=1))
+            Booking.objects.create(meeting_page=page, date=now - timedelta(days=1))
+            Booking.objects.create(meeting_page=page, date=now + timedelta(days=2), status='cancelled')
+        MeetingPage.objects.create(user=self.user, title='Empty', slug='empty')
+
+        # One COUNT for pagination plus one query for the annotated page.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/meeting-pages/')
+        self.assertEqual(response.status_code, 200)
+
+        rows = {row['slug']: row for row in response.data['results']}
+        self.assertEqual(len(rows), 6)
+        stats = rows['page-0']
+        self.assertEqual(
+            (stats['total_bookings'], stats['upcoming_bookings'], stats['cancelled_bookings']),
+            (3, 1, 1),
+        )
+        self.assertIsNotNone(stats['last_booked_at'])
+        self.assertEqual(rows['empty']['total_bookings'], 0)
+        self.assertIsNone(rows['empty']['last_booked_at'])
+        self.assertEqual(rows['empty']['user']['email'], 'host@example.com')
+
+
+class MeetingPageSlugTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_page(self, slug):
+        return MeetingPage.objects.create(user=self.user, title=slug, slug=slug)
+
+    def test_allocation_uses_one_query(self):
+        for slug in ['intro', 'intro-2', 'intro-7', 'intro-copy', 'introduction']:
+            self.create_page(slug)
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug('intro'), 'intro-8')
+        self.assertEqual(allocate_slug('demo'), 'demo')
+
+    def test_create_derives_slug_from_title(self):
+        first = self.client.post('/api/meeting-pages/', {'title': 'Sales Call'}, format='json')
+        second = self.client.post('/api/meeting-pages/', {'title': 'Sales  call!'}, format='json')
+        self.assertEqual((first.data['slug'], second.data['slug']), ('sales-call', 'sales-call-2'))
+
+    def test_duplicate_twice_and_shares_images(self):
+        page = self.create_page('intro')
+        MeetingPage.objects.filter(pk=page.pk).update(logo='logos/a.png')
+        slugs = [self.client.post(f'/api/meeting-pages/{page.pk}/duplicate/').data['slug'] for _ in range(2)]
+        self.assertEqual(slugs, ['intro-copy', 'intro-copy-2'])
+        self.assertEqual(MeetingPage.objects.get(slug='intro-copy-2').logo.name, 'logos/a.png')
+
+    def test_retries_after_a_concurrent_claim(self):
+        self.create_page('intro')
+        # The first allocation reads before another request commits 'intro'.
+        stale_then_fresh = iter(['intro'])
+        real_allocate = allocate_slug
+
+        def allocate(base):
+            return next(stale_then_fresh, None) or real_allocate(base)
+
+        def save(slug):
+            return MeetingPage.objects.create(user=self.user, title='Mine', slug=slug)
+
+        with mock.patch('meeting_pages.slugs.allocate_slug', allocate):
+            page = save_with_unique_slug(save, 'intro')
+        self.assertEqual(page.slug, 'intro-2')
@@ -6,7 +6,7 @@ router = DefaultRouter()
 router.register(r'meeting-pages', MeetingPageViewSet, basename='meeting-page')
 
 urlpatterns = [
-    path('public/meeting-pages/<slug:slug>/', MeetingPageViewSet.as_view({'get': 'public'}), name='meeting-page-public'),
+    path('public/meeting-pages/<slug:slug>/', MeetingPageViewSet.as_view({'get': 'public'}, **MeetingPageViewSet.public.kwargs), name='meeting-page-public'),
     path('', include(router.urls)),
 ]
 
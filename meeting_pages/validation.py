@@ -0,0 +1,208 @@
+"""
+Validation of booking ``user_input`` against a page's ``fields`` config.
+
+The config is compiled once into a list of small check functions and cached
+per ``(page id, updated_at)``, so editing a page naturally produces a new
+validator while unchanged pages never recompile. Each field config is a dict
+such as::
+
+    {"name": "email", "type": "email", "required": true}
+    {"name": "team_size", "type": "select", "options": ["1-10", "11-50"]}
+    {"name": "notes", "type": "textarea", "maxLength": 500}
+
+Keys not described by the config (``selected_date``, ``timezone`` ...) are
+passed through, bounded only by the overall payload size limit.
+"""
+import json
+import re
+from collections import OrderedDict
+from datetime import date, time
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import EmailValidator
+
+VALIDATOR_CACHE_SIZE = 1024
+MAX_USER_INPUT_KEYS = 200
+DEFAULT_MAX_LENGTHS = {'textarea': 5000}
+DEFAULT_MAX_LENGTH = 255
+
+_PHONE_RE = re.compile(r'^\+?[0-9\s().\-]{5,25}$')
+_email_validator = EmailValidator()
+
+_cache = OrderedDict()
+_cache_lock = Lock()
+
+
+class UserInputError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _field_key(config):
+    for attr in ('name', 'key', 'id'):
+        value = config.get(attr)
+        if isinstance(value, str) and value:
+            return value
+    return None
+
+
+def _option_values(options):
+    values = set()
+    for option in options or []:
+        if isinstance(option, dict):
+            option = option.get('value', option.get('label'))
+        if option is not None:
+            values.add(str(option))
+    return values
+
+
+def _max_length(config, field_type):
+    for attr in ('maxLength', 'max_length'):
+        value = config.get(attr)
+        if isinstance(value, int) and value > 0:
+            return value
+    return DEFAULT_MAX_LENGTHS.get(field_type, DEFAULT_MAX_LENGTH)
+
+
+def _check_text(max_length):
+    def check(value):
+        if not isinstance(value, str):
+            return 'Must be a string.'
+        if len(value) > max_length:
+            return f'Ensure this value has at most {max_length} characters.'
+    return check
+
+
+def _check_email(value):
+    if not isinstance(value, str) or len(value) > 254:
+        return 'Enter a valid email address.'
+    try:
+        _email_validator(value)
+    except DjangoValidationError:
+        return 'Enter a valid email address.'
+
+
+def _check_phone(value):
+    if not isinstance(value, str) or not _PHONE_RE.match(value) or sum(ch.isdigit() for ch in value) < 5:
+        return 'Enter a valid phone number.'
+
+
+def _check_number(config):
+    minimum, maximum = config.get('min'), config.get('max')
+
+    def check(value):
+        if isinstance(value, bool):
+            return 'Must be a number.'
+        if isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                return 'Must be a number.'
+        if not isinstance(value, (int, float)):
+            return 'Must be a number.'
+        if isinstance(minimum, (int, float)) and value < minimum:
+            return f'Ensure this value is greater than or equal to {minimum}.'
+        if isinstance(maximum, (int, float)) and value > maximum:
+            return f'Ensure this value is less than or equal to {maximum}.'
+    return check
+
+
+def _check_choice(choices):
+    def check(value):
+        if str(value) not in choices:
+            return 'Select a valid choice.'
+    return check
+
+
+def _check_multi_choice(choices):
+    def check(value):
+        if isinstance(value, bool) and not choices:
+            return None
+        if not isinstance(value, list) or not all(str(item) in choices for item in value):
+            return 'Select valid choices.'
+    return check
+
+
+def _check_iso(parser, message):
+    def check(value):
+        try:
+            parser(value)
+        except (TypeError, ValueError):
+            return message
+    return check
+
+
+def _compile_field(config):
+    field_type = str(config.get('type') or 'text').lower()
+    if field_type == 'email':
+        return _check_email
+    if field_type in ('phone', 'tel'):
+        return _check_phone
+    if field_type == 'number':
+        return _check_number(config)
+    if field_type in ('select', 'radio', 'dropdown'):
+        choices = _option_values(config.get('options'))
+        return _check_choice(choices) if choices else _check_text(_max_length(config, field_type))
+    if field_type in ('checkbox', 'multiselect'):
+        return _check_multi_choice(_option_values(config.get('options')))
+    if field_type == 'date':
+        return _check_iso(date.fromisoformat, 'Enter a valid date (YYYY-MM-DD).')
+    if field_type == 'time':
+        return _check_iso(time.fromisoformat, 'Enter a valid time (HH:MM).')
+    return _check_text(_max_length(config, field_type))
+
+
+def _is_empty(value):
+    return value is None or value == '' or value == [] or value is False
+
+
+def compile_fields(fields):
+    """Turn a ``fields`` config into a ``validate(user_input)`` callable."""
+    compiled = []
+    for config in fields if isinstance(fields, list) else []:
+        if not isinstance(config, dict):
+            continue
+        key = _field_key(config)
+        if key:
+            compiled.append((key, bool(config.get('required')), _compile_field(config)))
+    max_bytes = settings.BOOKING_USER_INPUT_MAX_BYTES
+
+    def validate(user_input):
+        if not isinstance(user_input, dict):
+            raise UserInputError({'non_field_errors': ['Must be a JSON object.']})
+        # json.dumps escapes to pure ASCII, so its length is the byte size.
+        if len(user_input) > MAX_USER_INPUT_KEYS or len(json.dumps(user_input)) > max_bytes:
+            raise UserInputError({'non_field_errors': [f'Form data must not exceed {max_bytes} bytes.']})
+        errors = {}
+        for key, required, check in compiled:
+            value = user_input.get(key)
+            if _is_empty(value):
+                if required:
+                    errors[key] = 'This field is required.'
+                continue
+            message = check(value)
+            if message:
+                errors[key] = message
+        if errors:
+            raise UserInputError(errors)
+
+    return validate
+
+
+def get_user_input_validator(meeting_page):
+    """Return the compiled validator for the page's current ``fields``."""
+    key = (meeting_page.pk, meeting_page.updated_at)
+    with _cache_lock:
+        validator = _cache.get(key)
+        if validator is not None:
+            _cache.move_to_end(key)
+            return validator
+    validator = compile_fields(meeting_page.fields)
+    with _cache_lock:
+        _cache[key] = validator
+        while len(_cache) > VALIDATOR_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return validator
@@ -2,9 +2,17 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.http import Http404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .caching import get_public_page
 from .models import MeetingPage
-from .serializers import MeetingPageSerializer, MeetingPagePublicSerializer
+from .serializers import MeetingPageListSerializer, MeetingPageSerializer
+from .slugs import save_with_unique_slug, slug_base
+from users.quotas import release_active_page, reserve_active_page
 
 
 class MeetingPageViewSet(viewsets.ModelViewSet):
@@ -12,25 +20,89 @@ class MeetingPageViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return MeetingPage.objects.filter(user=self.request.user)
+        queryset = MeetingPage.objects.filter(user=self.request.user).select_related('user')
+        if self.action == 'list':
+            # Booking stats for every page come from the same query via
+            # conditional aggregation instead of a request per page.
+            queryset = queryset.annotate(
+                total_bookings=Count('bookings'),
+                upcoming_bookings=Count(
+                    'bookings', filter=Q(bookings__status='booked', bookings__date__gte=timezone.now())
+                ),
+                cancelled_bookings=Count('bookings', filter=Q(bookings__status='cancelled')),
+                last_booked_at=Max('bookings__created_at'),
+            ).order_by(*MeetingPage._meta.ordering)  # Meta.ordering is dropped under GROUP BY
+        return queryset
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return MeetingPageListSerializer
+        return MeetingPageSerializer
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        if serializer.validated_data.get('active', True):
+            reserve_active_page(self.request.user)
+        if 'slug' in serializer.validated_data:
+            serializer.save(user=self.request.user)
+            return
+        save_with_unique_slug(
+            lambda slug: serializer.save(user=self.request.user, slug=slug),
+            slug_base(serializer.validated_data.get('title')),
+        )
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        was_active = serializer.instance.active
+        is_active = serializer.validated_data.get('active', was_active)
+        if is_active and not was_active:
+            reserve_active_page(self.request.user)
+        elif was_active and not is_active:
+            release_active_page(self.request.user.pk)
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        if instance.active:
+            release_active_page(instance.user_id)
+        instance.delete()
 
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def public(self, request, slug=None):
         """Public endpoint for booking page"""
-        meeting_page = get_object_or_404(MeetingPage, slug=slug, active=True)
-        serializer = MeetingPagePublicSerializer(meeting_page)
-        return Response(serializer.data)
+        page = get_public_page(slug)
+        if page is None:
+            raise Http404('No MeetingPage matches the given query.')
+
+        response = get_conditional_response(
+            request, etag=page['etag'], last_modified=int(page['last_modified'])
+        )
+        if response is None:
+            response = Response(page['data'])
+        response['ETag'] = page['etag']
+        response['Last-Modified'] = http_date(page['last_modified'])
+        # Shared caches may store the page but must revalidate it each time.
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
 
     @action(detail=True, methods=['post'])
-    def duplicate(self, request, slug=None):
+    @transaction.atomic
+    def duplicate(self, request, pk=None):
         """Duplicate a meeting page"""
-        original = self.get_object()
-        original.pk = None
-        original.slug = f"{original.slug}-copy"
-        original.title = f"{original.title} (Copy)"
-        original.save()
-        serializer = self.get_serializer(original)
+        copy = self.get_object()
+        if copy.active:
+            reserve_active_page(request.user)
+        copy.pk = None
+        copy._state.adding = True
+        copy.title = f"{copy.title} (Copy)"
+        # Image fields keep pointing at the original's files (and derivatives),
+        # so nothing is re-uploaded.
+
+        def save(slug):
+            copy.slug = slug
+            copy.save()
+            return copy
+
+        save_with_unique_slug(save, slug_base(f"{copy.slug}-copy"))
+        serializer = self.get_serializer(copy)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -8,5 +8,6 @@ class UserAdmin(BaseUserAdmin):
     list_display = ['email', 'username', 'organization', 'plan', 'is_staff', 'created_at']
     list_filter = ['plan', 'is_staff', 'is_superuser']
     fieldsets = BaseUserAdmin.fieldsets + (
-        ('Additional Info', {'fields': ('organization', 'plan', 'api_key')}),
+        ('Additional Info', {'fields': ('organization', 'plan', 'api_key_prefix')}),
     )
+    readonly_fields = ['api_key_prefix']
@@ -0,0 +1,73 @@
+"""
+API key generation, hashing and the in-process key -> user cache.
+
+Only a SHA-256 digest of each key is stored, next to an indexed prefix
+used to find the candidate user; keys are long random strings, so a fast
+hash is sufficient and keeps authentication cheap. Successful lookups are
+cached for ``API_KEY_CACHE_TTL`` seconds so warm integration traffic
+authenticates without touching the database.
+"""
+import copy
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+KEY_PREFIX = 'mb_'
+PREFIX_LENGTH = 12
+CACHE_MAX_ENTRIES = 10000
+
+_cache = OrderedDict()
+_lock = Lock()
+
+
+def generate_key():
+    """Return ``(key, prefix, digest)`` for a new random API key."""
+    key = KEY_PREFIX + secrets.token_urlsafe(32)
+    return key, key[:PREFIX_LENGTH], hash_key(key)
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def keys_match(stored_digest, digest):
+    return bool(stored_digest) and hmac.compare_digest(stored_digest, digest)
+
+
+def cached_user(digest):
+    with _lock:
+        entry = _cache.get(digest)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at < time.monotonic():
+            del _cache[digest]
+            return None
+    # Each request gets its own instance so views cannot leak changes into
+    # the cache or across threads.
+    return copy.copy(user)
+
+
+def remember_user(digest, user):
+    with _lock:
+        _cache[digest] = (user, time.monotonic() + settings.API_KEY_CACHE_TTL)
+        _cache.move_to_end(digest)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def forget_user(user_id):
+    """Drop cached lookups for ``user_id`` after a rotation, revocation or save."""
+    with _lock:
+        for digest in [d for d, (user, _) in _cache.items() if user.pk == user_id]:
+            del _cache[digest]
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
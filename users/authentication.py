@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from rest_framework import authentication, exceptions
+
+from meebridge_backend import metrics
+
+from .api_keys import PREFIX_LENGTH, cached_user, hash_key, keys_match, remember_user
+
+KEYWORD = 'api-key'
+
+
+def user_for_api_key(key):
+    """Return the active user owning ``key`` or ``None``."""
+    digest = hash_key(key)
+    user = cached_user(digest)
+    metrics.record_cache_lookup('api_key', user is not None)
+    if user is not None:
+        return user
+
+    candidates = get_user_model().objects.filter(api_key_prefix=key[:PREFIX_LENGTH], is_active=True)
+    for user in candidates:
+        if keys_match(user.api_key, digest):
+            remember_user(digest, user)
+            return user
+    return None
+
+
+class ApiKeyAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticate integrations with ``Authorization: Api-Key <key>``.
+    """
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != KEYWORD.encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid API key header.')
+        try:
+            key = header[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid API key.')
+
+        user = user_for_api_key(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed('Invalid API key.')
+        return (user, None)
+
+    def authenticate_header(self, request):
+        return 'Api-Key'
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from meebridge_backend import metrics
+
+
+def user_cache_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ``ModelBackend`` that serves the per-request session user from the cache.
+
+    Entries are dropped whenever the user is saved or deleted, and expire
+    after ``USER_CACHE_TIMEOUT`` seconds to bound staleness when the cache
+    is not shared between processes.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        metrics.record_cache_lookup('session_user', user is not None)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
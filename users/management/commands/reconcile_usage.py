@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.quotas import reconcile_usage
+
+
+class Command(BaseCommand):
+    help = "Recompute plan usage counters from bookings and meeting pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help="Only reconcile this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        checked, corrected = reconcile_usage(options['users'])
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} users, corrected {corrected} counters"))
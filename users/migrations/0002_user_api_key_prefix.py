@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:30
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_keys(apps, schema_editor):
+    # Keys used to be stored in plain text; keep them working by storing
+    # their digest and indexing their leading characters as the prefix.
+    User = apps.get_model('users', 'User')
+    for user in User.objects.exclude(api_key__isnull=True).exclude(api_key=''):
+        key = user.api_key
+        user.api_key_prefix = key[:12]
+        user.api_key = hashlib.sha256(key.encode()).hexdigest()
+        user.save(update_fields=['api_key', 'api_key_prefix'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='api_key_prefix',
+            field=models.CharField(blank=True, db_index=True, max_length=16, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='api_key',
+            field=models.CharField(blank=True, help_text='SHA-256 digest of the API key', max_length=255, null=True),
+        ),
+        migrations.RunPython(hash_existing_keys, migrations.RunPython.noop),
+    ]
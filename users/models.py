@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 import uuid
 
+from .api_keys import forget_user, generate_key
+
 
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -11,9 +13,40 @@ class User(AbstractUser):
         choices=[('free', 'Free'), ('premium', 'Premium')],
         default='free'
     )
-    api_key = models.CharField(max_length=255, blank=True, null=True)
+    api_key = models.CharField(max_length=255, blank=True, null=True, help_text="SHA-256 digest of the API key")
+    api_key_prefix = models.CharField(max_length=16, blank=True, null=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.email
+
+    def rotate_api_key(self):
+        """Replace the API key and return the new one; it is not stored in plain text."""
+        key, self.api_key_prefix, self.api_key = generate_key()
+        self.save(update_fields=['api_key', 'api_key_prefix', 'updated_at'])
+        forget_user(self.pk)
+        return key
+
+    def revoke_api_key(self):
+        self.api_key = None
+        self.api_key_prefix = None
+        self.save(update_fields=['api_key', 'api_key_prefix', 'updated_at'])
+        forget_user(self.pk)
+
+
+class UsageCounter(models.Model):
+    """
+    Plan usage for one owner, maintained by ``users.quotas``.
+
+    ``bookings`` counts bookings received during ``period`` (the first day of
+    the month) and restarts when a booking arrives in a new month.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='usage')
+    period = models.DateField()
+    bookings = models.PositiveIntegerField(default=0)
+    active_pages = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} {self.period:%Y-%m}: {self.bookings} bookings, {self.active_pages} pages"
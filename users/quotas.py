@@ -0,0 +1,151 @@
+"""
+Plan quotas: bookings received per month and active meeting pages.
+
+Usage lives in one ``UsageCounter`` row per owner. Consuming quota is a
+single conditional UPDATE that increments the counter only while it is
+below the plan's limit, so checking and counting are atomic under
+concurrent requests and no ``COUNT(*)`` runs on the request path. The row is
+created (from real counts) the first time an owner consumes quota;
+``reconcile_usage`` corrects drift from admin edits or deleted rows.
+"""
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+from rest_framework import exceptions, status
+
+from bookings.models import Booking
+from meeting_pages.models import MeetingPage
+from .models import UsageCounter, User
+
+
+class QuotaExceeded(exceptions.APIException):
+    status_code = status.HTTP_403_FORBIDDEN
+    default_detail = 'Plan quota exceeded.'
+    default_code = 'quota_exceeded'
+
+
+def current_period():
+    return timezone.now().date().replace(day=1)
+
+
+def plan_limit(user, quota):
+    """The user's limit for ``quota``, or ``None`` when unlimited."""
+    return settings.PLAN_QUOTAS.get(user.plan, {}).get(quota)
+
+
+def _period_start(period):
+    return timezone.make_aware(datetime.combine(period, time.min), timezone.get_default_timezone())
+
+
+def _count_usage(user_ids, period):
+    bookings = dict(
+        Booking.objects.filter(meeting_page__user__in=user_ids, created_at__gte=_period_start(period))
+        .values_list('meeting_page__user').annotate(total=Count('id'))
+    )
+    pages = dict(
+        MeetingPage.objects.filter(user__in=user_ids, active=True)
+        .values_list('user').annotate(total=Count('id'))
+    )
+    return {
+        user_id: {'period': period, 'bookings': bookings.get(user_id, 0), 'active_pages': pages.get(user_id, 0)}
+        for user_id in user_ids
+    }
+
+
+def _consume(user, condition, **changes):
+    # A missing row makes the update match nothing; create it and retry once.
+    for _ in range(2):
+        if UsageCounter.objects.filter(condition, user_id=user.pk).update(**changes):
+            return True
+        _, created = UsageCounter.objects.get_or_create(
+            user_id=user.pk, defaults=_count_usage([user.pk], current_period())[user.pk],
+        )
+        if not created:
+            return False
+    return False
+
+
+def _bookings_in_period(period, count):
+    in_period = Q(period=period)
+    return in_period, Case(When(in_period, then=F('bookings') + count), default=Value(count))
+
+
+def consume_booking(user):
+    """Count a new booking for ``user`` or raise ``QuotaExceeded``."""
+    period = current_period()
+    limit = plan_limit(user, 'bookings_per_month')
+    in_period, bookings = _bookings_in_period(period, 1)
+    condition = Q() if limit is None else ~in_period | Q(bookings__lt=limit)
+    if not _consume(user, condition, bookings=bookings, period=period):
+        raise QuotaExceeded('This page is not accepting bookings right now.')
+
+
+def consume_imported_bookings(user, count):
+    """
+    Count ``count`` bookings about to be imported for ``user`` or raise
+    ``QuotaExceeded`` when they do not all fit in this month's limit.
+
+    They are created now, so ``reconcile_usage`` counts them in this month
+    whatever their date. Call it before inserting them: a missing counter
+    row is created from the bookings already in the table.
+    """
+    if not count:
+        return
+    period = current_period()
+    limit = plan_limit(user, 'bookings_per_month')
+    in_period, bookings = _bookings_in_period(period, count)
+    condition = Q() if limit is None else ~in_period | Q(bookings__lte=limit - count)
+    if (limit is not None and count > limit) or not _consume(user, condition, bookings=bookings, period=period):
+        raise QuotaExceeded('Importing these bookings would exceed the monthly booking limit.')
+
+
+def reserve_active_page(user):
+    """Count one more active page for ``user`` or raise ``QuotaExceeded``."""
+    limit = plan_limit(user, 'active_pages')
+    condition = Q() if limit is None else Q(active_pages__lt=limit)
+    if not _consume(user, condition, active_pages=F('active_pages') + 1):
+        raise QuotaExceeded(f'Your plan allows {limit} active meeting pages.')
+
+
+def release_active_page(user_id):
+    UsageCounter.objects.filter(user_id=user_id, active_pages__gt=0).update(
+        active_pages=F('active_pages') - 1,
+    )
+
+
+def reconcile_usage(user_ids=None, batch_size=1000):
+    """
+    Recompute counters from bookings and pages.
+
+    Returns ``(checked, corrected)``.
+    """
+    period = current_period()
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    users = list(users)
+
+    checked = corrected = 0
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        actual = _count_usage(batch, period)
+        stored = {
+            counter.user_id: counter for counter in UsageCounter.objects.filter(user_id__in=batch)
+        }
+        changed = []
+        for user_id, values in actual.items():
+            counter = stored.get(user_id)
+            if counter is not None and all(getattr(counter, field) == value for field, value in values.items()):
+                continue
+            changed.append(UsageCounter(user_id=user_id, **values))
+        UsageCounter.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['period', 'bookings', 'active_pages', 'updated_at'],
+        )
+        checked += len(batch)
+        corrected += len(changed)
+    return checked, corrected
@@ -8,8 +8,16 @@ User = get_user_model()
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'organization', 'plan', 'api_key', 'created_at']
-        read_only_fields = ['id', 'api_key', 'created_at']
+        fields = ['id', 'username', 'email', 'organization', 'plan', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+
+class CurrentUserSerializer(UserSerializer):
+    """The signed-in user's own account, including which API key is active."""
+
+    class Meta(UserSerializer.Meta):
+        fields = [*UserSerializer.Meta.fields, 'api_key_prefix']
+        read_only_fields = [*UserSerializer.Meta.read_only_fields, 'api_key_prefix']
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
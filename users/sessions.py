@@ -0,0 +1,59 @@
+"""
+Cache-backed sessions that skip the database write when nothing changed.
+
+Use with ``SESSION_ENGINE = 'users.sessions'``. Reads come from the
+``SESSION_CACHE_ALIAS`` cache and fall back to the database, as with
+Django's ``cached_db`` engine. On top of that:
+
+* a session whose data is identical to what was loaded is not written
+  back, even if it was marked as modified (e.g. by re-assigning the same
+  value). Key rotation on login and explicit expiry changes still save.
+* entries are kept in the cache for at most ``SESSION_CACHE_TIMEOUT``
+  seconds, so a logout in one process is seen by the others after that
+  long even when the cache is process-local.
+"""
+import copy
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+
+class _BoundedTimeoutCache:
+    def __init__(self, cache, max_timeout):
+        self._cache = cache
+        self._max_timeout = max_timeout
+
+    def set(self, key, value, timeout=None):
+        if timeout is None or timeout > self._max_timeout:
+            timeout = self._max_timeout
+        return self._cache.set(key, value, timeout)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+
+class SessionStore(cached_db.SessionStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = _BoundedTimeoutCache(self._cache, settings.SESSION_CACHE_TIMEOUT)
+        self._loaded_session = None
+
+    def load(self):
+        data = super().load()
+        self._loaded_session = copy.deepcopy(data)
+        return data
+
+    def save(self, must_create=False):
+        if (
+            not must_create
+            and not settings.SESSION_SAVE_EVERY_REQUEST
+            and self.session_key is not None
+            and self._loaded_session is not None
+            and self._loaded_session == getattr(self, '_session_cache', None)
+        ):
+            return
+        super().save(must_create)
+        self._loaded_session = copy.deepcopy(self._session)
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .api_keys import forget_user
+from .backends import invalidate_cached_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # Deactivation, plan changes and deletion must not be masked by the
+    # session user cache or the API key cache.
+    invalidate_cached_user(instance.pk)
+    forget_user(instance.pk)
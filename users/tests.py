@@ -1,3 +1,182 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.models import Booking
+from meeting_pages.models import MeetingPage
+from .api_keys import clear_cache, hash_key
+from .models import UsageCounter, User
+from .quotas import reconcile_usage
+from .sessions import SessionStore
+
+
+class ApiKeyAuthenticationTests(TestCase):
+    def setUp(self):
+        clear_cache()
+        self.addCleanup(clear_cache)
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.client = APIClient()
+
+    def issue_key(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/users/api-key/')
+        self.client.force_authenticate(None)
+        self.assertEqual(response.status_code, 201)
+        return response.data['api_key']
+
+    def get_me(self, key):
+        return self.client.get('/api/users/me/', HTTP_AUTHORIZATION=f'Api-Key {key}')
+
+    def test_key_is_stored_hashed_and_authenticates(self):
+        key = self.issue_key()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.api_key, hash_key(key))
+        self.assertTrue(key.startswith(self.user.api_key_prefix))
+
+        response = self.get_me(key)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'host@example.com')
+        self.assertEqual(response.data['api_key_prefix'], self.user.api_key_prefix)
+        self.assertNotIn('api_key', response.data)
+
+    def test_warm_lookups_skip_the_database(self):
+        key = self.issue_key()
+        self.get_me(key)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_me(key).status_code, 200)
+
+    def test_rotation_and_revocation_invalidate_cached_keys(self):
+        old_key = self.issue_key()
+        self.assertEqual(self.get_me(old_key).status_code, 200)
+        new_key = self.issue_key()
+        self.assertEqual(self.get_me(old_key).status_code, 403)
+        self.assertEqual(self.get_me(new_key).status_code, 200)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.delete('/api/users/api-key/').status_code, 204)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get_me(new_key).status_code, 403)
+
+    def test_deactivated_users_are_rejected(self):
+        key = self.issue_key()
+        self.get_me(key)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_me(key).status_code, 403)
+
+    def test_unknown_key_with_known_prefix_is_rejected(self):
+        key = self.issue_key()
+        self.assertEqual(self.get_me(key[:-1] + ('A' if key[-1] != 'A' else 'B')).status_code, 403)
+
+
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        caches['sessions'].clear()
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.client.login(username='host', password='pw')
+
+    def test_authenticated_requests_skip_session_and_user_queries(self):
+        self.client.get('/api/users/me/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['email'], 'host@example.com')
+
+    def test_user_changes_are_visible_immediately(self):
+        self.client.get('/api/users/me/')
+        self.user.organization = 'Acme'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').data['organization'], 'Acme')
+
+    def test_unchanged_session_is_not_written(self):
+        session = self.client.session
+        session['theme'] = 'dark'
+        session.save()
+        store = SessionStore(session.session_key)
+        store['theme'] = 'dark'
+        with self.assertNumQueries(0):
+            store.save()
+        store['theme'] = 'light'
+        store.save()
+        self.assertEqual(SessionStore(session.session_key)['theme'], 'light')
+
+    def test_logout_removes_the_cached_session(self):
+        self.client.get('/api/users/me/')
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 403)
+
+
+@override_settings(PLAN_QUOTAS={
+    'free': {'bookings_per_month': 2, 'active_pages': 1},
+    'premium': {'bookings_per_month': None, 'active_pages': None},
+})
+class PlanQuotaTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='host', email='host@example.com', password='pw')
+        self.page = MeetingPage.objects.create(user=self.user, title='Intro', slug='intro')
+        self.client = APIClient()
+
+    def book(self):
+        # A new hour each time, so bookings never conflict.
+        self.hours = getattr(self, 'hours', 24) + 1
+        return self.client.post('/api/public/bookings/', {
+            'meeting_page': str(self.page.id),
+            'date': (timezone.now() + timedelta(hours=self.hours)).isoformat(),
+            'user_input': {},
+        }, format='json')
+
+    def test_monthly_booking_limit(self):
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(self.book().status_code, 201)
+        response = self.book()
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['detail'].code, 'quota_exceeded')
+        self.assertEqual(Booking.objects.count(), 2)
+
+        # A new month starts from zero.
+        UsageCounter.objects.filter(user=self.user).update(period=date(2000, 1, 1))
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(UsageCounter.objects.get(user=self.user).bookings, 1)
+
+    def test_quota_check_is_a_single_update(self):
+        self.book()
+        with CaptureQueriesContext(connection) as queries:
+            self.book()
+        counter_queries = [q['sql'] for q in queries if 'users_usagecounter' in q['sql']]
+        self.assertEqual(len(counter_queries), 1)
+        self.assertTrue(counter_queries[0].startswith('UPDATE'))
+
+    def test_premium_plans_are_unlimited(self):
+        self.user.plan = 'premium'
+        self.user.save()
+        for _ in range(3):
+            self.assertEqual(self.book().status_code, 201)
+
+    def test_active_page_limit(self):
+        self.client.force_authenticate(self.user)
+        reconcile_usage()
+        response = self.client.post('/api/meeting-pages/', {'title': 'Second'}, format='json')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post('/api/meeting-pages/', {'title': 'Draft', 'active': False}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.client.patch(f'/api/meeting-pages/{self.page.id}/', {'active': False}, format='json')
+        response = self.client.patch(f"/api/meeting-pages/{response.data['id']}/", {'active': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UsageCounter.objects.get(user=self.user).active_pages, 1)
+
+    def test_reconcile_corrects_drift(self):
+        self.book()
+        UsageCounter.objects.filter(user=self.user).update(bookings=40, active_pages=0)
+        out = StringIO()
+        call_command('reconcile_usage', stdout=out)
+        counter = UsageCounter.objects.get(user=self.user)
+        self.assertEqual((counter.bookings, counter.active_pages), (1, 1))
+        self.assertIn('corrected 1 counters', out.getvalue())
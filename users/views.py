@@ -4,7 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import authenticate, login
 from .models import User
-from .serializers import UserSerializer, UserRegistrationSerializer
+from .serializers import CurrentUserSerializer, UserSerializer, UserRegistrationSerializer
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -57,5 +57,18 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def me(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = CurrentUserSerializer(request.user)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post', 'delete'], url_path='api-key')
+    def api_key(self, request):
+        """POST issues (or rotates) the caller's API key; DELETE revokes it."""
+        if request.method == 'DELETE':
+            request.user.revoke_api_key()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        key = request.user.rotate_api_key()
+        # The key is only ever shown here; just its digest is stored.
+        return Response(
+            {'api_key': key, 'api_key_prefix': request.user.api_key_prefix},
+            status=status.HTTP_201_CREATED,
+        )